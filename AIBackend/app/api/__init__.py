@@ -6,6 +6,7 @@ from .connection import router as connection_router
 from .estimate import router as estimate_router
 from .bowel_estimate import router as bowel_estimate_router
 from .methods import router as methods_router
+from .usage import router as usage_router
 
 router = APIRouter()
 
@@ -14,3 +15,4 @@ router.include_router(connection_router)
 router.include_router(estimate_router)
 router.include_router(bowel_estimate_router)
 router.include_router(methods_router)
+router.include_router(usage_router)
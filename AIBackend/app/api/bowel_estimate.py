@@ -12,6 +12,7 @@ from app.models.schemas import (
 )
 from app.services.pure_bowel_processor import process_pure_bowel
 from app.utils.validators import validate_estimate_request
+from app.utils.usage_tracker import start_request_usage, finish_request_usage
 
 router = APIRouter(prefix="/bowel-estimate", tags=["bowel-estimate"])
 
@@ -48,6 +49,13 @@ async def _validate_and_read_files(files: List[UploadFile], api_key: str):
 
 def _create_bowel_response(success: bool, message: str, result: any = None, error: str = None) -> BowelEstimateResponse:
     """创建结构化的BowelEstimateResponse"""
+    usage = finish_request_usage()
+    if usage and usage["budget_exceeded"]:
+        # 超出token预算的请求整体按失败处理
+        success = False
+        message = "分析失败"
+        error = f"超出token预算（已用 {usage['total_tokens']} / 预算 {usage['token_budget']}）"
+
     if success and result is not None:
         # pure_bowel返回的结构化结果
         if isinstance(result, dict):
@@ -59,21 +67,25 @@ def _create_bowel_response(success: bool, message: str, result: any = None, erro
                 quantity=result.get("quantity"),
                 shape=result.get("shape"),
                 health_comment=result.get("health_comment"),
-                analysis_basis=result.get("analysis_basis")
+                analysis_basis=result.get("analysis_basis"),
+                cache_hit=result.get("cache_hit", False),
+                usage=usage
             )
         else:
             # 其他方法返回的字符串结果
             return BowelEstimateResponse(
                 success=True,
                 message=message,
-                raw=result
+                raw=result,
+                usage=usage
             )
     else:
         # 处理失败的响应
         return BowelEstimateResponse(
             success=False,
             message=message,
-            error=error
+            error=error,
+            usage=usage
         )
 
 @router.post("", response_model=BowelEstimateResponse)
@@ -91,6 +103,7 @@ async def bowel_estimate(
     Returns:
         分析结果
     """
+    start_request_usage("/bowel-estimate", request.user_id, request.token_budget, request.fallback_model_name)
     try:
         # 验证分析方法
         if request.method not in [e.value for e in AnalysisMethod]:
@@ -132,11 +145,7 @@ async def bowel_estimate(
             result = process_pure_bowel(image_bytes_list, request.api_key, request.model_url, request.model_name)
             # 处理pure_bowel的结构化返回
             if isinstance(result, dict) and "error" in result:
-                return BowelEstimateResponse(
-                    success=False,
-                    message="分析失败",
-                    error=result["error"]
-                )
+                return _create_bowel_response(False, "分析失败", error=result["error"])
         else:
             raise HTTPException(status_code=400, detail="粪便分析目前仅支持pure_llm方法")
         
@@ -146,6 +155,9 @@ async def bowel_estimate(
         raise
     except Exception as e:
         return _create_bowel_response(False, "分析失败", error=str(e))
+    finally:
+        # 以HTTPException结束的请求也计入用量汇总，已结束统计时不会重复计入
+        finish_request_usage()
 
 @router.post("/pure-llm", response_model=BowelEstimateResponse)
 async def bowel_estimate_pure_llm(
@@ -157,6 +169,7 @@ async def bowel_estimate_pure_llm(
 
     适用场景：所有类型的粪便健康状况分析
     """
+    start_request_usage("/bowel-estimate/pure-llm", request.user_id, request.token_budget, request.fallback_model_name)
     try:
         image_bytes_list = await _validate_and_read_files(files, request.api_key)
 
@@ -171,4 +184,7 @@ async def bowel_estimate_pure_llm(
     except HTTPException:
         raise
     except Exception as e:
-        return _create_bowel_response(False, "分析失败", error=str(e))
\ No newline at end of file
+        return _create_bowel_response(False, "分析失败", error=str(e))
+    finally:
+        # 以HTTPException结束的请求也计入用量汇总，已结束统计时不会重复计入
+        finish_request_usage()
\ No newline at end of file
@@ -11,7 +11,9 @@ from app.models.schemas import (
     EstimateRequest,
 )
 from app.services.pure_llm_processor import process_pure_llm
+from app.services.estimator import estimator_service
 from app.utils.validators import validate_estimate_request
+from app.utils.usage_tracker import start_request_usage, finish_request_usage
 
 router = APIRouter(prefix="/estimate", tags=["estimate"])
 
@@ -48,6 +50,13 @@ async def _validate_and_read_files(files: List[UploadFile], api_key: str):
 
 def _create_estimate_response(success: bool, message: str, result: any = None, error: str = None) -> EstimateResponse:
     """创建结构化的EstimateResponse"""
+    usage = finish_request_usage()
+    if usage and usage["budget_exceeded"]:
+        # 超出token预算的请求整体按失败处理
+        success = False
+        message = "分析失败"
+        error = f"超出token预算（已用 {usage['total_tokens']} / 预算 {usage['token_budget']}）"
+
     if success and result is not None:
         # 处理成功的响应
         if isinstance(result, dict):
@@ -58,21 +67,25 @@ def _create_estimate_response(success: bool, message: str, result: any = None, e
                 raw=result,
                 calories=result.get("calories"),
                 food_name=result.get("food_name"),
-                reason=result.get("estimation_basis")
+                reason=result.get("estimation_basis"),
+                cache_hit=result.get("cache_hit", False),
+                usage=usage
             )
         else:
             # 其他方法返回的字符串结果
             return EstimateResponse(
                 success=True,
                 message=message,
-                raw=result
+                raw=result,
+                usage=usage
             )
     else:
         # 处理失败的响应
         return EstimateResponse(
             success=False,
             message=message,
-            error=error
+            error=error,
+            usage=usage
         )
 
 @router.post("", response_model=EstimateResponse)
@@ -90,6 +103,7 @@ async def estimate_calories(
     Returns:
         分析结果
     """
+    start_request_usage("/estimate", request.user_id, request.token_budget, request.fallback_model_name)
     try:
         # 验证分析方法
         if request.method not in [e.value for e in AnalysisMethod]:
@@ -128,16 +142,12 @@ async def estimate_calories(
         
         # 根据方法调用相应的服务
         if request.method == AnalysisMethod.LLM_OCR_HYBRID.value:
-            result = estimator_service.process_llm_ocr_hybrid(image_bytes_list, api_key)
+            result = estimator_service.process_llm_ocr_hybrid(image_bytes_list, api_key, request.model_url, request.model_name)
         elif request.method == AnalysisMethod.PURE_LLM.value:
             result = process_pure_llm(image_bytes_list, request.api_key, request.model_url, request.model_name)
             # 处理pure_llm的结构化返回
             if isinstance(result, dict) and "error" in result:
-                return EstimateResponse(
-                    success=False,
-                    message="分析失败",
-                    error=result["error"]
-                )
+                return _create_estimate_response(False, "分析失败", error=result["error"])
         elif request.method == AnalysisMethod.NUTRITION_TABLE.value:
             result = estimator_service.process_nutrition_table(image_bytes_list, api_key)
         elif request.method == AnalysisMethod.FOOD_PORTION.value:
@@ -151,6 +161,9 @@ async def estimate_calories(
         raise
     except Exception as e:
         return _create_estimate_response(False, "分析失败", error=str(e))
+    finally:
+        # 以HTTPException结束的请求也计入用量汇总，已结束统计时不会重复计入
+        finish_request_usage()
 
 @router.post("/llm_ocr_hybrid", response_model=EstimateResponse)
 async def estimate_llm_ocr_hybrid(
@@ -162,11 +175,12 @@ async def estimate_llm_ocr_hybrid(
 
     适用场景：有营养标签的包装食品热量计算
     """
+    start_request_usage("/estimate/llm_ocr_hybrid", request.user_id, request.token_budget, request.fallback_model_name)
     try:
         image_bytes_list = await _validate_and_read_files(files, request.api_key)
 
         # 直接调用LLM-OCR混合处理
-        result = estimator_service.process_llm_ocr_hybrid(image_bytes_list, request.api_key)
+        result = estimator_service.process_llm_ocr_hybrid(image_bytes_list, request.api_key, request.model_url, request.model_name)
 
         return _create_estimate_response(True, "分析完成", result)
 
@@ -174,6 +188,9 @@ async def estimate_llm_ocr_hybrid(
         raise
     except Exception as e:
         return _create_estimate_response(False, "分析失败", error=str(e))
+    finally:
+        # 以HTTPException结束的请求也计入用量汇总，已结束统计时不会重复计入
+        finish_request_usage()
 
 @router.post("/pure_llm", response_model=EstimateResponse)
 async def estimate_pure_llm(
@@ -185,6 +202,7 @@ async def estimate_pure_llm(
 
     适用场景：所有类型食物（新鲜食材、自制食品、包装食品等）
     """
+    start_request_usage("/estimate/pure_llm", request.user_id, request.token_budget, request.fallback_model_name)
     try:
         image_bytes_list = await _validate_and_read_files(files, request.api_key)
 
@@ -200,6 +218,9 @@ async def estimate_pure_llm(
         raise
     except Exception as e:
         return _create_estimate_response(False, "分析失败", error=str(e))
+    finally:
+        # 以HTTPException结束的请求也计入用量汇总，已结束统计时不会重复计入
+        finish_request_usage()
 
 @router.post("/nutrition-table", response_model=EstimateResponse)
 async def estimate_nutrition_table(
@@ -211,6 +232,7 @@ async def estimate_nutrition_table(
 
     适用场景：需要详细营养成分信息的包装食品
     """
+    start_request_usage("/estimate/nutrition-table", request.user_id, request.token_budget, request.fallback_model_name)
     try:
         image_bytes_list = await _validate_and_read_files(files, request.api_key)
 
@@ -223,6 +245,9 @@ async def estimate_nutrition_table(
         raise
     except Exception as e:
         return _create_estimate_response(False, "分析失败", error=str(e))
+    finally:
+        # 以HTTPException结束的请求也计入用量汇总，已结束统计时不会重复计入
+        finish_request_usage()
 
 @router.post("/food-portion", response_model=EstimateResponse)
 async def estimate_food_portion(
@@ -234,6 +259,7 @@ async def estimate_food_portion(
 
     适用场景：需要准确份量信息的包装食品或标签
     """
+    start_request_usage("/estimate/food-portion", request.user_id, request.token_budget, request.fallback_model_name)
     try:
         image_bytes_list = await _validate_and_read_files(files, request.api_key)
 
@@ -245,4 +271,7 @@ async def estimate_food_portion(
     except HTTPException:
         raise
     except Exception as e:
-        return _create_estimate_response(False, "分析失败", error=str(e))
\ No newline at end of file
+        return _create_estimate_response(False, "分析失败", error=str(e))
+    finally:
+        # 以HTTPException结束的请求也计入用量汇总，已结束统计时不会重复计入
+        finish_request_usage()
\ No newline at end of file
@@ -0,0 +1,25 @@
+"""
+用量统计相关端点
+"""
+
+import os
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+
+from app.utils.usage_tracker import usage_aggregator
+
+router = APIRouter(prefix="/usage", tags=["usage"])
+
+# 查询用量需要的管理令牌，未配置时该端点不可用
+USAGE_ADMIN_TOKEN = os.getenv("USAGE_ADMIN_TOKEN", "")
+
+@router.get("")
+async def get_usage(x_admin_token: Optional[str] = Header(None, alias="X-Admin-Token")):
+    """按用户和端点汇总的token用量与图片载荷大小（进程启动以来），需要在 X-Admin-Token 中提供管理令牌"""
+    if not USAGE_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="未配置 USAGE_ADMIN_TOKEN，用量查询已禁用")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, USAGE_ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="管理令牌无效")
+    return usage_aggregator.snapshot()
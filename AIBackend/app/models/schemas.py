@@ -3,7 +3,7 @@ API请求和响应数据模型
 """
 
 from pydantic import BaseModel, Field
-from typing import List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Union
 from enum import Enum
 
 class AnalysisMethod(str, Enum):
@@ -19,6 +19,9 @@ class EstimateRequest(BaseModel):
     method: AnalysisMethod = Field(..., description="分析方法")
     model_url: str = Field(..., description="模型API地址")
     model_name: str = Field(..., description="模型名称")
+    user_id: str = Field("", description="调用方用户ID，用于用量统计")
+    token_budget: Optional[int] = Field(None, description="本次请求的token预算，超出后停止调用模型")
+    fallback_model_name: Optional[str] = Field(None, description="用量接近预算时切换的降级模型")
     
     class Config:
         json_encoders = {
@@ -34,6 +37,8 @@ class EstimateResponse(BaseModel):
     calories: Optional[Union[float, str]] = Field(None, description="热量值，float类型单位为大卡，str类型可能包含单位")
     food_name: Optional[str] = Field(None, description="食物名称")
     reason: Optional[str] = Field(None, description="估算依据")
+    cache_hit: bool = Field(False, description="是否复用了近似重复图片的历史分析结果")
+    usage: Optional[Dict[str, Any]] = Field(None, description="本次请求的token用量与图片载荷大小")
 
 class HealthCheckResponse(BaseModel):
     """健康检查响应模型"""
@@ -86,3 +91,5 @@ class BowelEstimateResponse(BaseModel):
     shape: Optional[str] = Field(None, description="粪便形态")
     health_comment: Optional[str] = Field(None, description="健康点评")
     analysis_basis: Optional[str] = Field(None, description="分析依据")
+    cache_hit: bool = Field(False, description="是否复用了近似重复图片的历史分析结果")
+    usage: Optional[Dict[str, Any]] = Field(None, description="本次请求的token用量与图片载荷大小")
@@ -0,0 +1,120 @@
+"""
+近似重复图片分析结果缓存
+基于感知哈希（dHash）的多索引哈希表，复用视觉上相同图片的历史分析结果
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from ..utils.image_utils import hamming_distance
+
+HASH_BITS = 64  # 与 compute_dhash 默认 hash_size=8 对应
+DEFAULT_MAX_DISTANCE = 4  # 汉明距离阈值，超过即视为不同图片
+DEFAULT_CAPACITY = 5000  # 每个缓存最多保留的条目数
+
+
+class AnalysisCache:
+    """
+    近似重复图片分析结果缓存
+
+    将64位哈希切分为 max_distance + 1 段，每段建立精确索引。
+    由鸽巢原理，汉明距离不超过阈值的两个哈希至少有一段完全相同，
+    因此查询只需检查各段命中的候选，无需遍历全部条目。
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE, capacity: int = DEFAULT_CAPACITY):
+        self.max_distance = max_distance
+        self.capacity = capacity
+        self.lock = Lock()
+
+        # 切分方案：[(位移, 掩码), ...]
+        segments = max_distance + 1
+        base, extra = divmod(HASH_BITS, segments)
+        self._segments = []
+        shift = 0
+        for i in range(segments):
+            width = base + (1 if i < extra else 0)
+            self._segments.append((shift, (1 << width) - 1))
+            shift += width
+
+        # (作用域, 哈希) -> 分析结果，按插入/命中顺序维护LRU
+        self._entries: "OrderedDict[Tuple[Tuple, int], Dict[str, Any]]" = OrderedDict()
+        # (作用域, 段序号, 段值) -> 哈希集合
+        self._index: Dict[Tuple[Tuple, int, int], set] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def _segment_keys(self, scope: Tuple, image_hash: int):
+        for i, (shift, mask) in enumerate(self._segments):
+            yield (scope, i, (image_hash >> shift) & mask)
+
+    def get(self, scope: Tuple, image_hash: Optional[int]) -> Optional[Dict[str, Any]]:
+        """
+        查找与给定哈希近似的已缓存分析结果
+
+        Args:
+            scope: 缓存作用域，例如 (分析类型, 模型地址, 模型名称)
+            image_hash: 图片感知哈希
+
+        Returns:
+            命中时返回结果副本，否则返回None
+        """
+        if image_hash is None:
+            return None
+
+        with self.lock:
+            best_hash = None
+            best_distance = self.max_distance + 1
+            for key in self._segment_keys(scope, image_hash):
+                for candidate in self._index.get(key, ()):
+                    distance = hamming_distance(image_hash, candidate)
+                    if distance < best_distance:
+                        best_hash, best_distance = candidate, distance
+
+            if best_hash is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end((scope, best_hash))
+            return dict(self._entries[(scope, best_hash)])
+
+    def put(self, scope: Tuple, image_hash: Optional[int], result: Dict[str, Any]) -> None:
+        """
+        写入分析结果
+
+        Args:
+            scope: 缓存作用域
+            image_hash: 图片感知哈希
+            result: 分析结果
+        """
+        if image_hash is None:
+            return
+
+        with self.lock:
+            entry_key = (scope, image_hash)
+            if entry_key not in self._entries:
+                for key in self._segment_keys(scope, image_hash):
+                    self._index.setdefault(key, set()).add(image_hash)
+            self._entries[entry_key] = dict(result)
+            self._entries.move_to_end(entry_key)
+
+            while len(self._entries) > self.capacity:
+                (old_scope, old_hash), _ = self._entries.popitem(last=False)
+                for key in self._segment_keys(old_scope, old_hash):
+                    bucket = self._index.get(key)
+                    if bucket is not None:
+                        bucket.discard(old_hash)
+                        if not bucket:
+                            del self._index[key]
+
+    def stats(self) -> Dict[str, int]:
+        """获取缓存统计信息"""
+        with self.lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# 全局分析结果缓存实例
+analysis_cache = AnalysisCache()
@@ -0,0 +1,143 @@
+"""
+商品条码识别与本地营养数据库
+识别包装食品上的EAN-13/EAN-8/UPC-A条码，并在本地商品营养库中查找已知的能量和净含量
+"""
+
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+from PIL import Image, ImageOps
+
+try:
+    # pyzbar 依赖系统库 libzbar，缺失时条码识别阶段直接跳过
+    from pyzbar.pyzbar import decode as _zbar_decode
+except ImportError:  # pragma: no cover - 取决于部署环境
+    _zbar_decode = None
+
+# 本地商品营养库文件路径，可通过环境变量覆盖
+DEFAULT_STORE_PATH = os.getenv(
+    "PRODUCT_NUTRITION_STORE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "product_nutrition.json")
+)
+
+SUPPORTED_SYMBOLS = ("EAN13", "EAN8", "UPCA")
+
+
+def _is_valid_ean(code: str) -> bool:
+    """校验EAN-13/EAN-8/UPC-A的校验位"""
+    if not code.isdigit() or len(code) not in (8, 12, 13):
+        return False
+    digits = [int(c) for c in code]
+    check = digits.pop()
+    # 从右往左（不含校验位），奇数位权重为3
+    total = sum(d * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(digits)))
+    return (10 - total % 10) % 10 == check
+
+
+def decode_barcodes(image_bytes: bytes) -> List[str]:
+    """
+    识别图片中的商品条码
+
+    Args:
+        image_bytes: 图片字节流
+
+    Returns:
+        去重后的条码列表，未识别到或识别组件不可用时返回空列表
+    """
+    if _zbar_decode is None:
+        return []
+
+    try:
+        image = ImageOps.exif_transpose(Image.open(io.BytesIO(image_bytes))).convert("L")
+        codes = []
+        for symbol in _zbar_decode(image):
+            if symbol.type not in SUPPORTED_SYMBOLS:
+                continue
+            code = symbol.data.decode("ascii", errors="ignore")
+            if _is_valid_ean(code) and code not in codes:
+                codes.append(code)
+        return codes
+    except Exception as e:
+        print(f"[BarcodeService] Decode barcodes failed: {e}")
+        return []
+
+
+class ProductNutritionStore:
+    """本地商品营养库，条码 -> 能量密度与净含量"""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self.lock = Lock()
+        self._products: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception as e:
+            print(f"[ProductNutritionStore] Load store failed: {e}")
+            return {}
+
+    def _save(self) -> None:
+        # 先写临时文件再原子替换，避免写入中途崩溃损坏数据库
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._products, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def get(self, barcode: str) -> Optional[Dict[str, Any]]:
+        """
+        查询商品营养信息
+
+        Args:
+            barcode: 商品条码
+
+        Returns:
+            商品信息字典，不存在时返回None
+        """
+        with self.lock:
+            product = self._products.get(barcode)
+            return dict(product) if product else None
+
+    def put(self, barcode: str, food_name: str, energy_kcal: float, net_content: float, unit: str = "g") -> None:
+        """
+        写入或更新商品营养信息
+
+        Args:
+            barcode: 商品条码
+            food_name: 食物名称
+            energy_kcal: 每100g/100ml的能量，单位大卡
+            net_content: 净含量数值
+            unit: 净含量单位（g/ml）
+        """
+        with self.lock:
+            self._products[barcode] = {
+                "食物名称": food_name,
+                "能量": energy_kcal,
+                "净含量": net_content,
+                "单位": unit,
+                "更新时间": datetime.now().isoformat()
+            }
+            try:
+                self._save()
+            except Exception as e:
+                print(f"[ProductNutritionStore] Save store failed: {e}")
+
+
+# 全局商品营养库实例
+product_store = ProductNutritionStore()
@@ -9,6 +9,7 @@ import os
 from .ocr_service import ocr_service
 from .llm_service import llm_service
 from .analysis_service import food_analysis_service
+from .barcode_service import decode_barcodes, product_store
 
 class DietEstimatorService:
     """饮食热量估算服务"""
@@ -17,6 +18,7 @@ class DietEstimatorService:
         self.ocr_service = ocr_service
         self.llm_service = llm_service
         self.analysis_service = food_analysis_service
+        self.product_store = product_store
     
     def process_llm_ocr_hybrid(self, image_files: List[bytes], api_key: str, model_url: str = None, model_name: str = None) -> str:
         """
@@ -35,6 +37,25 @@ class DietEstimatorService:
         if not api_key or api_key.strip() == "":
             return "请输入API Key"
         
+        # 第零阶段：识别商品条码，本地营养库命中时无需调用大模型和OCR
+        barcodes = []
+        barcode_images = {}  # 条码 -> 识别出该条码的图片序号
+        for i, image_bytes in enumerate(image_files):
+            for code in decode_barcodes(image_bytes):
+                if code not in barcodes:
+                    barcodes.append(code)
+                barcode_images.setdefault(code, set()).add(i + 1)
+        
+        for code in barcodes:
+            product = self.product_store.get(code)
+            if product:
+                calories = product["能量"] * product["净含量"] / 100
+                return (
+                    f"✅ 热量: {calories} 大卡\n\n📝 计算依据:\n"
+                    f"基于商品条码 {code}（{product['食物名称']}）的本地营养数据："
+                    f"能量 {product['能量']}大卡/100{product['单位']}，净含量 {product['净含量']}{product['单位']}"
+                )
+        
         # 初始化图片信息列表
         image_infos = []
         
@@ -88,6 +109,7 @@ class DietEstimatorService:
         
         # 第三阶段：根据推理状态分别处理
         useful_results = []
+        product_candidates = []  # 混合推理成功的图片提取出的商品营养数据
         
         for info in image_infos:
             try:
@@ -148,6 +170,14 @@ class DietEstimatorService:
                             "状态": "混合推理完成"
                         })
                         
+                        product_candidates.append((
+                            info["图片序号"],
+                            food_name,
+                            energy_kcal,
+                            float(portion_value),
+                            portion_info.get("份量单位", "g")
+                        ))
+                        
                     except Exception as calc_e:
                         info["状态"] = f"热量计算失败: {str(calc_e)}"
                         
@@ -179,6 +209,20 @@ class DietEstimatorService:
                     "状态": f"处理失败: {str(e)}"
                 })
         
+        # 条码与营养数据一一对应时写入本地营养库，供后续请求直接命中；
+        # 每个请求最多写入一条，优先使用识别出该条码的图片，多张图片都成功且无法对应时不写入
+        if len(barcodes) == 1 and product_candidates:
+            code = barcodes[0]
+            matching = [c for c in product_candidates if c[0] in barcode_images[code]]
+            if matching:
+                chosen = matching[0]
+            elif len(product_candidates) == 1:
+                chosen = product_candidates[0]
+            else:
+                chosen = None
+            if chosen:
+                self.product_store.put(code, *chosen[1:])
+        
         # 清理临时文件
         for info in image_infos:
             if info["图片路径"] and os.path.exists(info["图片路径"]):
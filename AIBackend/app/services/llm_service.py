@@ -22,8 +22,10 @@ from ..utils.prompt_helper import (
 from ..utils.llm_helper import (
     get_llm_answer,
     get_vl_llm_answer,
+    get_structured_llm_answer,
     parse_json_result
 )
+from ..utils.usage_tracker import select_model, record_completion, record_image_bytes
 
 class LLMService:
     def __init__(self):
@@ -79,15 +81,17 @@ class LLMService:
             if image_path:
                 with open(image_path, "rb") as f:
                     img_base64 = base64.b64encode(f.read()).decode()
+                record_image_bytes(len(img_base64))
                 messages[0]["content"] = [
                     {"type": "text", "text": messages[0]["content"]},
                     {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{img_base64}"}}
                 ]
             
             response = client.chat.completions.create(
-                model=model,
+                model=select_model(model),
                 messages=messages
             )
+            record_completion(response)
             return response.choices[0].message.content
         except Exception as e:
             print(f"[LLMService] API request failed: {e}")
@@ -193,10 +197,7 @@ class LLMService:
         """
         try:
             prompt = get_prompt_nutrition_analysis(ocr_text)
-            response = get_llm_answer(prompt, api_key, model_url, model_name)
-
-            # 解析JSON响应
-            result = parse_json_result(response)
+            result = get_structured_llm_answer(prompt, "nutrition", api_key, model_url, model_name)
 
             if result:
                 return {"状态": "成功", "分析结果": result}
@@ -221,10 +222,7 @@ class LLMService:
         """
         try:
             prompt = get_prompt_portion_analysis(ocr_text)
-            response = get_llm_answer(prompt, api_key, model_url, model_name)
-            
-            # 解析JSON响应
-            result = parse_json_result(response)
+            result = get_structured_llm_answer(prompt, "portion", api_key, model_url, model_name)
             
             if result:
                 return {"状态": "成功", "分析结果": result}
@@ -248,10 +246,7 @@ class LLMService:
         """
         try:
             prompt = get_prompt_single_image_analysis()
-            response = get_vl_llm_answer(prompt, image_path, api_key, model_url, model_name)
-
-            # 解析JSON响应
-            result = parse_json_result(response)
+            result = get_structured_llm_answer(prompt, "single_image", api_key, model_url, model_name, image_path=image_path)
 
             if result and "热量" in result:
                 return {
@@ -280,13 +275,10 @@ class LLMService:
         """
         try:
             prompt = get_prompt_multi_image_analysis(single_results)
-            response = get_llm_answer(prompt, api_key, model_url, model_name)
+            result = get_structured_llm_answer(prompt, "multi_image", api_key, model_url, model_name)
             
-            # 解析JSON响应
-            result = parse_json_result(response)
-            
-            if result and "总热量" in result:
-                return {"状态": "成功", "总热量": result["总热量"], "估算依据": result.get("估算依据", "")}
+            if result and "热量" in result:
+                return {"状态": "成功", "总热量": result["热量"], "估算依据": result.get("估算依据", "")}
             else:
                 return {"状态": "失败", "错误信息": "无法综合分析多张图片"}
                 
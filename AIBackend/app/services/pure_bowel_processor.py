@@ -7,8 +7,11 @@ from typing import List, Dict, Any
 import tempfile
 import os
 
-from ..utils.llm_helper import get_llm_answer, get_vl_llm_answer, parse_json_result
+from ..utils.llm_helper import get_structured_llm_answer
 from ..utils.prompt_helper import get_prompt_bowel_single_image_analysis
+from ..utils.image_utils import compute_dhash
+from ..utils.prompt_registry import prompt_registry
+from .analysis_cache import analysis_cache
 
 
 def process_pure_bowel(image_files: List[bytes], api_key: str, model_url: str, model_name: str) -> Dict[str, Any]:
@@ -40,8 +43,15 @@ def process_pure_bowel(image_files: List[bytes], api_key: str, model_url: str, m
         temp_file_path = temp_file.name
         temp_file.close()
 
-        # 分析单张图片
-        result = _analyze_single_bowel_image(temp_file_path, api_key, model_url, model_name)
+        # 分析单张图片，视觉上相同的图片直接复用历史分析结果
+        cache_scope = ("pure_bowel", prompt_registry.cache_key("bowel_single_image_analysis"), model_url, model_name)
+        image_hash = compute_dhash(first_image_bytes)
+        result = analysis_cache.get(cache_scope, image_hash)
+        cache_hit = result is not None
+        if not cache_hit:
+            result = _analyze_single_bowel_image(temp_file_path, api_key, model_url, model_name)
+            if result.get("状态") == "成功":
+                analysis_cache.put(cache_scope, image_hash, result)
 
         # 清理临时文件
         try:
@@ -56,7 +66,8 @@ def process_pure_bowel(image_files: List[bytes], api_key: str, model_url: str, m
                 "quantity": result.get("份量", "未知"),
                 "shape": result.get("形态", "未知"),
                 "health_comment": result.get("健康点评", ""),
-                "analysis_basis": result.get("分析依据", "")
+                "analysis_basis": result.get("分析依据", ""),
+                "cache_hit": cache_hit
             }
         else:
             error_msg = result.get("错误信息", "未知错误")
@@ -79,10 +90,7 @@ def _analyze_single_bowel_image(image_path: str, api_key: str, model_url: str =
     """
     try:
         prompt = get_prompt_bowel_single_image_analysis()
-        response = get_vl_llm_answer(prompt, image_path, api_key, model_url, model_name)
-
-        # 解析JSON响应
-        result = parse_json_result(response)
+        result = get_structured_llm_answer(prompt, "bowel", api_key, model_url, model_name, image_path=image_path)
 
         if result and "颜色" in result:
             return {
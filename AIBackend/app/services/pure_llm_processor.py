@@ -7,8 +7,11 @@ from typing import List, Dict, Any
 import tempfile
 import os
 
-from ..utils.llm_helper import get_llm_answer, get_vl_llm_answer, parse_json_result
+from ..utils.llm_helper import get_structured_llm_answer
 from ..utils.prompt_helper import get_prompt_single_image_analysis, get_prompt_multi_image_analysis
+from ..utils.image_utils import compute_dhash
+from ..utils.prompt_registry import prompt_registry
+from .analysis_cache import analysis_cache
 
 
 def process_pure_llm(image_files: List[bytes], api_key: str, model_url: str, model_name: str) -> Dict[str, Any]:
@@ -38,11 +41,21 @@ def process_pure_llm(image_files: List[bytes], api_key: str, model_url: str, mod
             temp_files.append(temp_file.name)
             temp_file.close()
 
-        # 单张图片进行推理
+        # 单张图片进行推理，视觉上相同的图片直接复用历史分析结果
+        cache_scope = ("pure_llm", prompt_registry.cache_key("single_image_analysis"), model_url, model_name)
         single_results = []
+        cache_hits = 0
         for i, file_path in enumerate(temp_files):
-            result = _analyze_single_image_calories(file_path, api_key, model_url, model_name)
+            image_hash = compute_dhash(image_files[i])
+            result = analysis_cache.get(cache_scope, image_hash)
+            if result is not None:
+                cache_hits += 1
+            else:
+                result = _analyze_single_image_calories(file_path, api_key, model_url, model_name)
+                if result.get("状态") == "成功":
+                    analysis_cache.put(cache_scope, image_hash, result)
             single_results.append(result)
+        cache_hit = cache_hits == len(temp_files)
 
         # 筛选出有效的结果
         single_useful_results = []
@@ -72,7 +85,8 @@ def process_pure_llm(image_files: List[bytes], api_key: str, model_url: str, mod
             return {
                 "food_name": food_name,
                 "calories": calories,  # float类型，单位大卡
-                "estimation_basis": reason
+                "estimation_basis": reason,
+                "cache_hit": cache_hit
             }
         else:
             # 多张图片的情况，综合分析
@@ -85,7 +99,8 @@ def process_pure_llm(image_files: List[bytes], api_key: str, model_url: str, mod
                 return {
                     "food_name": food_name,
                     "calories": total_calories,  # float类型，单位大卡
-                    "estimation_basis": total_reason
+                    "estimation_basis": total_reason,
+                    "cache_hit": cache_hit
                 }
             else:
                 error_msg = result.get("错误信息", "未知错误")
@@ -108,10 +123,7 @@ def _analyze_single_image_calories(image_path: str, api_key: str, model_url: str
     """
     try:
         prompt = get_prompt_single_image_analysis()
-        response = get_vl_llm_answer(prompt, image_path, api_key, model_url, model_name)
-
-        # 解析JSON响应
-        result = parse_json_result(response)
+        result = get_structured_llm_answer(prompt, "single_image", api_key, model_url, model_name, image_path=image_path)
 
         if result and "热量" in result:
             return {
@@ -141,10 +153,7 @@ def _summarize_multi_image_calories(single_results: List[tuple], api_key: str, m
     """
     try:
         prompt = get_prompt_multi_image_analysis(single_results)
-        response = get_llm_answer(prompt, api_key, model_url, model_name)
-
-        # 解析JSON响应
-        result = parse_json_result(response)
+        result = get_structured_llm_answer(prompt, "multi_image", api_key, model_url, model_name)
 
         if result and "热量" in result:
             return {"状态": "成功", "食物名称": result.get("食物名称", "多种食物"), "热量": result["热量"], "估算依据": result.get("估算依据", "")}
@@ -3,7 +3,7 @@
 """
 
 import io
-from PIL import Image
+from PIL import Image, ImageOps
 import base64
 from typing import Optional
 
@@ -106,3 +106,47 @@ def get_image_info(image_bytes: bytes) -> Optional[dict]:
     except Exception as e:
         print(f"获取图片信息失败: {e}")
         return None
+
+def compute_dhash(image_bytes: bytes, hash_size: int = 8) -> Optional[int]:
+    """
+    计算图片的差异哈希（dHash）
+
+    对重新压缩、base64往返、轻微裁剪/缩放后的同一张图片，哈希值的汉明距离很小，
+    可用于近似重复图片检测
+
+    Args:
+        image_bytes: 图片字节流
+        hash_size: 哈希边长，结果位数为 hash_size * hash_size
+
+    Returns:
+        整数形式的哈希值，图片无法解析时返回None
+    """
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        # 按EXIF方向摆正，避免同一张照片因方向标记不同而哈希不一致
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+        pixels = list(image.getdata())
+
+        value = 0
+        for row in range(hash_size):
+            offset = row * (hash_size + 1)
+            for col in range(hash_size):
+                value = (value << 1) | (1 if pixels[offset + col] > pixels[offset + col + 1] else 0)
+        return value
+    except Exception as e:
+        print(f"计算图片哈希失败: {e}")
+        return None
+
+def hamming_distance(hash_a: int, hash_b: int) -> int:
+    """
+    计算两个哈希值之间的汉明距离
+
+    Args:
+        hash_a: 哈希值
+        hash_b: 哈希值
+
+    Returns:
+        不同的位数
+    """
+    return bin(hash_a ^ hash_b).count("1")
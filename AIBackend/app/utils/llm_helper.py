@@ -5,6 +5,7 @@ LLM助手模块
 
 import json
 from typing import List, Dict, Optional, Any
+from threading import Lock
 import openai
 import base64
 import tempfile
@@ -12,8 +13,64 @@ import os
 
 # 导入prompt_helper（使用相对导入）
 from ..utils.prompt_helper import extract_json_from_string
+from ..utils.response_parser import parse_json_text, parse_structured_response
+from ..utils.usage_tracker import TokenBudgetExceeded, select_model, record_completion, record_image_bytes
 
-def get_llm_answer(prompt: str, api_key: str, model_url: str = None, model_name: str = None) -> str:
+# 不支持 response_format 的 (模型地址, 模型名称)，首次被拒绝后不再尝试JSON模式
+_json_mode_unsupported = set()
+_json_mode_lock = Lock()
+
+def _is_response_format_error(error: "openai.BadRequestError") -> bool:
+    """400错误是否因服务端不支持 response_format 引起（其他400如图片过大、内容审核不应关闭JSON模式）"""
+    if getattr(error, "param", None) == "response_format":
+        return True
+    message = str(getattr(error, "message", "") or error).lower()
+    return any(keyword in message for keyword in ("response_format", "json_object", "json mode"))
+
+def _create_completion(client: openai.OpenAI, messages: List[Dict], model_url: str = None, model_name: str = None, json_mode: bool = False):
+    """
+    发起对话补全请求，json_mode 为 True 且服务端支持时要求返回JSON对象
+
+    调用前按当前请求的token预算选择模型（接近预算时切换降级模型，超出预算时抛出
+    TokenBudgetExceeded），调用后记录本次补全的token用量。
+
+    Args:
+        client: OpenAI客户端
+        messages: 消息列表
+        model_url: 模型URL
+        model_name: 模型名称
+        json_mode: 是否启用JSON模式
+
+    Returns:
+        补全响应
+    """
+    model_name = select_model(model_name)
+    provider = (model_url, model_name)
+    if json_mode and provider not in _json_mode_unsupported:
+        try:
+            response = client.chat.completions.create(
+                model=model_name,
+                messages=messages,
+                response_format={"type": "json_object"}
+            )
+            record_completion(response)
+            return response
+        except openai.BadRequestError as e:
+            # 只有服务端不支持 response_format 时才记录并退回普通模式
+            if not _is_response_format_error(e):
+                raise
+            print(f"[LLMHelper] JSON mode rejected by {model_url} ({model_name}), falling back: {e}")
+            with _json_mode_lock:
+                _json_mode_unsupported.add(provider)
+
+    response = client.chat.completions.create(
+        model=model_name,
+        messages=messages
+    )
+    record_completion(response)
+    return response
+
+def get_llm_answer(prompt: str, api_key: str, model_url: str = None, model_name: str = None, json_mode: bool = False) -> str:
     """
     获取纯文本LLM回答
 
@@ -22,6 +79,7 @@ def get_llm_answer(prompt: str, api_key: str, model_url: str = None, model_name:
         api_key: API密钥
         model_url: 模型URL（可选）
         model_name: 模型名称（可选）
+        json_mode: 是否要求模型返回JSON对象（可选）
 
     Returns:
         LLM响应文本
@@ -34,16 +92,16 @@ def get_llm_answer(prompt: str, api_key: str, model_url: str = None, model_name:
 
         messages = [{"role": "user", "content": prompt}]
 
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=messages
-        )
+        response = _create_completion(client, messages, model_url, model_name, json_mode)
         return response.choices[0].message.content
+    except TokenBudgetExceeded as e:
+        print(f"[LLMHelper] Text LLM request skipped: {e}")
+        return "API请求失败"
     except Exception as e:
         print(f"[LLMHelper] Text LLM request failed: {e}")
         return "API请求失败"
 
-def get_vl_llm_answer(prompt: str, image_path: str, api_key: str, model_url: str = None, model_name: str = None) -> str:
+def get_vl_llm_answer(prompt: str, image_path: str, api_key: str, model_url: str = None, model_name: str = None, json_mode: bool = False) -> str:
     """
     获取视觉语言模型回答
 
@@ -53,6 +111,7 @@ def get_vl_llm_answer(prompt: str, image_path: str, api_key: str, model_url: str
         api_key: API密钥
         model_url: 模型URL（可选）
         model_name: 模型名称（可选）
+        json_mode: 是否要求模型返回JSON对象（可选）
 
     Returns:
         视觉LLM响应文本
@@ -66,6 +125,7 @@ def get_vl_llm_answer(prompt: str, image_path: str, api_key: str, model_url: str
         # 读取图片并转换为base64
         with open(image_path, "rb") as f:
             img_base64 = base64.b64encode(f.read()).decode()
+        record_image_bytes(len(img_base64))
 
         messages = [{
             "role": "user",
@@ -75,11 +135,11 @@ def get_vl_llm_answer(prompt: str, image_path: str, api_key: str, model_url: str
             ]
         }]
 
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=messages
-        )
+        response = _create_completion(client, messages, model_url, model_name, json_mode)
         return response.choices[0].message.content
+    except TokenBudgetExceeded as e:
+        print(f"[LLMHelper] Vision LLM request skipped: {e}")
+        return "API请求失败"
     except Exception as e:
         print(f"[LLMHelper] Vision LLM request failed: {e}")
         return "API请求失败"
@@ -115,7 +175,7 @@ def get_vl_llm_answer_from_bytes(prompt: str, image_bytes: bytes, api_key: str,
 
 def parse_json_result(response: str) -> Dict[str, Any]:
     """
-    安全地解析JSON响应
+    安全地解析JSON响应，格式不规范时尝试修复
 
     Args:
         response: API响应字符串
@@ -123,20 +183,45 @@ def parse_json_result(response: str) -> Dict[str, Any]:
     Returns:
         解析后的字典对象
     """
-    try:
-        # 首先提取JSON字符串
-        json_str = extract_json_from_string(response)
-        if not json_str:
-            print(f"[LLMHelper] No JSON found in response: {response}")
-            return {}
-
-        # 然后解析为字典
-        result = json.loads(json_str)
-        return result if isinstance(result, dict) else {}
-
-    except json.JSONDecodeError as e:
-        print(f"[LLMHelper] JSON decode error: {e}, response: {response}")
-        return {}
-    except Exception as e:
-        print(f"[LLMHelper] JSON parse error: {e}, response: {response}")
-        return {}
\ No newline at end of file
+    result, errors = parse_json_text(response)
+    if errors:
+        print(f"[LLMHelper] JSON parse error: {'; '.join(errors)}, response: {response}")
+    return result
+
+def get_structured_llm_answer(prompt: str, schema_name: str, api_key: str, model_url: str = None, model_name: str = None, image_path: str = None, max_retries: int = 1) -> Dict[str, Any]:
+    """
+    获取并校验结构化的LLM回答
+
+    启用JSON模式请求模型，按 schema_name 对应的结构校验响应；
+    解析或校验失败时仅重试本次调用，并在提示词中附上失败原因。
+
+    Args:
+        prompt: 提示词
+        schema_name: 响应结构名称（single_image/multi_image/nutrition/portion/bowel）
+        api_key: API密钥
+        model_url: 模型URL（可选）
+        model_name: 模型名称（可选）
+        image_path: 图片路径，提供时使用视觉模型（可选）
+        max_retries: 失败后的最大重试次数
+
+    Returns:
+        校验通过的字典，全部尝试失败时返回空字典
+    """
+    current_prompt = prompt
+    for attempt in range(max_retries + 1):
+        if image_path:
+            response = get_vl_llm_answer(current_prompt, image_path, api_key, model_url, model_name, json_mode=True)
+        else:
+            response = get_llm_answer(current_prompt, api_key, model_url, model_name, json_mode=True)
+
+        result, errors = parse_structured_response(response, schema_name)
+        if not errors:
+            return result
+
+        print(f"[LLMHelper] Structured response invalid ({schema_name}, attempt {attempt + 1}): {'; '.join(errors)}")
+        current_prompt = (
+            f"{prompt}\n\n上一次的输出不符合要求（{'；'.join(errors)}），"
+            f"请严格按照要求的字段输出标准JSON。"
+        )
+
+    return {}
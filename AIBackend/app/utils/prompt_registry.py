@@ -0,0 +1,414 @@
+"""
+提示词注册表
+启动时一次性构建所有提示词模板，提供稳定的ID和版本哈希
+
+每个模板由静态部分和动态部分组成：静态部分（任务说明、规则、输出格式）
+在前且对同一版本逐字节不变，便于服务端前缀/提示词缓存命中；
+动态部分（OCR文本、图片描述、分析结果等）追加在末尾。
+
+本模块仅依赖标准库，AIBackend 与 GradioProject 共用同一份模板。
+"""
+
+import hashlib
+from typing import Dict
+
+
+class PromptTemplate:
+    """预编译的提示词模板"""
+
+    def __init__(self, prompt_id: str, static: str, dynamic: str = ""):
+        """
+        Args:
+            prompt_id: 稳定的提示词ID
+            static: 静态部分，原样输出
+            dynamic: 动态部分，使用 str.format 占位符
+        """
+        self.prompt_id = prompt_id
+        self.static = static
+        self.dynamic = dynamic
+        self.version = hashlib.sha256(f"{static}\x00{dynamic}".encode("utf-8")).hexdigest()[:12]
+
+    @property
+    def cache_key(self) -> str:
+        """提示词缓存键，模板内容变化时随之变化"""
+        return f"{self.prompt_id}@{self.version}"
+
+    def render(self, **kwargs) -> str:
+        """
+        渲染提示词
+
+        Args:
+            **kwargs: 动态部分的占位符取值
+
+        Returns:
+            完整提示词
+        """
+        if not self.dynamic:
+            return self.static
+        return self.static + self.dynamic.format(**kwargs)
+
+
+class PromptRegistry:
+    """提示词注册表"""
+
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+
+    def register(self, prompt_id: str, static: str, dynamic: str = "") -> PromptTemplate:
+        if prompt_id in self._templates:
+            raise ValueError(f"提示词ID重复: {prompt_id}")
+        template = PromptTemplate(prompt_id, static, dynamic)
+        self._templates[prompt_id] = template
+        return template
+
+    def get(self, prompt_id: str) -> PromptTemplate:
+        return self._templates[prompt_id]
+
+    def render(self, prompt_id: str, **kwargs) -> str:
+        return self._templates[prompt_id].render(**kwargs)
+
+    def cache_key(self, prompt_id: str) -> str:
+        return self._templates[prompt_id].cache_key
+
+    def versions(self) -> Dict[str, str]:
+        """获取所有提示词的版本哈希"""
+        return {prompt_id: template.version for prompt_id, template in self._templates.items()}
+
+
+JSON_RULES = """规则如下：
+1. 输出必须为标准JSON格式，所有key都用双引号包裹，不能有语法错误。
+2. 使用```json包裹输出内容。
+3. 不要在输出的json中增加注释。"""
+
+
+def _build_registry() -> PromptRegistry:
+    registry = PromptRegistry()
+
+    example_response = {
+        "是否包含份量信息": "bool，图片中是否包含食物的份量信息",
+        "份量类型": "str，'重量'或'体积'，如果没有份量信息则为'未知'",
+        "说明": "str，判断依据和相关说明"
+    }
+    registry.register("portion_check", f"""请仔细观察图片，判断其中是否包含食物的份量信息（如重量、体积等）。请将分析结果以JSON格式返回。
+
+规则说明：
+1. 食品包装上标注的净含量、规格、净重等都属于份量信息
+2. 常见的重量单位包括：g/克、kg/千克、mg/毫克等
+3. 常见的体积单位包括：ml/毫升、L/升等
+
+注意事项：
+1. 仅判断份量信息是否存在，不需要读取具体数值
+2. 输出必须为标准JSON格式，所有key都用双引号包裹
+3. 使用```json包裹输出内容
+4. 不要在输出的json中增加注释
+
+输出格式示例：
+{example_response}
+""")
+
+    example_dict = {
+        "是否包含份量信息": "int，1表示包含，0表示不包含",
+        "份量类型": "str，'重量'表示克/千克，'体积'表示毫升/升，'未知'表示无法确定",
+        "解释": "str，说明判断依据"
+    }
+    registry.register("portion_presence_check", f"""请判断图片中是否包含食物的份量信息。份量信息可能以下列形式出现：
+1. 重量单位：克(g)、千克(kg)等
+2. 体积单位：毫升(ml/mL)、升(L)等
+3. 净含量标注
+4. 规格信息
+
+请以JSON格式回复，格式要求如下：
+{example_dict}
+
+例如：
+{{
+    "是否包含份量信息": 1,
+    "份量类型": "体积",
+    "解释": "图片中显示饮料容量为500ml"
+}}""")
+
+    example_response = {
+        "食物名称": "str, 食物的名称",
+        "份量数值": "float, 转换后的数值",
+        "份量单位": "str, 统一后的单位(g或ml)",
+        "原始数值": "float, 原始标注的数值",
+        "原始单位": "str, 原始标注的单位(g/kg/ml/L等)",
+        "份量类型": "str, 重量/体积",
+        "置信度": "str, 高/中/低，表示对份量识别的确信程度",
+        "说明": "str, 解释份量判断的依据"
+    }
+    registry.register("portion_analysis", f"""请分析文末文本中包含的食物份量信息。
+
+请注意：
+1. 如果是重量单位：
+   - 克(g)保持不变
+   - 千克(kg)转换为克(g)
+2. 如果是体积单位：
+   - 毫升(ml/mL)保持不变
+   - 升(L)转换为毫升(ml)
+3. 如果有多个份量信息，请选择最可能是单份食物的份量
+4. 如果不确定，请在说明中注明原因
+
+请以JSON格式返回结果，格式示例：
+{example_response}
+
+""", "文本内容：\n{ocr_text}")
+
+    example_dict = {
+        "是否包含重量信息": "int，1表示包含，0表示不包含",
+        "解释": "str，说明判断依据"
+    }
+    registry.register("weight_check", f"""请判断图片中是否包含食物的重量信息。重量信息可能以克(g)、千克(kg)等单位表示。
+
+请以JSON格式回复，格式要求如下：
+{example_dict}
+
+例如：
+{{
+    "是否包含重量信息": 1,
+    "解释": "图片中显示食物重量为250g"
+}}""")
+
+    example_response = {
+        "食物名称": "str, 食物的名称",
+        "重量": "float, 统一转换为克(g)的重量",
+        "原始单位": "str, 原始标注的单位(g/kg等)",
+        "置信度": "str, 高/中/低，表示对重量识别的确信程度",
+        "说明": "str, 解释重量判断的依据"
+    }
+    registry.register("weight_analysis", f"""请分析文末文本中包含的食物重量信息。
+
+请注意：
+1. 重量需要统一转换为克(g)
+2. 如果看到千克(kg)，请转换为克
+3. 如果有多个重量信息，请选择最可能是单份食物的重量
+4. 如果不确定，请在说明中注明原因
+
+请以JSON格式返回结果，格式示例：
+{example_response}
+
+""", "文本内容：\n{ocr_text}")
+
+    example_response = {
+        "能量": "str，每单位含有的能量，例如1000千焦、300大卡",
+        "蛋白质": "str，每单位含有的蛋白质，例如20克、15克",
+        "脂肪": "str，每单位含有的脂肪，例如10克、5克",
+        "碳水化合物": "str，每单位含有的碳水化合物，例如30克、25克",
+        "钠": "str，每单位含有的钠含量，例如200毫克、150毫克",
+        "单位": "str，营养表中数值对应的份数，例如100g，100ml，每份"
+    }
+    registry.register("nutrition_analysis", f"""请分析文末营养成分表的文本内容，提取关键营养信息。请将结果以JSON格式返回。
+
+请注意：
+1. 输出必须为标准JSON格式，所有key都用双引号包裹，不能有语法错误。
+2. 使用```json包裹输出内容。
+3. 不要在输出的json中增加注释。
+
+期望的返回格式示例：
+{example_response}
+
+""", "OCR识别文本内容：\n{ocr_text}\n")
+
+    example_dict = {
+        "是否包含营养成分表": "int，1表示包含，0表示不包含",
+        "原因": "str，简要说明"
+    }
+    registry.register("nutrition_table_check", f"""
+请判断图片中是否包含完整的营养成分表。
+
+{JSON_RULES}
+
+输出要求为json：
+{example_dict}
+""")
+
+    example_dict = {
+        "是否包含净含量信息": "int,1表示包含，0表示不包含",
+        "原因": "str，简要说明"
+    }
+    registry.register("net_content_check", f"""
+请判断图片中是否包含完整的净含量信息。
+
+{JSON_RULES}
+
+输出要求为json：
+{example_dict}
+""")
+
+    example_dict = {
+        "能量": "float，单位kcal，只返回数字",
+        "原文": "str，能量字段的原始文本"
+    }
+    registry.register("nutrition_energy", f"""
+请从以下营养成分表文本中提取能量信息。
+
+{JSON_RULES}
+
+输出要求为json：
+{example_dict}
+
+""", "营养成分表文本如下：\n{nutrition_text}\n")
+
+    example_dict = {
+        "净含量": "float，单位g，只返回数字",
+        "原文": "str，净含量字段的原始文本"
+    }
+    registry.register("nutrition_net_content", f"""
+请从以下文本中提取净含量信息。
+
+{JSON_RULES}
+
+输出要求为json：
+{example_dict}
+
+""", "净含量文本如下：\n{net_content_text}\n")
+
+    example_dict = {
+        "热量": "float，单位大卡，只返回数字",
+        "估算依据": "str，估算理由简述"
+    }
+    registry.register("nutrition_estimate", f"""
+请根据图片内容估算食物热量。
+
+{JSON_RULES}
+
+输出要求为json：
+{example_dict}
+
+""", "图片内容描述如下：\n{img_desc}\n")
+
+    example_dict = {
+        "总热量": "float，计算出的总热量，单位大卡",
+        "计算过程": "str，详细的计算步骤说明",
+        "数据来源": "str，说明使用的原始数据"
+    }
+    registry.register("nutrition_calculate", f"""
+请根据文末的营养信息计算食物的总热量。
+
+请进行准确的热量计算，计算公式为：总热量 = (能量密度 × 净含量) / 100
+
+{JSON_RULES}
+4. 计算过程要详细说明每一步。
+
+输出要求为json：
+{example_dict}
+
+""", "能量信息：{energy} kcal/100g\n净含量信息：{net_content} g\n")
+    registry.register("nutrition_calculate_energy_only", f"""
+请根据文末的营养信息分析食物热量。
+
+由于没有净含量信息，请分析这个能量值可能代表的含义（每100g、每份、每包装等），并给出合理的热量估算。
+
+{JSON_RULES}
+4. 计算过程要详细说明分析思路。
+
+输出要求为json：
+{example_dict}
+
+""", "能量信息：{energy} kcal（单位待确认）\n")
+
+    example_dict = {
+        "食物名称": "str，识别出的食物名称",
+        "热量": "float，估算的热量值，单位大卡",
+        "估算依据": "str，详细的估算理由和分析过程"
+    }
+    registry.register("single_image_analysis", f"""
+请根据图片内容详细分析食物的热量。
+
+分析要求：
+1. 识别图片中的食物类型、分量、重量等信息
+2. 根据食物的营养密度、烹饪方式、分量大小等因素进行热量估算
+3. 如果图片包含营养成分表，优先使用营养成分表信息计算
+4. 如果图片包含净含量信息，结合净含量进行准确计算
+5. 提供详细的估算依据和分析过程
+6. 热量信息需要带单位，通常为千焦或大卡，也可以是其他的单位
+
+规则如下：
+1. 输出必须为标准JSON格式，所有key都用双引号包裹，不能有语法错误。
+2. 使用```json```包裹输出内容。
+3. 不要在输出的json中增加注释。
+4. 估算依据要详细说明分析思路和计算过程。
+
+输出要求为json：
+{example_dict}
+""")
+
+    example_dict = {
+        "食物名称": "str，综合分析后的食物名称",
+        "热量": "float，综合分析后的热量，单位大卡",
+        "估算依据": "str，综合分析的理由和计算过程"
+    }
+    registry.register("multi_image_analysis", f"""
+请基于文末多张图片的分析结果，给出该食物的综合热量估算。
+
+综合分析要求：
+1. 这些图片都在描述同一个食物的不同角度或信息
+2. 需要综合考虑所有图片的信息，避免重复计算
+3. 如果有营养成分表信息，优先使用最准确的数据
+4. 如果有分量或包装信息，结合实际情况计算
+5. 给出最终的综合热量估算和详细的分析依据
+
+规则如下：
+1. 输出必须为标准JSON格式，所有key都用双引号包裹，不能有语法错误。
+2. 使用```json```包裹输出内容。
+3. 不要在输出的json中增加注释。
+4. 估算依据要详细说明综合分析的思路和计算过程。
+
+输出要求为json：
+{example_dict}
+
+""", "多张图片分析结果：\n{results_text}")
+
+    example_dict = {
+        "颜色": "str，粪便的具体颜色，如黄褐色、深褐色、黑色、红色等",
+        "份量": "str，粪便的份量，选项：少/适中/多",
+        "形态": "str，粪便的形态，选项：颗粒型/糊状/条状/块状/水样",
+        "健康点评": "str，对肠道健康的综合点评和建议",
+        "分析依据": "str，详细的分析理由和依据"
+    }
+    registry.register("bowel_single_image_analysis", f"""
+请根据图片内容详细分析粪便的各项特征。
+
+分析要求：
+1. 仔细观察粪便的颜色、份量大小、形态形状等特征
+2. 根据粪便的外观特征进行客观描述
+3. 提供专业的健康点评和建议
+4. 详细说明分析的依据和判断过程
+
+颜色选项示例：
+- 黄褐色：正常健康粪便的常见颜色
+- 深褐色：可能与饮食习惯或肠道菌群有关
+- 黑色：可能与铁剂补充或消化道出血有关
+- 红色：可能与下消化道出血有关
+- 灰白色：可能与胆道问题有关
+- 绿色：可能与饮食或肠道感染有关
+
+份量选项：
+- 少：粪便量明显偏少，可能便秘或饮食不足
+- 适中：粪便量正常，约每日100-250g
+- 多：粪便量偏多，可能腹泻或消化不良
+
+形态选项：
+- 颗粒型：干燥、硬块状，可能严重便秘
+- 糊状：软烂、糊状，可能消化不良
+- 条状：正常香肠状或蛇形，健康状态良好
+- 块状：成块、不规则，可能便秘初期
+- 水样：稀薄如水，可能严重腹泻或感染
+
+规则如下：
+1. 输出必须为标准JSON格式，所有key都用双引号包裹，不能有语法错误。
+2. 使用```json```包裹输出内容。
+3. 不要在输出的json中增加注释。
+4. 严格按照给定的选项填写颜色、份量、形态字段。
+5. 健康点评要专业、客观，提供合理建议。
+6. 分析依据要详细说明观察到的特征和判断依据。
+
+输出要求为json：
+{example_dict}
+""")
+
+    return registry
+
+
+# 全局提示词注册表，模块导入时构建一次
+prompt_registry = _build_registry()
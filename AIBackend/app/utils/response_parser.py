@@ -0,0 +1,222 @@
+"""
+大模型结构化响应解析
+提取、修复并按提示词类型校验模型返回的JSON
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Tuple
+
+from .prompt_helper import extract_json_from_string
+
+NUMBER = "number"  # 数值字段，允许可解析为数字的字符串
+TEXT = "text"      # 文本字段，允许数字（统一转为字符串）
+FLAG = "flag"      # 布尔字段，允许 true/false、0/1、"是"/"否"
+
+# 各提示词对应的响应结构：fields 为字段类型，required 为必填字段
+RESPONSE_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "single_image": {
+        "fields": {"食物名称": TEXT, "热量": NUMBER, "估算依据": TEXT},
+        "required": ["热量"],
+    },
+    "multi_image": {
+        "fields": {"食物名称": TEXT, "热量": NUMBER, "估算依据": TEXT},
+        "required": ["热量"],
+    },
+    "nutrition": {
+        "fields": {"能量": TEXT, "蛋白质": TEXT, "脂肪": TEXT, "碳水化合物": TEXT, "钠": TEXT, "单位": TEXT},
+        "required": ["能量"],
+    },
+    "portion": {
+        "fields": {
+            "食物名称": TEXT, "份量数值": NUMBER, "份量单位": TEXT, "原始数值": TEXT,
+            "原始单位": TEXT, "份量类型": TEXT, "置信度": TEXT, "说明": TEXT
+        },
+        "required": ["份量数值"],
+    },
+    "bowel": {
+        "fields": {"颜色": TEXT, "份量": TEXT, "形态": TEXT, "健康点评": TEXT, "分析依据": TEXT},
+        "required": ["颜色", "份量", "形态"],
+    },
+}
+
+# JSON结构符号的全角写法
+_FULL_WIDTH_PUNCTUATION = {
+    "｛": "{", "｝": "}", "［": "[", "］": "]", "【": "[", "】": "]",
+    "：": ":", "，": ",", "、": ",",
+}
+# 字符串定界符：开引号 -> 闭引号
+_QUOTES = {'"': '"', "“": "”", "”": "”", "'": "'", "‘": "’"}
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_WORD = re.compile(r"[A-Za-z_]+")
+_NUMBER_PATTERN = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def repair_json_text(text: str) -> str:
+    """
+    修复模型输出中常见的JSON格式问题
+
+    仅处理字符串之外的结构部分：全角标点、中文/单引号定界符、
+    Python字面量（True/False/None）、注释以及末尾多余的逗号。
+    字符串内部的内容（包括中文标点）保持不变。
+
+    Args:
+        text: 原始JSON文本
+
+    Returns:
+        修复后的JSON文本
+    """
+    output = []
+    i = 0
+    length = len(text)
+    while i < length:
+        char = text[i]
+
+        if char in _QUOTES:
+            # 读取完整字符串，统一输出为双引号字符串
+            closing = _QUOTES[char]
+            i += 1
+            content = []
+            while i < length and text[i] != closing:
+                if text[i] == "\\" and i + 1 < length:
+                    content.append(text[i:i + 2])
+                    i += 2
+                    continue
+                content.append('\\"' if text[i] == '"' else text[i])
+                i += 1
+            output.append('"' + "".join(content) + '"')
+            i += 1
+            continue
+
+        if text.startswith("//", i):
+            newline = text.find("\n", i)
+            i = length if newline == -1 else newline
+            continue
+
+        if text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = length if end == -1 else end + 2
+            continue
+
+        word = _WORD.match(text, i)
+        if word:
+            output.append(_LITERALS.get(word.group(0), word.group(0)))
+            i += len(word.group(0))
+            continue
+
+        output.append(_FULL_WIDTH_PUNCTUATION.get(char, char))
+        i += 1
+
+    return _TRAILING_COMMA.sub(r"\1", "".join(output))
+
+
+def _coerce(value: Any, field_type: str) -> Tuple[bool, Any]:
+    """按字段类型校验并转换取值，返回 (是否有效, 转换后的值)"""
+    if field_type == NUMBER:
+        if isinstance(value, bool):
+            return False, value
+        if isinstance(value, (int, float)):
+            return True, float(value)
+        if isinstance(value, str):
+            match = _NUMBER_PATTERN.fullmatch(value.strip())
+            # 带单位的字符串（如"300大卡"）原样保留，由调用方按需解析
+            return bool(value.strip()), float(match.group(0)) if match else value
+        return False, value
+
+    if field_type == TEXT:
+        if isinstance(value, str):
+            return True, value
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return True, str(value)
+        return False, value
+
+    if field_type == FLAG:
+        if isinstance(value, bool):
+            return True, value
+        if isinstance(value, (int, float)) and value in (0, 1):
+            return True, bool(value)
+        if isinstance(value, str) and value.strip().lower() in ("true", "false", "1", "0", "是", "否"):
+            return True, value.strip().lower() in ("true", "1", "是")
+        return False, value
+
+    return True, value
+
+
+def validate_response(data: Dict[str, Any], schema_name: str) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    按提示词类型校验响应结构
+
+    Args:
+        data: 解析后的字典
+        schema_name: RESPONSE_SCHEMAS 中的结构名称
+
+    Returns:
+        (转换后的字典, 错误列表)，错误列表为空表示校验通过
+    """
+    schema = RESPONSE_SCHEMAS[schema_name]
+    errors = []
+    result = dict(data)
+
+    for field in schema["required"]:
+        if field not in result or result[field] in (None, ""):
+            errors.append(f"缺少字段: {field}")
+
+    for field, field_type in schema["fields"].items():
+        if field not in result or result[field] is None:
+            continue
+        valid, value = _coerce(result[field], field_type)
+        if valid:
+            result[field] = value
+        else:
+            errors.append(f"字段类型错误: {field}")
+
+    return result, errors
+
+
+def parse_json_text(text: str) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    从模型响应中提取并解析JSON对象，解析失败时尝试修复
+
+    Args:
+        text: 模型响应文本
+
+    Returns:
+        (解析后的字典, 错误列表)
+    """
+    text = text or ""
+    if "{" not in text:
+        # 整段使用全角括号时先还原，否则无法定位JSON
+        text = text.replace("｛", "{").replace("｝", "}")
+    json_str = extract_json_from_string(text)
+    if not json_str:
+        return {}, ["响应中未找到JSON"]
+
+    try:
+        result = json.loads(json_str)
+    except json.JSONDecodeError:
+        try:
+            result = json.loads(repair_json_text(json_str))
+        except json.JSONDecodeError as e:
+            return {}, [f"JSON格式错误: {e}"]
+
+    if not isinstance(result, dict):
+        return {}, ["JSON顶层不是对象"]
+    return result, []
+
+
+def parse_structured_response(text: str, schema_name: str) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    解析并校验模型响应
+
+    Args:
+        text: 模型响应文本
+        schema_name: RESPONSE_SCHEMAS 中的结构名称
+
+    Returns:
+        (转换后的字典, 错误列表)
+    """
+    result, errors = parse_json_text(text)
+    if errors:
+        return result, errors
+    return validate_response(result, schema_name)
@@ -0,0 +1,180 @@
+"""
+请求级用量统计与预算控制
+记录每次大模型调用的token用量和图片载荷大小，按请求、用户、端点汇总
+"""
+
+import os
+from collections import OrderedDict
+from contextvars import ContextVar
+from threading import Lock
+from typing import Any, Dict, Optional
+
+# 用量超过预算的该比例后，后续调用切换到降级模型（如果提供）
+DOWNGRADE_RATIO = 0.8
+
+# 按用户汇总时最多保留的用户数，超出后淘汰最久未调用的用户，可通过环境变量覆盖
+MAX_TRACKED_USERS = int(os.getenv("USAGE_MAX_TRACKED_USERS", "1000"))
+
+
+class TokenBudgetExceeded(Exception):
+    """请求的token用量已达到预算上限"""
+
+
+class RequestUsage:
+    """单次请求的用量"""
+
+    def __init__(self, endpoint: str, user_id: str = "", token_budget: Optional[int] = None, fallback_model_name: Optional[str] = None):
+        self.endpoint = endpoint
+        self.user_id = user_id or "anonymous"
+        self.token_budget = token_budget if token_budget and token_budget > 0 else None
+        self.fallback_model_name = fallback_model_name or None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.llm_calls = 0
+        self.image_bytes = 0
+        self.budget_exceeded = False
+        self.downgraded = False
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def select_model(self, model_name: str) -> str:
+        """
+        按预算选择本次调用使用的模型
+
+        Args:
+            model_name: 请求指定的模型名称
+
+        Returns:
+            实际使用的模型名称
+
+        Raises:
+            TokenBudgetExceeded: 用量已达到预算上限
+        """
+        if self.token_budget is None:
+            return model_name
+        if self.total_tokens >= self.token_budget:
+            self.budget_exceeded = True
+            raise TokenBudgetExceeded(f"请求token用量 {self.total_tokens} 已达到预算 {self.token_budget}")
+        if self.fallback_model_name and self.total_tokens >= self.token_budget * DOWNGRADE_RATIO:
+            self.downgraded = True
+            return self.fallback_model_name
+        return model_name
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "llm_calls": self.llm_calls,
+            "image_bytes": self.image_bytes,
+            "token_budget": self.token_budget,
+            "budget_exceeded": self.budget_exceeded,
+            "downgraded_model": self.fallback_model_name if self.downgraded else None,
+        }
+
+
+class UsageAggregator:
+    """按用户和端点累计用量，用户ID由客户端提供，按LRU最多保留 max_users 个用户"""
+
+    def __init__(self, max_users: int = MAX_TRACKED_USERS):
+        self.lock = Lock()
+        self.max_users = max(max_users, 1)
+        self.by_user: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+        self.by_endpoint: Dict[str, Dict[str, int]] = {}
+        self.evicted_users = 0
+
+    @staticmethod
+    def _add(bucket: Dict[str, int], usage: RequestUsage) -> None:
+        bucket["requests"] = bucket.get("requests", 0) + 1
+        bucket["llm_calls"] = bucket.get("llm_calls", 0) + usage.llm_calls
+        bucket["prompt_tokens"] = bucket.get("prompt_tokens", 0) + usage.prompt_tokens
+        bucket["completion_tokens"] = bucket.get("completion_tokens", 0) + usage.completion_tokens
+        bucket["image_bytes"] = bucket.get("image_bytes", 0) + usage.image_bytes
+
+    def add(self, usage: RequestUsage) -> None:
+        with self.lock:
+            self._add(self.by_user.setdefault(usage.user_id, {}), usage)
+            self.by_user.move_to_end(usage.user_id)
+            while len(self.by_user) > self.max_users:
+                self.by_user.popitem(last=False)
+                self.evicted_users += 1
+            self._add(self.by_endpoint.setdefault(usage.endpoint, {}), usage)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "by_user": {key: dict(value) for key, value in self.by_user.items()},
+                "by_endpoint": {key: dict(value) for key, value in self.by_endpoint.items()},
+                "evicted_users": self.evicted_users,
+            }
+
+
+_current_usage: ContextVar[Optional[RequestUsage]] = ContextVar("request_usage", default=None)
+
+# 全局用量汇总实例
+usage_aggregator = UsageAggregator()
+
+
+def start_request_usage(endpoint: str, user_id: str = "", token_budget: Optional[int] = None, fallback_model_name: Optional[str] = None) -> RequestUsage:
+    """
+    开始统计当前请求的用量
+
+    Args:
+        endpoint: 端点名称
+        user_id: 调用方用户ID（可选）
+        token_budget: 本次请求的token预算（可选）
+        fallback_model_name: 接近预算时切换的降级模型（可选）
+
+    Returns:
+        当前请求的用量对象
+    """
+    usage = RequestUsage(endpoint, user_id, token_budget, fallback_model_name)
+    _current_usage.set(usage)
+    return usage
+
+
+def current_usage() -> Optional[RequestUsage]:
+    """获取当前请求的用量对象，未开始统计时返回None"""
+    return _current_usage.get()
+
+
+def finish_request_usage() -> Optional[Dict[str, Any]]:
+    """
+    结束当前请求的用量统计并计入汇总
+
+    Returns:
+        当前请求的用量字典，未开始统计时返回None
+    """
+    usage = _current_usage.get()
+    if usage is None:
+        return None
+    _current_usage.set(None)
+    usage_aggregator.add(usage)
+    return usage.to_dict()
+
+
+def select_model(model_name: str) -> str:
+    """按当前请求的预算选择模型，未开始统计时原样返回"""
+    usage = _current_usage.get()
+    return usage.select_model(model_name) if usage else model_name
+
+
+def record_completion(response: Any) -> None:
+    """记录一次补全调用的token用量"""
+    usage = _current_usage.get()
+    if usage is None:
+        return
+    usage.llm_calls += 1
+    response_usage = getattr(response, "usage", None)
+    if response_usage is not None:
+        usage.prompt_tokens += getattr(response_usage, "prompt_tokens", 0) or 0
+        usage.completion_tokens += getattr(response_usage, "completion_tokens", 0) or 0
+
+
+def record_image_bytes(size: int) -> None:
+    """记录发送给模型的图片载荷大小"""
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.image_bytes += size
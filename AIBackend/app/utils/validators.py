@@ -2,6 +2,8 @@
 API请求验证器
 """
 
+from typing import Optional
+
 from fastapi import Form
 from app.models.schemas import EstimateRequest
 
@@ -10,11 +12,17 @@ def validate_estimate_request(
     method: str = Form(..., description="分析方法"),
     model_url: str = Form(..., description="模型API地址"),
     model_name: str = Form(..., description="模型名称"),
+    user_id: str = Form("", description="调用方用户ID"),
+    token_budget: Optional[int] = Form(None, description="本次请求的token预算"),
+    fallback_model_name: Optional[str] = Form(None, description="接近预算时切换的降级模型"),
 ) -> EstimateRequest:
     """验证估算请求参数"""
     return EstimateRequest(
         api_key=api_key,
         method=method,
         model_url=model_url,
-        model_name=model_name
+        model_name=model_name,
+        user_id=user_id,
+        token_budget=token_budget,
+        fallback_model_name=fallback_model_name
     )
\ No newline at end of file
@@ -0,0 +1,139 @@
+"""gallery image blobs
+
+Revision ID: 7b1e4d2a9c38
+Revises: 3f7a2c91d5e4
+Create Date: 2026-10-19 15:40:11.503287
+
+"""
+import base64
+import binascii
+import hashlib
+import os
+import tempfile
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b1e4d2a9c38'
+down_revision: Union[str, Sequence[str], None] = '3f7a2c91d5e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+gallery_shares = sa.table(
+    'gallery_shares',
+    sa.column('id', sa.Integer()),
+    sa.column('image_base64', sa.Text()),
+    sa.column('image_digest', sa.String(length=64)),
+)
+
+# 图片存储目录，与应用的 BLOB_STORE_DIR 配置一致；以下存储布局按本版本固定，不随应用代码变化
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", "data/blobs")
+
+
+def _blob_path(digest: str) -> str:
+    """<根目录>/<摘要前2位>/<摘要后续2位>/<摘要>"""
+    return os.path.join(BLOB_STORE_DIR, digest[:2], digest[2:4], digest)
+
+
+def _decode_image(data: str) -> Optional[bytes]:
+    """解码data URL或纯base64字符串，无法解码时返回None"""
+    if data.startswith("data:"):
+        _, _, data = data.partition(",")
+    try:
+        return base64.b64decode(data, validate=False)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def _put_blob(data: bytes) -> str:
+    """按 SHA-256 摘要保存图片（先写临时文件再原子重命名），返回摘要"""
+    digest = hashlib.sha256(data).hexdigest()
+    path = _blob_path(digest)
+    if os.path.exists(path):
+        return digest
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return digest
+
+
+def _content_type(head: bytes) -> str:
+    """根据文件头识别图片类型"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('gallery_shares', sa.Column('image_digest', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_gallery_shares_image_digest'), 'gallery_shares', ['image_digest'], unique=False)
+
+    # 将已有的base64图片写入图片存储，逐行处理避免一次性加载全部图片
+    connection = op.get_bind()
+    ids = connection.execute(
+        sa.select(gallery_shares.c.id).where(gallery_shares.c.image_base64.isnot(None))
+    ).scalars().all()
+    for share_id in ids:
+        image_base64 = connection.execute(
+            sa.select(gallery_shares.c.image_base64).where(gallery_shares.c.id == share_id)
+        ).scalar()
+        image_bytes = _decode_image(image_base64)
+        if image_bytes is None:
+            print(f"跳过无法解码的画廊图片: share_id={share_id}")
+            continue
+        if not image_bytes:
+            continue
+        connection.execute(
+            gallery_shares.update()
+            .where(gallery_shares.c.id == share_id)
+            .values(image_digest=_put_blob(image_bytes))
+        )
+
+    op.drop_column('gallery_shares', 'image_base64')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('gallery_shares', sa.Column('image_base64', sa.Text(), nullable=True))
+
+    # 从图片存储读回图片，恢复为data URL；图片文件保留在存储目录中
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(gallery_shares.c.id, gallery_shares.c.image_digest)
+        .where(gallery_shares.c.image_digest.isnot(None))
+    ).all()
+    for share_id, digest in rows:
+        try:
+            with open(_blob_path(digest), "rb") as f:
+                image_bytes = f.read()
+        except OSError:
+            print(f"画廊图片文件不存在: share_id={share_id}, digest={digest}")
+            continue
+        data_url = f"data:{_content_type(image_bytes[:16])};base64,{base64.b64encode(image_bytes).decode('ascii')}"
+        connection.execute(
+            gallery_shares.update()
+            .where(gallery_shares.c.id == share_id)
+            .values(image_base64=data_url)
+        )
+
+    op.drop_index(op.f('ix_gallery_shares_image_digest'), table_name='gallery_shares')
+    op.drop_column('gallery_shares', 'image_digest')
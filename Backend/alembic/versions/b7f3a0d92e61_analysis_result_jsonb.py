@@ -0,0 +1,93 @@
+"""analysis_result jsonb
+
+Revision ID: b7f3a0d92e61
+Revises: e2d8b5c61f94
+Create Date: 2026-10-19 19:03:52.281944
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7f3a0d92e61'
+down_revision: Union[str, Sequence[str], None] = 'e2d8b5c61f94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 汇总使用的时区，与应用的 ROLLUP_TIMEZONE 配置一致
+ROLLUP_TIMEZONE = os.getenv("ROLLUP_TIMEZONE", "Asia/Shanghai")
+
+CALORIES_EXPRESSION = (
+    "CASE jsonb_typeof(analysis_result -> 'calories') "
+    "WHEN 'number' THEN CASE WHEN (analysis_result ->> 'calories')::double precision >= 0 "
+    "THEN (analysis_result ->> 'calories')::double precision END "
+    "WHEN 'string' THEN substring(replace(analysis_result ->> 'calories', ',', '') "
+    "FROM '[0-9]+(?:[.][0-9]+)?')::double precision END"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 已有数据中不是合法JSON的文本保存为JSON字符串
+    op.execute(
+        "CREATE FUNCTION pg_temp.analysis_result_to_jsonb(value text) RETURNS jsonb AS $$ "
+        "BEGIN RETURN value::jsonb; "
+        "EXCEPTION WHEN others THEN RETURN to_jsonb(value); END; "
+        "$$ LANGUAGE plpgsql"
+    )
+    for table in ('diet_records', 'gallery_shares'):
+        op.alter_column(
+            table, 'analysis_result',
+            existing_type=sa.Text(),
+            type_=postgresql.JSONB(astext_type=sa.Text()),
+            postgresql_using='pg_temp.analysis_result_to_jsonb(analysis_result)'
+        )
+
+    # 热量改为由数据库从分析结果生成
+    op.drop_column('diet_records', 'calories')
+    op.add_column('diet_records', sa.Column('calories', sa.Float(), sa.Computed(CALORIES_EXPRESSION, persisted=True), nullable=True))
+    op.add_column('diet_records', sa.Column('food_name', sa.Text(), sa.Computed("analysis_result ->> 'food_name'", persisted=True), nullable=True))
+
+    op.create_index('ix_diet_records_user_id_calories_id', 'diet_records', ['user_id', 'calories', 'id'], unique=False)
+    op.create_index('ix_diet_records_user_id_food_name', 'diet_records', ['user_id', 'food_name'], unique=False, postgresql_ops={'food_name': 'text_pattern_ops'})
+    op.create_index('ix_diet_records_analysis_result', 'diet_records', ['analysis_result'], unique=False, postgresql_using='gin', postgresql_ops={'analysis_result': 'jsonb_path_ops'})
+    op.create_index('ix_gallery_shares_analysis_result', 'gallery_shares', ['analysis_result'], unique=False, postgresql_using='gin', postgresql_ops={'analysis_result': 'jsonb_path_ops'})
+
+    # 按生成列重建每日汇总，保证与之后的增量更新一致
+    op.execute("DELETE FROM daily_nutrition_rollups")
+    op.get_bind().execute(
+        sa.text(
+            "INSERT INTO daily_nutrition_rollups (user_id, day, calories, record_count) "
+            "SELECT user_id, (created_at AT TIME ZONE :tz)::date, COALESCE(SUM(calories), 0), COUNT(*) "
+            "FROM diet_records WHERE user_id IS NOT NULL AND created_at IS NOT NULL "
+            "GROUP BY 1, 2"
+        ),
+        {"tz": ROLLUP_TIMEZONE}
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_gallery_shares_analysis_result', table_name='gallery_shares', postgresql_using='gin')
+    op.drop_index('ix_diet_records_analysis_result', table_name='diet_records', postgresql_using='gin')
+    op.drop_index('ix_diet_records_user_id_food_name', table_name='diet_records')
+    op.drop_index('ix_diet_records_user_id_calories_id', table_name='diet_records')
+
+    op.drop_column('diet_records', 'food_name')
+    # 保留已提取的热量，恢复为普通列
+    op.execute("ALTER TABLE diet_records ALTER COLUMN calories DROP EXPRESSION")
+
+    for table in ('diet_records', 'gallery_shares'):
+        op.alter_column(
+            table, 'analysis_result',
+            existing_type=postgresql.JSONB(astext_type=sa.Text()),
+            type_=sa.Text(),
+            postgresql_using="CASE jsonb_typeof(analysis_result) WHEN 'string' "
+                             "THEN analysis_result #>> '{}' ELSE analysis_result::text END"
+        )
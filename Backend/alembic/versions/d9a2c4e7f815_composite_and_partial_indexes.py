@@ -0,0 +1,41 @@
+"""composite and partial indexes
+
+Revision ID: d9a2c4e7f815
+Revises: c3e5f8a1d047
+Create Date: 2026-10-19 21:08:44.305712
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a2c4e7f815'
+down_revision: Union[str, Sequence[str], None] = 'c3e5f8a1d047'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 在线建索引不能在事务中执行，建索引期间不阻塞对表的写入
+    with op.get_context().autocommit_block():
+        op.create_index('ix_sessions_active_user_id_expires_at', 'sessions', ['user_id', 'expires_at'], unique=False,
+                        postgresql_where=sa.text('is_active = 1'), postgresql_concurrently=True)
+        op.create_index('ix_sessions_active_expires_at', 'sessions', ['expires_at'], unique=False,
+                        postgresql_where=sa.text('is_active = 1'), postgresql_concurrently=True)
+        op.create_index('ix_sessions_inactive_id', 'sessions', ['id'], unique=False,
+                        postgresql_where=sa.text('is_active = 0'), postgresql_concurrently=True)
+        # user_id 是 (user_id, created_at, id) 等组合索引的前缀，单列索引只增加写入开销
+        op.drop_index('ix_diet_records_user_id', table_name='diet_records', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_diet_records_user_id', 'diet_records', ['user_id'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_sessions_inactive_id', table_name='sessions', postgresql_concurrently=True)
+        op.drop_index('ix_sessions_active_expires_at', table_name='sessions', postgresql_concurrently=True)
+        op.drop_index('ix_sessions_active_user_id_expires_at', table_name='sessions', postgresql_concurrently=True)
@@ -0,0 +1,116 @@
+"""daily nutrition rollups
+
+Revision ID: e2d8b5c61f94
+Revises: a4c9e1f7b203
+Create Date: 2026-10-19 18:12:37.416508
+
+"""
+import json
+import math
+import os
+import re
+from typing import Any, Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2d8b5c61f94'
+down_revision: Union[str, Sequence[str], None] = 'a4c9e1f7b203'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+diet_records = sa.table(
+    'diet_records',
+    sa.column('id', sa.Integer()),
+    sa.column('analysis_result', sa.Text()),
+    sa.column('calories', sa.Float()),
+)
+
+BATCH_SIZE = 1000
+
+# 汇总使用的时区，与应用的 ROLLUP_TIMEZONE 配置一致
+ROLLUP_TIMEZONE = os.getenv("ROLLUP_TIMEZONE", "Asia/Shanghai")
+
+# 热量字符串中的第一个数值，如 "约350 kcal"、"1,200大卡"
+_NUMBER = re.compile(r"[0-9]+(?:[.][0-9]+)?")
+
+
+def _extract_calories(analysis_result: Any) -> Optional[float]:
+    """从分析结果JSON文本中提取热量，规则按本版本固定：非负数值，或字符串中的第一个数值"""
+    try:
+        analysis_result = json.loads(analysis_result)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(analysis_result, dict):
+        return None
+
+    value = analysis_result.get("calories")
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) if math.isfinite(value) and value >= 0 else None
+    if isinstance(value, str):
+        match = _NUMBER.search(value.replace(",", ""))
+        if match:
+            return float(match.group())
+    return None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('diet_records', sa.Column('calories', sa.Float(), nullable=True))
+    op.create_table(
+        'daily_nutrition_rollups',
+        sa.Column('user_id', sa.String(length=255), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('calories', sa.Float(), nullable=False),
+        sa.Column('record_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+
+    # 按批提取已有记录的热量
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(diet_records.c.id, diet_records.c.analysis_result)
+            .where(diet_records.c.id > last_id)
+            .order_by(diet_records.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        values = [
+            {"record_id": row.id, "calories": calories}
+            for row in rows
+            if (calories := _extract_calories(row.analysis_result)) is not None
+        ]
+        if values:
+            connection.execute(
+                diet_records.update()
+                .where(diet_records.c.id == sa.bindparam('record_id'))
+                .values(calories=sa.bindparam('calories')),
+                values
+            )
+        last_id = rows[-1].id
+
+    # 由已有记录生成每日汇总
+    connection.execute(
+        sa.text(
+            "INSERT INTO daily_nutrition_rollups (user_id, day, calories, record_count) "
+            "SELECT user_id, (created_at AT TIME ZONE :tz)::date, COALESCE(SUM(calories), 0), COUNT(*) "
+            "FROM diet_records WHERE user_id IS NOT NULL AND created_at IS NOT NULL "
+            "GROUP BY 1, 2"
+        ),
+        {"tz": ROLLUP_TIMEZONE}
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('daily_nutrition_rollups')
+    op.drop_column('diet_records', 'calories')
@@ -7,14 +7,18 @@ from fastapi import APIRouter, HTTPException, Depends, Response, Header, Request
 from fastapi.security import HTTPBearer
 from pydantic import BaseModel
 from typing import Optional
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import logging
 import hashlib
 
-from app.core.database import get_db, SessionLocal
+from app.core.database import get_async_db
+from app.core.replica_router import get_async_read_db, replica_router
 from app.core.database_session import db_session_manager
+from app.core.password_hasher import PasswordHasherBusy, password_hasher
+from app.core.rate_limiter import login_rate_limiter
 from app.models.models import User
+from app.services.credit_service import credit_service
 from app.api.auth_middleware import UserInfo, get_current_user, require_auth
 
 logger = logging.getLogger(__name__)
@@ -22,12 +26,6 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/auth", tags=["auth"])
 security = HTTPBearer(auto_error=False)
 
-# 密码哈希上下文 - 使用 argon2
-pwd_context = CryptContext(
-    schemes=["argon2"],
-    deprecated="auto"
-)
-
 
 class LoginRequest(BaseModel):
     """登录请求模型"""
@@ -44,53 +42,27 @@ class LoginResponse(BaseModel):
     session_id: Optional[str] = None
 
 
-def _truncate_password(password: str, max_bytes: int = 72) -> str:
-    """
-    将密码截断到指定字节数
-    argon2 理论上支持非常长的密码，但为了安全起见还是限制一下
-    """
-    password_bytes = password.encode('utf-8')
-    if len(password_bytes) <= max_bytes:
-        return password
-    
-    # 截断到 max_bytes，并确保不会在多字节字符中间截断
-    truncated_bytes = password_bytes[:max_bytes]
-    # 尝试解码，如果失败则逐个字节回退
-    for i in range(len(truncated_bytes), 0, -1):
-        try:
-            return truncated_bytes[:i].decode('utf-8')
-        except UnicodeDecodeError:
-            continue
-    return password  # 极端情况下返回原始密码
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """验证密码"""
-    try:
-        truncated = _truncate_password(plain_password)
-        return pwd_context.verify(truncated, hashed_password)
-    except Exception as e:
-        logger.debug(f"验证密码时发生错误: {e}")
-        return False
+async def verify_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """验证密码，返回 (是否匹配, 哈希参数变更后的新哈希)"""
+    return await password_hasher.verify_and_update(plain_password, hashed_password)
 
 
-def get_password_hash(password: str) -> str:
+async def get_password_hash(password: str) -> str:
     """生成密码哈希"""
-    truncated = _truncate_password(password)
-    return pwd_context.hash(truncated)
+    return await password_hasher.hash(password)
 
 
-def authenticate_user(db: Session, username: str, password: str) -> tuple[User, bool]:
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> tuple[User, bool]:
     """
     认证用户，如果用户不存在则自动创建
     返回: (User对象, 是否新创建的用户)
     """
-    user = db.query(User).filter(User.username == username).first()
+    user = (await db.execute(select(User).where(User.username == username))).scalars().first()
     if not user:
         # 用户不存在，自动创建新用户
         logger.info(f"用户 {username} 不存在，自动创建新用户")
         try:
-            hashed_password = get_password_hash(password)
+            hashed_password = await get_password_hash(password)
             new_user = User(
                 username=username,
                 email=f"{username}@example.com",  # 临时email
@@ -98,18 +70,23 @@ def authenticate_user(db: Session, username: str, password: str) -> tuple[User,
                 server_credits=100.0  # 新用户默认100个服务器调用点
             )
             db.add(new_user)
-            db.commit()
-            db.refresh(new_user)
+            await db.commit()
+            await db.refresh(new_user)
             logger.info(f"新用户 {username} 创建成功，ID: {new_user.id}")
             return new_user, True  # 返回新用户和True标记
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"创建新用户失败: {e}")
             raise
 
     # 用户存在，验证密码
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = await verify_password(password, user.hashed_password)
+    if not verified:
         return None, False
+    if new_hash:
+        # argon2 参数调整后，在登录成功时按新参数重新哈希
+        user.hashed_password = new_hash
+        await db.commit()
     return user, False  # 返回现有用户和False标记
 
 
@@ -117,28 +94,48 @@ def authenticate_user(db: Session, username: str, password: str) -> tuple[User,
 async def login(
     request: LoginRequest,
     req: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """用户登录（支持自动注册）"""
     try:
+        # 获取客户端信息
+        client_ip = req.client.host if req.client else ""
+        user_agent = req.headers.get("user-agent", "")
+
+        # 按用户名和IP分别限流，避免密码哈希被大量请求占满
+        retry_after = max(
+            login_rate_limiter.hit(f"user:{request.username}"),
+            login_rate_limiter.hit(f"ip:{client_ip}")
+        )
+        if retry_after:
+            logger.warning(f"用户 {request.username} ({client_ip}) 登录过于频繁")
+            raise HTTPException(
+                status_code=429,
+                detail="登录尝试过于频繁，请稍后重试",
+                headers={"Retry-After": str(retry_after)}
+            )
+
         # 从数据库验证用户，如果不存在则自动创建
-        user, is_new_user = authenticate_user(db, request.username, request.password)
+        try:
+            user, is_new_user = await authenticate_user(db, request.username, request.password)
+        except PasswordHasherBusy:
+            raise HTTPException(status_code=503, detail="登录请求过多，请稍后重试")
         if not user:
             logger.warning(f"用户 {request.username} 密码验证失败")
             raise HTTPException(status_code=401, detail="密码错误")
 
-        # 获取客户端信息
-        client_ip = req.client.host if req.client else ""
-        user_agent = req.headers.get("user-agent", "")
-
         # 创建数据库session
-        session_id = db_session_manager.create_session(
+        session_id = await db_session_manager.create_session(
             user_id=str(user.id),
             username=user.username,
             ip_address=client_ip,
-            user_agent=user_agent
+            user_agent=user_agent,
+            db=db
         )
 
+        # 新session在读写窗口内读主库，避免副本尚未同步新用户和余额
+        replica_router.mark_write(f"session:{session_id}")
+
         # 根据是否新用户生成不同的提示信息
         if is_new_user:
             login_message = "欢迎加入！新账号已自动创建并登录成功。"
@@ -166,12 +163,13 @@ async def login(
 
 @router.post("/logout")
 async def logout(
-    x_session_id: Optional[str] = Header(None, alias="X-Session-ID")
+    x_session_id: Optional[str] = Header(None, alias="X-Session-ID"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """用户登出"""
     try:
         if x_session_id:
-            db_session_manager.invalidate_session(x_session_id)
+            await db_session_manager.invalidate_session(x_session_id, db)
             logger.info(f"session {x_session_id} 已失效")
 
         return {"success": True, "message": "登出成功"}
@@ -196,21 +194,24 @@ async def get_current_user_info(current_user: Optional[UserInfo] = Depends(get_c
 
 
 @router.get("/session/status")
-async def get_session_status(current_user: Optional[UserInfo] = Depends(get_current_user)):
+async def get_session_status(
+    current_user: Optional[UserInfo] = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
     """获取session状态"""
     if current_user:
-        session_count = db_session_manager.get_user_session_count(current_user.user_id)
+        session_count = await db_session_manager.get_user_session_count(current_user.user_id, db)
         return {
             "is_logged_in": True,
             "user_id": current_user.user_id,
             "username": current_user.username,
             "user_session_count": session_count,
-            "total_session_count": db_session_manager.get_session_count()
+            "total_session_count": await db_session_manager.get_session_count(db)
         }
     else:
         return {
             "is_logged_in": False,
-            "total_session_count": db_session_manager.get_session_count()
+            "total_session_count": await db_session_manager.get_session_count(db)
         }
 
 
@@ -218,7 +219,7 @@ async def get_session_status(current_user: Optional[UserInfo] = Depends(get_curr
 async def consume_server_credits(
     credits_to_consume: float,
     current_user: UserInfo = Depends(require_auth),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     消耗服务器调用点
@@ -232,46 +233,45 @@ async def consume_server_credits(
         剩余调用点数量
     """
     try:
-        # 获取用户
-        user = db.query(User).filter(User.id == int(current_user.user_id)).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="用户不存在")
-
-        # 检查是否有足够的调用点
-        if user.server_credits < credits_to_consume:
+        # 原子扣除调用点，余额不足时不扣除
+        remaining = await credit_service.deduct(db, current_user.user_id, credits_to_consume, "consume")
+        if remaining is None:
+            server_credits = (await db.execute(
+                select(User.server_credits).where(User.id == int(current_user.user_id))
+            )).scalar_one_or_none()
+            if server_credits is None:
+                raise HTTPException(status_code=404, detail="用户不存在")
             raise HTTPException(
                 status_code=402,  # Payment Required
-                detail=f"服务器调用点不足。当前剩余: {user.server_credits}，需要: {credits_to_consume}"
+                detail=f"服务器调用点不足。当前剩余: {server_credits}，需要: {credits_to_consume}"
             )
 
-        # 扣除调用点
-        user.server_credits -= credits_to_consume
-        db.commit()
-
-        logger.info(f"用户 {current_user.username} 消耗了 {credits_to_consume} 个服务器调用点，剩余: {user.server_credits}")
+        logger.info(f"用户 {current_user.username} 消耗了 {credits_to_consume} 个服务器调用点，剩余: {remaining}")
 
         return {
             "success": True,
             "message": f"成功消耗 {credits_to_consume} 个调用点",
-            "remaining_credits": user.server_credits
+            "remaining_credits": remaining
         }
 
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"消耗调用点时发生错误: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="操作失败，请稍后重试")
 
 
 @router.get("/credits")
 async def get_server_credits(
     current_user: UserInfo = Depends(require_auth),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """获取当前用户的服务器调用点余额"""
     try:
-        user = db.query(User).filter(User.id == int(current_user.user_id)).first()
+        user = (await db.execute(
+            select(User).where(User.id == int(current_user.user_id))
+        )).scalars().first()
         if not user:
             raise HTTPException(status_code=404, detail="用户不存在")
 
@@ -291,29 +291,26 @@ async def get_server_credits(
 @router.post("/reset-credits")
 async def reset_server_credits(
     current_user: UserInfo = Depends(require_auth),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """充值服务器调用点（增加20点）"""
     try:
-        user = db.query(User).filter(User.id == int(current_user.user_id)).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="用户不存在")
-
         # 增加20个调用点
-        user.server_credits += 20.0
-        db.commit()
+        balance = await credit_service.add(db, current_user.user_id, 20.0, "recharge")
+        if balance is None:
+            raise HTTPException(status_code=404, detail="用户不存在")
 
-        logger.info(f"用户 {current_user.username} 充值调用点，当前余额: {user.server_credits}")
+        logger.info(f"用户 {current_user.username} 充值调用点，当前余额: {balance}")
 
         return {
             "success": True,
             "message": "成功充值20个调用点",
-            "server_credits": user.server_credits
+            "server_credits": balance
         }
 
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"充值调用点时发生错误: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="操作失败，请稍后重试")
\ No newline at end of file
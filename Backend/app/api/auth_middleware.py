@@ -2,10 +2,12 @@ from fastapi import Depends, HTTPException, status, Header
 from fastapi.security import HTTPBearer
 from typing import Optional
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import SessionLocal
+from app.core.database import get_async_db
 from app.core.database_session import db_session_manager
+from app.core.session_cache import session_cache
 from app.models.models import User
 
 
@@ -17,25 +19,31 @@ class UserInfo(BaseModel):
     server_credits: float = 0.0
 
 
-def get_current_user(x_session_id: Optional[str] = Header(None, alias="X-Session-ID")) -> Optional[UserInfo]:
-    """获取当前用户信息（依赖注入）- 从 HTTP Header 读取 session"""
+async def get_current_user(
+    x_session_id: Optional[str] = Header(None, alias="X-Session-ID"),
+    db: AsyncSession = Depends(get_async_db)
+) -> Optional[UserInfo]:
+    """获取当前用户信息（依赖注入）- 从 HTTP Header 读取 session，与接口共用同一个请求级数据库会话"""
     print(f"🔍 get_current_user - 收到session_id: {x_session_id}")
 
     if not x_session_id:
         print("🔍 get_current_user - 没有session_id，返回None")
         return None
 
-    session = db_session_manager.validate_session(x_session_id)
+    session = await db_session_manager.validate_session(x_session_id, db)
     print(f"🔍 get_current_user - session验证结果: {session}")
 
     if not session:
         print("🔍 get_current_user - session无效，返回None")
         return None
 
-    # 从数据库获取用户的服务器调用点信息
-    with SessionLocal() as db:
-        user = db.query(User).filter(User.id == int(session.user_id)).first()
-        server_credits = user.server_credits if user else 0.0
+    # 获取用户的服务器调用点信息，缓存未命中时查询数据库
+    server_credits = session_cache.get_user_credits(session.user_id)
+    if server_credits is None:
+        server_credits = (await db.execute(
+            select(User.server_credits).where(User.id == int(session.user_id))
+        )).scalar_one_or_none() or 0.0
+        session_cache.set_user_credits(session.user_id, server_credits)
 
     user_info = UserInfo(
         user_id=session.user_id,
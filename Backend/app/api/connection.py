@@ -4,12 +4,12 @@
 """
 
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 import httpx
 import logging
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.config import settings
 from app.api.auth_middleware import optional_auth, UserInfo
 from app.models.schemas import TestConnectionRequest, TestConnectionResponse
@@ -25,7 +25,7 @@ def _backend_url(path: str) -> str:
 async def test_connection(
     request: TestConnectionRequest,
     current_user: Optional[UserInfo] = Depends(optional_auth),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> TestConnectionResponse:
     """测试AI连接连通性"""
     logger.debug(f"test_connection called with model_url={request.model_url}, model_name={request.model_name}, call_preference={request.call_preference}")
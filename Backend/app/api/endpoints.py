@@ -4,7 +4,7 @@ API路由集中管理模块
 """
 from fastapi import APIRouter
 
-from app.api import health, food_estimate, records, auth, connection, gallery, methods, bowel_estimate
+from app.api import health, food_estimate, records, auth, connection, gallery, methods, bowel_estimate, metrics
 
 # 创建主路由器实例
 router = APIRouter()
@@ -17,4 +17,5 @@ router.include_router(bowel_estimate.router, tags=["粪便分析"])
 router.include_router(methods.router, tags=["分析方法"])
 router.include_router(records.router, tags=["饮食记录"])
 router.include_router(connection.router, tags=["连接测试"])
-router.include_router(gallery.router, tags=["画廊分享"])
\ No newline at end of file
+router.include_router(gallery.router, tags=["画廊分享"])
+router.include_router(metrics.router, tags=["运行指标"])
\ No newline at end of file
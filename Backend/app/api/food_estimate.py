@@ -1,14 +1,16 @@
 from fastapi import APIRouter, File, UploadFile, Depends, HTTPException, Form
 from typing import List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import httpx
 import logging
-import json
 import time
 from pydantic import BaseModel
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.config import settings
+from app.core.response_cache import response_cache
+from app.services.credit_service import credit_reservations
+from app.services.nutrition_rollup import apply_records
 from app.api.auth_middleware import require_auth, optional_auth, get_current_user
 from app.api.auth import UserInfo
 from app.models.models import DietRecord, User
@@ -43,7 +45,7 @@ def _backend_url(path: str) -> str:
 @router.post("/estimate/pure_llm")
 async def proxy_pure_llm(
     files: List[UploadFile] = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: str = "1"
 ):
     """将请求原样中转到 AI 后端的 pure_llm 接口"""
@@ -78,7 +80,7 @@ async def proxy_pure_llm(
 @router.post("/estimate/llm_ocr_hybrid")
 async def proxy_llm_ocr_hybrid(
     files: List[UploadFile] = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: str = "1"
 ):
     """将请求原样中转到 AI 后端的 llm_ocr_hybrid 接口"""
@@ -113,7 +115,7 @@ async def proxy_llm_ocr_hybrid(
 @router.post("/nutrition_table")
 async def proxy_nutrition_table(
     files: List[UploadFile] = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: str = "1"
 ):
     """将请求原样中转到 AI 后端的 nutrition_table 接口"""
@@ -148,7 +150,7 @@ async def proxy_nutrition_table(
 @router.post("/food_portion")
 async def proxy_food_portion(
     files: List[UploadFile] = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: str = "1"
 ):
     """将请求原样中转到 AI 后端的 food_portion 接口"""
@@ -184,7 +186,7 @@ async def proxy_food_portion(
 async def analyze_food(
     files: List[UploadFile] = File(...),
     analyze_request: AnalyzeRequest = Depends(validate_analyze_request),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> AnalyzeResponse:
     """
     食物分析接口 - 接收图片、会话信息和AI配置，调用AI后端进行分析，并保存记录
@@ -203,20 +205,24 @@ async def analyze_food(
         logger.warning("No files provided to analyze_food")
         raise HTTPException(status_code=400, detail="未提供图片文件")
     
+    reservation_id = None
     try:
         # 基于Session进行会话有效性判断
         session_id = analyze_request.session_id or ""
-        current_user = get_current_user(session_id)
+        current_user = await get_current_user(session_id, db)
 
         call_preference = (analyze_request.call_preference or "server").lower()
 
-        # 如果会话有效且用户有足够的服务调用点，并且明确选择服务器优先，则使用服务器配置
-        use_server_config = (
+        # 如果会话有效且明确选择服务器优先，则在转发前预留1个调用点，预留成功才使用服务器配置
+        if (
             call_preference == "server" and
-            current_user is not None and 
-            current_user.is_logged_in and 
-            current_user.server_credits > 0
-        )
+            current_user is not None and
+            current_user.is_logged_in
+        ):
+            reservation_id = await credit_reservations.reserve(current_user.user_id, 1, db)
+        use_server_config = reservation_id is not None
+        # 之后不再访问数据库，提交以结束事务并把连接归还连接池，避免在等待AI后端期间占用连接
+        await db.commit()
 
         if call_preference == "server" and not use_server_config:
             if current_user and current_user.is_logged_in:
@@ -297,8 +303,14 @@ async def analyze_food(
                     'model_name': model_name,
                     'api_key': api_key,
                     'method': analyze_request.method,  # 添加缺失的method参数
-                    'call_preference': call_preference
+                    'call_preference': call_preference,
+                    'user_id': user_id
                 }
+                # 使用服务器配置时由服务端承担费用，按配置限制单次分析的token用量
+                if use_server_config and settings.SERVER_TOKEN_BUDGET:
+                    ai_config_data['token_budget'] = str(settings.SERVER_TOKEN_BUDGET)
+                    if settings.MODEL_FALLBACK_NAME:
+                        ai_config_data['fallback_model_name'] = settings.MODEL_FALLBACK_NAME
                 
                 resp = await client.post(
                     url,
@@ -322,16 +334,21 @@ async def analyze_food(
                 logger.error('AI backend returned error: %s', ai_result)
                 raise HTTPException(status_code=resp.status_code, detail=f"AI分析失败: {ai_result.get('message', '未知错误')}")
         
-        # 分析成功，如果使用了服务器配置则扣除调用点
-        if use_server_config:
-            # 更新数据库中的调用点
-            user = db.query(User).filter(User.id == int(current_user.user_id)).first()
-            if user:
-                user.server_credits -= 1
-                db.commit()
-                logger.info(f"用户 {current_user.username} 消耗1个服务器调用点，剩余: {user.server_credits}")
+        usage = ai_result.get('usage')
+        if usage:
+            logger.info(
+                "用户 %s 本次分析用量: tokens=%s, llm_calls=%s, image_bytes=%s",
+                user_id, usage.get('total_tokens'), usage.get('llm_calls'), usage.get('image_bytes')
+            )
+
+        # 分析成功，如果使用了服务器配置则提交预留的调用点；AI后端返回失败时由finally释放
+        if use_server_config and ai_result.get('success', True):
+            remaining = credit_reservations.commit(reservation_id, "analyze_food")
+            reservation_id = None
+            if remaining is not None:
+                logger.info(f"用户 {current_user.username} 消耗1个服务器调用点，剩余: {remaining}")
             else:
-                logger.error(f"扣除调用点时未找到用户 {current_user.user_id}")
+                logger.error(f"调用点预留已过期，用户 {current_user.user_id} 本次未扣除调用点")
         
         # 注意：这里不再自动保存分析记录，改为由前端主动调用记录接口
         
@@ -357,6 +374,10 @@ async def analyze_food(
     except Exception as e:
         logger.exception("Unexpected error in analyze_food")
         raise HTTPException(status_code=500, detail=f"分析过程中发生错误: {str(e)}")
+    finally:
+        # 未提交的预留（转发失败、AI分析失败或异常）全部释放
+        if reservation_id is not None:
+            credit_reservations.release(reservation_id)
 
 
 class SaveRecordRequest(BaseModel):
@@ -369,7 +390,7 @@ class SaveRecordRequest(BaseModel):
 async def save_analysis_record(
     request: SaveRecordRequest,
     current_user: Optional[UserInfo] = Depends(optional_auth),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     保存分析记录接口 - 由前端主动调用
@@ -394,11 +415,15 @@ async def save_analysis_record(
             user_id=current_user.user_id,
             image_url=request.image_url or "",
             analysis_method=request.analysis_method,
-            analysis_result=json.dumps(request.analysis_result, ensure_ascii=False),
+            analysis_result=request.analysis_result,
         )
         db.add(diet_record)
-        db.commit()
-        db.refresh(diet_record)
+        await db.flush()
+        await db.refresh(diet_record)
+        await apply_records(db, [diet_record])
+        await db.commit()
+        await db.refresh(diet_record)
+        response_cache.bump(f"records:{current_user.user_id}")
         logger.info(f"Diet record saved: id={diet_record.id}, user_id={current_user.user_id}")
         
         return {
@@ -411,6 +436,6 @@ async def save_analysis_record(
         raise
     except Exception as e:
         logger.exception("Error saving analysis record")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"保存记录失败: {str(e)}")
 
@@ -1,27 +1,150 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import hashlib
 import json
+import os
 
-from app.core.database import get_db
+from app.core.blob_store import InvalidImageData, blob_store, content_digest, decode_data_url
+from app.core.cached_count import gallery_share_count
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.pagination import InvalidCursor, keyset_page, next_cursor
+from app.core.image_variants import FORMATS, VARIANTS, image_variants
+from app.core.replica_router import get_async_read_db
+from app.core.response_cache import etag_matches, response_cache
+from app.core.session_cache import session_cache
 from app.models import models
 from app.models.schemas import GalleryShareCreate, GalleryShareResponse, GalleryShareListResponse
+from app.services.nutrition_rollup import parse_analysis_result
 from app.api.auth_middleware import get_current_user, UserInfo
 
 router = APIRouter(prefix="/gallery", tags=["gallery"])
 
+# 图片摘要 -> [锁, 持有和等待的请求数]
+_image_locks: Dict[str, list] = {}
+
+
+async def _resolve_usernames(db: AsyncSession, user_ids: Iterable[str]) -> Dict[str, str]:
+    """
+    批量解析用户名：先查缓存，未命中的用户ID用一次IN查询补齐
+
+    Args:
+        db: 数据库会话
+        user_ids: 分享记录中的用户ID（字符串，可能为空或非数字）
+
+    Returns:
+        用户ID -> 用户名
+    """
+    wanted = {user_id for user_id in user_ids if user_id}
+    usernames = session_cache.get_usernames(wanted)
+
+    missing = []
+    for user_id in wanted - usernames.keys():
+        try:
+            missing.append(int(user_id))
+        except (ValueError, TypeError):
+            pass  # 非数字的用户ID没有对应用户
+
+    if missing:
+        rows = (await db.execute(
+            select(models.User.id, models.User.username).where(models.User.id.in_(missing))
+        )).all()
+        loaded = {str(row.id): row.username for row in rows}
+        session_cache.set_usernames(loaded)
+        usernames.update(loaded)
+    return usernames
+
+
+def _image_url(digest: Optional[str], variant: str) -> Optional[str]:
+    return f"{settings.API_V1_STR}/gallery/image/{digest}?variant={variant}" if digest else None
+
+
+async def _count_shares(db: AsyncSession) -> int:
+    return (await db.execute(select(func.count(models.GalleryShare.id)))).scalar()
+
+
+def _read_range(path: str, start: int, end: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(end - start + 1)
+
+
+@asynccontextmanager
+async def _image_lock(digest: str):
+    """
+    同一图片摘要的互斥锁：保存图片并提交分享、检查引用数并删除文件两类操作互斥
+
+    锁只在当前进程内有效，没有等待者时从表中移除
+    """
+    entry = _image_locks.setdefault(digest, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            del _image_locks[digest]
+
+
+async def _release_image(db: AsyncSession, digest: Optional[str]):
+    """分享删除并提交后调用，图片不再被任何分享引用时删除文件"""
+    if not digest:
+        return
+    async with _image_lock(digest):
+        references = (await db.execute(
+            select(func.count(models.GalleryShare.id)).where(models.GalleryShare.image_digest == digest)
+        )).scalar()
+        if not references:
+            await run_in_threadpool(blob_store.delete, digest)
+            await run_in_threadpool(image_variants.delete, digest)
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析单个字节区间的 Range 请求头
+
+    Returns:
+        (起始, 结束) 字节位置（包含结束位置），多区间或格式不支持时返回None（返回完整内容）
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_text, _, end_text = spec.strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # bytes=-N 表示最后N个字节
+            start = max(size - int(end_text), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, min(end, size - 1)
+
 
 @router.post("/share", response_model=GalleryShareResponse)
 async def share_gallery_item(
     share_data: GalleryShareCreate,
     current_user: UserInfo = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     分享餐食到公共画廊
     - 分析图片并保存到数据库
-    - 限制最多100个分享，超过时删除最早的
+    - 限制最多保留 GALLERY_MAX_SHARES 个分享，超过时删除最早的
     """
 
     try:
@@ -35,43 +158,63 @@ async def share_gallery_item(
                 detail="必须提供分析结果"
             )
 
-        # 检查当前分享数量
-        total_shares = db.query(func.count(models.GalleryShare.id)).scalar()
-
-        # 如果超过100个，删除最早的分享
-        if total_shares >= 100:
-            # 找到最早的分享并删除
-            oldest_share = db.query(models.GalleryShare).order_by(models.GalleryShare.created_at).first()
-            if oldest_share:
-                db.delete(oldest_share)
-                db.commit()
-
-        # 获取用户ID（如果已登录）
-        user_id = None
-        if current_user and current_user.is_logged_in:
-            user_id = current_user.user_id
-
-        # 创建新的分享记录
-        new_share = models.GalleryShare(
-            user_id=user_id,
-            image_base64=share_data.image_base64,
-            analysis_result=analysis_result
-        )
+        # 图片解码后按内容摘要保存到图片存储，数据库只记录摘要
+        try:
+            image_bytes = decode_data_url(share_data.image_base64)
+        except InvalidImageData as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        if not image_bytes:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="必须提供图片")
+        if len(image_bytes) > settings.GALLERY_IMAGE_MAX_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"图片大小不能超过 {settings.GALLERY_IMAGE_MAX_BYTES // (1024 * 1024)}MB"
+            )
+        image_digest = await run_in_threadpool(content_digest, image_bytes)
+        # 从保存图片到提交分享期间持有该图片的锁，并发删除其它分享时不会把刚保存的图片判定为无引用而删除
+        async with _image_lock(image_digest):
+            await run_in_threadpool(blob_store.put, image_bytes)
+            # 在后台生成缩略图等衍生尺寸，不等待完成
+            image_variants.submit(image_digest)
+
+            # 获取用户ID（如果已登录）
+            user_id = None
+            if current_user and current_user.is_logged_in:
+                user_id = current_user.user_id
+
+            # 创建新的分享记录
+            new_share = models.GalleryShare(
+                user_id=user_id,
+                image_digest=image_digest,
+                analysis_result=parse_analysis_result(analysis_result)
+            )
 
-        db.add(new_share)
-        db.commit()
-        db.refresh(new_share)
-
-        # 获取用户名
-        user_name = None
-        if user_id:
-            try:
-                user_id_int = int(user_id)
-                user = db.query(models.User).filter(models.User.id == user_id_int).first()
-                if user:
-                    user_name = user.username
-            except (ValueError, TypeError):
-                pass  # 如果转换失败，保持user_name为None
+            db.add(new_share)
+            await db.flush()
+
+            # 超过上限的最早分享用一条DELETE删除：水位线是倒数第 GALLERY_MAX_SHARES+1 新的id，
+            # 子查询沿主键索引倒序最多读取 GALLERY_MAX_SHARES+1 条，不扫描整表
+            watermark = select(models.GalleryShare.id)\
+                .order_by(models.GalleryShare.id.desc())\
+                .offset(settings.GALLERY_MAX_SHARES)\
+                .limit(1)\
+                .scalar_subquery()
+            evicted_digests = (await db.execute(
+                delete(models.GalleryShare)
+                .where(models.GalleryShare.id <= watermark)
+                .returning(models.GalleryShare.image_digest)
+                .execution_options(synchronize_session=False)
+            )).scalars().all()
+            await db.commit()
+        await db.refresh(new_share)
+
+        response_cache.bump("gallery")
+        gallery_share_count.adjust(1 - len(evicted_digests))
+        for evicted_digest in set(evicted_digests) - {image_digest}:
+            await _release_image(db, evicted_digest)
+
+        # 分享者就是当前用户，直接使用session中的用户名
+        user_name = current_user.username if user_id else None
 
         # 判断是否为当前用户
         is_current_user = False
@@ -82,13 +225,18 @@ async def share_gallery_item(
             id=new_share.id,
             user_name=user_name,
             is_current_user=is_current_user,
-            image_base64=new_share.image_base64,
+            image_url=_image_url(new_share.image_digest, "full"),
+            card_url=_image_url(new_share.image_digest, "card"),
+            thumbnail_url=_image_url(new_share.image_digest, "thumb"),
             analysis_result=new_share.analysis_result,
             created_at=new_share.created_at
         )
 
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"分享失败: {str(e)}"
@@ -97,41 +245,55 @@ async def share_gallery_item(
 
 @router.get("/list", response_model=GalleryShareListResponse)
 async def get_gallery_shares(
-    skip: int = 0,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
     limit: int = 20,
-    current_user: UserInfo = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    x_session_id: Optional[str] = Header(None, alias="X-Session-ID"),
+    db: AsyncSession = Depends(get_async_read_db),
+    primary_db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取公共画廊分享列表
     - 按创建时间倒序排列
-    - 支持分页
+    - 按游标分页：传入上一页返回的 next_cursor 获取下一页，limit 不超过 PAGINATION_MAX_LIMIT
+    - 返回ETag，If-None-Match 匹配时不查询数据库直接返回304；未登录用户共享缓存的响应
     """
+    if limit <= 0 or limit > settings.PAGINATION_MAX_LIMIT:
+        limit = settings.PAGINATION_MAX_LIMIT
+
+    # is_current_user 因人而异，登录用户按session区分ETag，未登录用户共用一份
+    viewer = hashlib.sha256(x_session_id.encode("utf-8")).hexdigest()[:16] if x_session_id else "anonymous"
+    etag = response_cache.etag("gallery", viewer, cursor or "", limit)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache" if x_session_id else "public, no-cache"}
+    if response_cache.check(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if not x_session_id:
+        body = response_cache.get(etag)
+        if body is not None:
+            return Response(content=body, media_type="application/json", headers=headers)
 
     try:
-        # 查询分享列表
-        shares = db.query(models.GalleryShare)\
-            .order_by(desc(models.GalleryShare.created_at))\
-            .offset(skip)\
-            .limit(limit)\
-            .all()
+        # session在主库上校验（副本可能还没有刚登录的session），副本只用于列表查询
+        current_user = await get_current_user(x_session_id, primary_db) if x_session_id else None
 
-        # 获取总数
-        total = db.query(func.count(models.GalleryShare.id)).scalar()
+        # 查询分享列表，按 (created_at, id) 键集分页
+        try:
+            query = keyset_page(select(models.GalleryShare), models.GalleryShare, cursor, limit)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        shares, next_page = next_cursor((await db.execute(query)).scalars().all(), limit)
+
+        # 获取总数（进程内缓存，不在每次翻页时统计）
+        total = await gallery_share_count.get(lambda: _count_shares(db))
+
+        # 一次性解析本页所有分享者的用户名
+        usernames = await _resolve_usernames(db, (share.user_id for share in shares))
 
         # 转换为响应格式
         share_responses = []
         for share in shares:
-            # 获取用户名
-            username = None
-            if share.user_id:
-                try:
-                    user_id_int = int(share.user_id)
-                    user = db.query(models.User).filter(models.User.id == user_id_int).first()
-                    if user:
-                        username = user.username
-                except (ValueError, TypeError):
-                    pass  # 如果转换失败，保持username为None
+            username = usernames.get(share.user_id) if share.user_id else None
 
             # 判断是否为当前用户
             is_current_user = False
@@ -142,16 +304,27 @@ async def get_gallery_shares(
                 id=share.id,
                 user_name=username,
                 is_current_user=is_current_user,
-                image_base64=share.image_base64,
+                image_url=_image_url(share.image_digest, "full"),
+                card_url=_image_url(share.image_digest, "card"),
+                thumbnail_url=_image_url(share.image_digest, "thumb"),
                 analysis_result=share.analysis_result,
                 created_at=share.created_at
             ))
 
-        return GalleryShareListResponse(
+        result = GalleryShareListResponse(
             shares=share_responses,
-            total=total
+            total=total,
+            next_cursor=next_page
         )
+        if not x_session_id:
+            body = result.model_dump_json().encode("utf-8")
+            response_cache.put(etag, body)
+            return Response(content=body, media_type="application/json", headers=headers)
+        response.headers.update(headers)
+        return result
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -163,7 +336,7 @@ async def get_gallery_shares(
 async def delete_gallery_share(
     share_id: int,
     current_user: UserInfo = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     删除分享（只有上传者或管理员可以删除）
@@ -171,7 +344,9 @@ async def delete_gallery_share(
 
     try:
         # 查找分享记录
-        share = db.query(models.GalleryShare).filter(models.GalleryShare.id == share_id).first()
+        share = (await db.execute(
+            select(models.GalleryShare).where(models.GalleryShare.id == share_id)
+        )).scalars().first()
         if not share:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -180,8 +355,11 @@ async def delete_gallery_share(
 
         # 检查权限（只有上传者可以删除）
         if current_user and current_user.is_logged_in and share.user_id == current_user.user_id:
-            db.delete(share)
-            db.commit()
+            await db.delete(share)
+            await db.commit()
+            response_cache.bump("gallery")
+            gallery_share_count.adjust(-1)
+            await _release_image(db, share.image_digest)
             return {"message": "分享已删除"}
         else:
             raise HTTPException(
@@ -192,8 +370,60 @@ async def delete_gallery_share(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"删除分享失败: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.get("/image/{digest}")
+async def get_gallery_image(digest: str, request: Request, variant: Optional[str] = None):
+    """
+    获取画廊图片
+    - variant 为 thumb/card/full 时返回对应尺寸，按 Accept 请求头选择 WebP 或 JPEG；不传时返回原图
+    - 图片按内容寻址，同一地址的内容永不改变，可被浏览器和CDN长期缓存
+    - 支持 If-None-Match（304）和单区间 Range 请求（206）
+    """
+    if variant is not None and variant not in VARIANTS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"不支持的图片尺寸: {variant}")
+
+    info = await run_in_threadpool(blob_store.stat, digest)
+    if info is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="图片不存在")
+    size, content_type = info
+    path = blob_store.path(digest)
+    etag = f'"{digest}"'
+    headers = {
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Accept-Ranges": "bytes",
+    }
+
+    if variant is not None:
+        headers["Vary"] = "Accept"
+        fmt = "webp" if "image/webp" in request.headers.get("accept", "") else "jpeg"
+        # 衍生尺寸尚未生成时等待生成，生成失败（如原图无法解码）时返回原图
+        if await image_variants.ensure(digest):
+            path = image_variants.path(digest, variant, fmt)
+            size = await run_in_threadpool(os.path.getsize, path)
+            content_type = FORMATS[fmt][1]
+            etag = f'"{digest}-{variant}-{fmt}"'
+    headers["ETag"] = etag
+
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    range_header = request.headers.get("range")
+    byte_range = _parse_range(range_header, size) if range_header else None
+    if byte_range is not None:
+        start, end = byte_range
+        content = await run_in_threadpool(_read_range, path, start, end)
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return Response(
+            content=content,
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=content_type,
+            headers=headers
+        )
+
+    return FileResponse(path, media_type=content_type, headers=headers)
@@ -0,0 +1,23 @@
+"""
+运行指标相关端点
+"""
+
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+
+from app.core.config import settings
+from app.core.metrics import metrics_registry
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("")
+async def get_metrics(x_admin_token: Optional[str] = Header(None, alias="X-Admin-Token")):
+    """各子系统注册的运行指标（进程启动以来），需要在 X-Admin-Token 中提供管理令牌"""
+    if not settings.METRICS_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="未配置 METRICS_ADMIN_TOKEN，指标查询已禁用")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.METRICS_ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="管理令牌无效")
+    return metrics_registry.snapshot()
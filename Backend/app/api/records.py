@@ -1,10 +1,21 @@
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Form
-from typing import List
-from sqlalchemy.orm import Session
+from datetime import date, datetime, timezone
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Form, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_async_db
+from app.core.pagination import InvalidCursor, keyset_page, next_cursor
+from app.core.replica_router import client_key, get_async_read_db, replica_router
+from app.core.response_cache import response_cache
 from app.models.models import DietRecord
-from app.models.schemas import DietRecordResponse, DietRecordRequest
+from app.api.auth_middleware import UserInfo, require_auth
+from app.models.schemas import DietRecordBatchResponse, DietRecordResponse, DietRecordRequest, NutritionSummaryResponse
+from app.services.nutrition_rollup import apply_records, parse_analysis_result, summarize
+from app.services.record_export import EXPORT_FORMATS, export_records, parquet_available
+from app.services.record_ingest import InvalidBatchBody, ingest_records, parse_batch_body
 
 router = APIRouter(prefix="/records", tags=["records"])
 
@@ -14,7 +25,7 @@ async def add_user_record(
     user_id: str = Form(...),
     analysis_result: str = Form(...),
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     新增用户饮食记录
@@ -33,50 +44,120 @@ async def add_user_record(
         db_record = DietRecord(
             user_id=user_id,
             image_url=image_url,
-            analysis_result=analysis_result,
+            analysis_result=parse_analysis_result(analysis_result),
             analysis_method="pure_llm"  # 设置默认的分析方法
         )
         
-        # 保存到数据库
+        # 保存到数据库，同一事务中更新每日汇总（热量由数据库生成列提取，flush后刷新读取）
         db.add(db_record)
-        db.commit()
-        db.refresh(db_record)
+        await db.flush()
+        await db.refresh(db_record)
+        await apply_records(db, [db_record])
+        await db.commit()
+        await db.refresh(db_record)
+        response_cache.bump(f"records:{user_id}")
         
         return db_record
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"创建记录失败: {str(e)}")
 
 
+@router.post("/batch", response_model=DietRecordBatchResponse)
+async def add_user_records_batch(
+    request: Request,
+    current_user: UserInfo = Depends(require_auth),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    批量新增当前用户的饮食记录（离线客户端同步）
+    参数：
+        请求体: JSON数组，或 Content-Type 为 application/x-ndjson 时每行一条记录；
+            每条记录包含 idempotency_key、analysis_result，可选 analysis_method、image_url、created_at
+    返回：
+        DietRecordBatchResponse: 每条记录的处理结果（created / duplicate / invalid）；
+        重试时使用相同的 idempotency_key，已写入的记录返回 duplicate 和原记录ID
+    """
+    try:
+        payloads = parse_batch_body(await request.body(), request.headers.get("content-type", ""))
+    except InvalidBatchBody as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(payloads) > settings.RECORD_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"单次最多写入 {settings.RECORD_BATCH_MAX_ITEMS} 条记录")
+
+    try:
+        result = await ingest_records(db, current_user.user_id, payloads)
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"批量创建记录失败: {str(e)}")
+    if result["created"]:
+        response_cache.bump(f"records:{current_user.user_id}")
+    return result
+
+
 @router.get("/{user_id}", response_model=List[DietRecordResponse])
 async def get_user_records(
     user_id: str,
-    page: int = -1,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
     limit: int = -1,
-    db: Session = Depends(get_db)
+    food_name: Optional[str] = None,
+    min_calories: Optional[float] = None,
+    max_calories: Optional[float] = None,
+    sort: str = Query("created_at", pattern="^(created_at|calories)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     获取用户的饮食记录
     参数：
         user_id: 用户ID
-        page: 页码（从1开始），-1表示获取全部数据
-        limit: 每页记录数，0或-1表示获取全部数据
+        cursor: 分页游标，取自上一页响应头 X-Next-Cursor，不传表示第一页
+        limit: 每页记录数，0或-1表示使用最大值（PAGINATION_MAX_LIMIT）
+        food_name: 只返回食物名称以该值开头的记录
+        min_calories: 最小热量（含）
+        max_calories: 最大热量（含）
+        sort: 排序字段，created_at 或 calories；按热量排序时只返回能识别热量的记录
+        order: 排序方向，desc 或 asc
     返回：
-        List[DietRecordResponse]: 饮食记录列表，按创建时间降序排序
+        List[DietRecordResponse]: 饮食记录列表，默认按创建时间降序排序；
+        还有更多记录时在响应头 X-Next-Cursor 中返回下一页游标（翻页时需传入相同的筛选和排序参数）；
+        If-None-Match 与ETag匹配时不查询数据库直接返回304
     """
-    # 创建基础查询
-    query = db.query(DietRecord)\
-        .filter(DietRecord.user_id == user_id)\
-        .order_by(DietRecord.created_at.desc())
-    
-    # 判断是否需要分页
-    if page > 0 and limit > 0:
-        offset = (page - 1) * limit
-        query = query.offset(offset).limit(limit)
-    
+    if limit <= 0 or limit > settings.PAGINATION_MAX_LIMIT:
+        limit = settings.PAGINATION_MAX_LIMIT
+
+    etag = response_cache.etag(
+        f"records:{user_id}", cursor or "", limit, food_name or "", min_calories, max_calories, sort, order
+    )
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if response_cache.check(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    # 筛选条件作用于数据库生成列，分别使用 (user_id, food_name)、(user_id, calories, id) 索引
+    query = select(DietRecord).where(DietRecord.user_id == user_id)
+    if food_name:
+        query = query.where(DietRecord.food_name.startswith(food_name, autoescape=True))
+    if min_calories is not None:
+        query = query.where(DietRecord.calories >= min_calories)
+    if max_calories is not None:
+        query = query.where(DietRecord.calories <= max_calories)
+    if sort == "calories":
+        query = query.where(DietRecord.calories.isnot(None))
+
+    # 按 (排序字段, id) 键集分页
+    try:
+        query = keyset_page(query, DietRecord, cursor, limit, key=sort, descending=order == "desc")
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     # 执行查询
-    records = query.all()
+    records, next_page = next_cursor((await db.execute(query)).scalars().all(), limit, key=sort)
+    if next_page:
+        response.headers["X-Next-Cursor"] = next_page
     
     # 确保 analysis_method 有默认值
     for record in records:
@@ -86,11 +167,88 @@ async def get_user_records(
     return records
 
 
+@router.get("/{user_id}/summary", response_model=NutritionSummaryResponse)
+async def get_user_summary(
+    user_id: str,
+    request: Request,
+    response: Response,
+    from_date: date = Query(..., alias="from"),
+    to_date: date = Query(..., alias="to"),
+    period: str = Query("day", pattern="^(day|week)$"),
+    current_user: UserInfo = Depends(require_auth),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    获取用户在日期范围内的热量汇总
+    参数：
+        user_id: 用户ID
+        from: 开始日期（含），格式 YYYY-MM-DD
+        to: 结束日期（含），格式 YYYY-MM-DD
+        period: day 按天汇总，week 按周（周一开始）汇总
+    返回：
+        NutritionSummaryResponse: 范围内的合计与每天/每周的汇总，直接查询每日汇总表；
+        If-None-Match 与ETag匹配时不查询数据库直接返回304
+    """
+    if current_user.user_id != user_id:
+        raise HTTPException(status_code=403, detail="只能查看自己的汇总")
+    if to_date < from_date:
+        raise HTTPException(status_code=400, detail="结束日期不能早于开始日期")
+    if (to_date - from_date).days + 1 > settings.ROLLUP_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"单次最多查询 {settings.ROLLUP_MAX_DAYS} 天")
+
+    etag = response_cache.etag(f"records:{user_id}", "summary", from_date, to_date, period)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if response_cache.check(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    return await summarize(db, user_id, from_date, to_date, period)
+
+
+@router.get("/{user_id}/export")
+async def export_user_records(
+    user_id: str,
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+    gzip: bool = False,
+    current_user: UserInfo = Depends(require_auth)
+):
+    """
+    流式导出用户的全部饮食记录
+    参数：
+        user_id: 用户ID
+        format: 导出格式，csv、ndjson 或 parquet（需要服务器安装 pyarrow）
+        gzip: 是否以gzip压缩，压缩后文件名以 .gz 结尾
+    返回：
+        StreamingResponse: 按创建时间升序的记录文件，以服务端游标分批读取并边读边发送
+    """
+    if current_user.user_id != user_id:
+        raise HTTPException(status_code=403, detail="只能导出自己的记录")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="服务器未安装 pyarrow，不支持 Parquet 格式导出")
+
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"diet_records_{datetime.now(timezone.utc):%Y%m%d}.{extension}"
+    if gzip:
+        media_type, filename = "application/gzip", filename + ".gz"
+
+    # 会话由导出生成器持有，请求依赖中的会话不一定覆盖整个流式响应的发送过程
+    session_factory = replica_router.session_factory(client_key(request))
+    return StreamingResponse(
+        export_records(session_factory, user_id, format, gzip),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+        }
+    )
+
+
 @router.delete("/{user_id}/{record_id}")
 async def delete_user_record(
     user_id: str,
     record_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     删除指定的用户饮食记录
@@ -102,10 +260,12 @@ async def delete_user_record(
     """
     try:
         # 查找指定的记录，同时验证用户ID和记录ID
-        record = db.query(DietRecord).filter(
-            DietRecord.id == record_id,
-            DietRecord.user_id == user_id
-        ).first()
+        record = (await db.execute(
+            select(DietRecord).where(
+                DietRecord.id == record_id,
+                DietRecord.user_id == user_id
+            )
+        )).scalars().first()
         
         # 检查记录是否存在
         if not record:
@@ -114,9 +274,11 @@ async def delete_user_record(
                 detail=f"未找到用户 {user_id} 的记录 ID {record_id}"
             )
         
-        # 删除记录
-        db.delete(record)
-        db.commit()
+        # 删除记录，同一事务中从每日汇总中扣除
+        await apply_records(db, [record], sign=-1)
+        await db.delete(record)
+        await db.commit()
+        response_cache.bump(f"records:{user_id}")
         
         return {
             "message": "记录删除成功",
@@ -128,7 +290,7 @@ async def delete_user_record(
         # 重新抛出 HTTP 异常
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500, 
             detail=f"删除记录失败: {str(e)}"
@@ -19,7 +19,7 @@ class UserInfo(BaseModel):
     server_credits: float = 0.0
 
 
-def require_auth(x_session_id: Optional[str] = Header(None, alias="X-Session-ID")):
+async def require_auth(x_session_id: Optional[str] = Header(None, alias="X-Session-ID")):
     """需要认证的依赖注入 - 从 HTTP Header 读取 session"""
     if not x_session_id:
         raise HTTPException(
@@ -27,7 +27,7 @@ def require_auth(x_session_id: Optional[str] = Header(None, alias="X-Session-ID"
             detail="未登录，请先登录"
         )
 
-    session = db_session_manager.validate_session(x_session_id)
+    session = await db_session_manager.validate_session(x_session_id)
     if not session:
         raise HTTPException(
             status_code=401,
@@ -41,12 +41,12 @@ def require_auth(x_session_id: Optional[str] = Header(None, alias="X-Session-ID"
     )
 
 
-def optional_auth(x_session_id: Optional[str] = Header(None, alias="X-Session-ID")) -> Optional[UserInfo]:
+async def optional_auth(x_session_id: Optional[str] = Header(None, alias="X-Session-ID")) -> Optional[UserInfo]:
     """可选认证的依赖注入 - 从 HTTP Header 读取 session"""
     if not x_session_id:
         return None
 
-    session = db_session_manager.validate_session(x_session_id)
+    session = await db_session_manager.validate_session(x_session_id)
     if not session:
         return None
 
@@ -0,0 +1,133 @@
+"""
+内容寻址的图片存储模块
+图片按 SHA-256 摘要保存在本地文件系统中，相同内容只存一份，数据库只保存摘要
+"""
+
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+from typing import Optional, Tuple
+
+from app.core.config import settings
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class InvalidImageData(ValueError):
+    """图片数据无法解码"""
+
+
+def decode_data_url(data: str) -> bytes:
+    """
+    解码前端提交的图片数据
+
+    Args:
+        data: data URL（data:image/jpeg;base64,...）或纯base64字符串
+
+    Returns:
+        图片原始字节
+    """
+    if data.startswith("data:"):
+        _, _, data = data.partition(",")
+    try:
+        return base64.b64decode(data, validate=False)
+    except (binascii.Error, ValueError) as e:
+        raise InvalidImageData(f"图片数据不是有效的base64: {e}")
+
+
+def content_digest(data: bytes) -> str:
+    """内容的 SHA-256 摘要（十六进制），即存储中的文件名"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def detect_content_type(head: bytes) -> str:
+    """根据文件头识别图片类型"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+class BlobStore:
+    """
+    内容寻址的文件存储
+
+    文件路径为 <root>/<摘要前2位>/<摘要后续2位>/<摘要>，写入时先写临时文件再原子重命名，
+    并发写入相同内容互不影响。
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, digest: str) -> str:
+        """摘要对应的文件路径，摘要格式非法时抛出 ValueError"""
+        if not _DIGEST_RE.match(digest):
+            raise ValueError(f"无效的摘要: {digest}")
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def put(self, data: bytes) -> str:
+        """
+        保存内容，已存在时直接返回
+
+        Returns:
+            内容的 SHA-256 摘要（十六进制）
+        """
+        digest = content_digest(data)
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return digest
+
+    def stat(self, digest: str) -> Optional[Tuple[int, str]]:
+        """
+        获取内容的大小和类型
+
+        Returns:
+            (字节数, MIME类型)，不存在时返回None
+        """
+        try:
+            path = self.path(digest)
+            size = os.path.getsize(path)
+            with open(path, "rb") as f:
+                head = f.read(16)
+        except (ValueError, OSError):
+            return None
+        return size, detect_content_type(head)
+
+    def read(self, digest: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        """读取内容的 [start, end] 字节区间（end 包含在内，None 表示读到结尾）"""
+        with open(self.path(digest), "rb") as f:
+            f.seek(start)
+            return f.read() if end is None else f.read(end - start + 1)
+
+    def delete(self, digest: str) -> bool:
+        """删除内容，返回是否存在"""
+        try:
+            os.unlink(self.path(digest))
+            return True
+        except (ValueError, FileNotFoundError):
+            return False
+
+
+# 全局图片存储实例
+blob_store = BlobStore(settings.BLOB_STORE_DIR)
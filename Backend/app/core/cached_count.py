@@ -0,0 +1,58 @@
+"""
+计数缓存模块
+在进程内缓存表的总行数，本进程的增删直接调整缓存，其他进程的变更在TTL内生效
+"""
+
+import time
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics_registry
+
+
+class CachedCount:
+    """带TTL的行数缓存"""
+
+    def __init__(self, ttl: int = 30):
+        self.ttl = ttl
+        self.value: Optional[int] = None
+        self.loaded_at = 0.0
+        self.lock = Lock()
+        self.loads = 0
+
+    async def get(self, loader: Callable[[], Awaitable[int]]) -> int:
+        """
+        获取行数，缓存为空或过期时调用 loader 重新统计
+
+        Args:
+            loader: 执行 count 查询的协程函数
+
+        Returns:
+            行数
+        """
+        with self.lock:
+            if self.value is not None and time.monotonic() - self.loaded_at < self.ttl:
+                return self.value
+        value = await loader()
+        with self.lock:
+            self.value = value
+            self.loaded_at = time.monotonic()
+            self.loads += 1
+        return value
+
+    def adjust(self, delta: int):
+        """按本进程已提交的增删调整缓存"""
+        with self.lock:
+            if self.value is not None:
+                self.value = max(self.value + delta, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存指标"""
+        with self.lock:
+            return {"value": self.value, "loads": self.loads}
+
+
+# 全局画廊分享数缓存实例
+gallery_share_count = CachedCount(settings.GALLERY_COUNT_CACHE_TTL)
+metrics_registry.register("gallery_share_count", gallery_share_count.stats)
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import EmailStr
 
@@ -21,9 +21,89 @@ class Settings(BaseSettings):
     MODEL_URL: str
     MODEL_KEY: str
     MODEL_NAME: str
+    # 服务器配置下单次分析的token预算，不设置则不限制
+    SERVER_TOKEN_BUDGET: Optional[int] = None
+    # 用量接近预算时切换的降级模型（可选）
+    MODEL_FALLBACK_NAME: Optional[str] = None
 
     SQLALCHEMY_DATABASE_URI: Optional[str] = None
 
+    # 画廊最多保留的分享数，以及画廊总数缓存的刷新间隔（秒）
+    GALLERY_MAX_SHARES: int = 100
+    GALLERY_COUNT_CACHE_TTL: int = 30
+
+    # 列表响应缓存：其他进程写入后ETag失效的最长延迟（秒），以及匿名画廊响应的缓存条数
+    RESPONSE_CACHE_TTL: int = 10
+    RESPONSE_CACHE_MAX_ENTRIES: int = 256
+
+    # 列表接口（画廊、饮食记录）单页最大条数
+    PAGINATION_MAX_LIMIT: int = 100
+
+    # 营养汇总：按该时区划分自然日，以及汇总接口单次查询的最大天数
+    ROLLUP_TIMEZONE: str = "Asia/Shanghai"
+    ROLLUP_MAX_DAYS: int = 366
+
+    # 饮食记录导出时每批从服务端游标读取的行数
+    EXPORT_BATCH_SIZE: int = 500
+
+    # 批量写入饮食记录时单次请求的最大条数
+    RECORD_BATCH_MAX_ITEMS: int = 500
+
+    # 画廊图片存储目录（内容寻址，相同图片只存一份）与单张图片大小上限（字节）
+    BLOB_STORE_DIR: str = "data/blobs"
+    GALLERY_IMAGE_MAX_BYTES: int = 10 * 1024 * 1024
+    # 图片衍生尺寸（缩略图、卡片图、大图）的缓存目录、生成线程数与压缩质量
+    IMAGE_VARIANT_DIR: str = "data/variants"
+    IMAGE_VARIANT_WORKERS: int = 2
+    IMAGE_VARIANT_QUALITY: int = 80
+
+    # 数据库连接池配置：常驻连接数、额外连接数、获取连接超时与连接回收时间（秒）
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 3600
+
+    # 只读副本连接URL（逗号分隔，可选），以及写请求后同一客户端读主库的时间窗口（秒）
+    DB_REPLICA_URLS: Optional[str] = None
+    DB_READ_YOUR_WRITES_WINDOW: int = 5
+
+    # 调用点流水批量写入配置
+    CREDIT_LEDGER_FLUSH_INTERVAL: int = 5
+    CREDIT_LEDGER_BATCH_SIZE: int = 200
+
+    # 调用点预留配置：预留有效期、缓存余额刷新间隔、对账间隔（秒）
+    CREDIT_RESERVATION_TTL: int = 120
+    CREDIT_BALANCE_TTL: int = 60
+    CREDIT_RECONCILE_INTERVAL: int = 5
+
+    # 密码哈希配置：线程数、最大排队数及 argon2 参数（memory_cost 单位为KiB，默认值与 passlib 一致）
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    ARGON2_TIME_COST: int = 2
+    ARGON2_MEMORY_COST: int = 102400
+    ARGON2_PARALLELISM: int = 8
+
+    # 登录限流：每个用户名/IP在时间窗口（秒）内的最大尝试次数，0表示不限流
+    LOGIN_RATE_LIMIT: int = 10
+    LOGIN_RATE_LIMIT_WINDOW: int = 60
+
+    # 查询运行指标（/metrics）需要的管理令牌，未配置时该端点不可用
+    METRICS_ADMIN_TOKEN: Optional[str] = None
+
+    # Session模式：database 为数据库session，signed 为HMAC签名令牌
+    SESSION_MODE: str = "database"
+    SESSION_SECRET_KEY: Optional[str] = None
+    SESSION_REVOCATION_REFRESH_INTERVAL: int = 30
+
+    # Session缓存配置（TTL为0时关闭缓存）
+    SESSION_CACHE_TTL: int = 60
+    SESSION_CACHE_MAX_SIZE: int = 10000
+
+    # 过期session后台清理配置（间隔为0时关闭）
+    SESSION_REAPER_INTERVAL: int = 300
+    SESSION_REAPER_BATCH_SIZE: int = 1000
+    SESSION_REAPER_MAX_BATCHES: int = 100
+
     @property
     def get_database_url(self) -> str:
         """获取数据库连接URL"""
@@ -34,6 +114,25 @@ class Settings(BaseSettings):
             )
         return self.SQLALCHEMY_DATABASE_URI
 
+    @staticmethod
+    def _to_async_url(url: str) -> str:
+        for prefix in ("postgresql+psycopg2://", "postgresql://"):
+            if url.startswith(prefix):
+                return "postgresql+asyncpg://" + url[len(prefix):]
+        return url
+
+    @property
+    def get_async_database_url(self) -> str:
+        """获取异步（asyncpg）数据库连接URL"""
+        return self._to_async_url(self.get_database_url)
+
+    @property
+    def get_async_replica_urls(self) -> List[str]:
+        """获取只读副本的异步数据库连接URL列表"""
+        if not self.DB_REPLICA_URLS:
+            return []
+        return [self._to_async_url(url.strip()) for url in self.DB_REPLICA_URLS.split(",") if url.strip()]
+
     model_config = SettingsConfigDict(
         case_sensitive=True,
         env_file=".env"
@@ -1,16 +1,55 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.core.db_metrics import TimedAsyncQueuePool, db_metrics
 
+# 同步引擎：用于Alembic迁移和脚本
 engine = create_engine(
     settings.get_database_url,
     pool_pre_ping=True,
-    pool_recycle=3600
+    pool_recycle=settings.DB_POOL_RECYCLE
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _create_async_engine(url: str):
+    return create_async_engine(
+        url,
+        poolclass=TimedAsyncQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+        pool_recycle=settings.DB_POOL_RECYCLE
+    )
+
+
+def _async_sessionmaker(bind):
+    return sessionmaker(
+        bind=bind,
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+
+# 异步引擎（asyncpg）：用于请求处理，数据库等待不阻塞事件循环
+async_engine = _create_async_engine(settings.get_async_database_url)
+db_metrics.instrument(async_engine.sync_engine)
+AsyncSessionLocal = _async_sessionmaker(async_engine)
+
+# 只读副本引擎，未配置副本时为空，只读请求由 replica_router 选择
+replica_engines = [_create_async_engine(url) for url in settings.get_async_replica_urls]
+for index, replica_engine in enumerate(replica_engines):
+    db_metrics.instrument(replica_engine.sync_engine, f"replica{index}")
+ReplicaSessionLocals = [_async_sessionmaker(replica_engine) for replica_engine in replica_engines]
+
 Base = declarative_base()
 
 # 依赖项函数
@@ -20,3 +59,19 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """请求级数据库会话，同一请求中的依赖共享同一个会话"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+@asynccontextmanager
+async def use_async_session(db: Optional[AsyncSession] = None) -> AsyncIterator[AsyncSession]:
+    """复用调用方传入的会话，未传入时（如后台任务）新建一个"""
+    if db is not None:
+        yield db
+        return
+    async with AsyncSessionLocal() as own_db:
+        yield own_db
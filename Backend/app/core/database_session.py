@@ -1,36 +1,51 @@
 """
 数据库Session管理模块
 提供基于数据库的session管理功能，支持分布式部署和持久化
+
+SESSION_MODE=signed 时向客户端签发签名令牌，验证不访问数据库，
+sessions表仅用于登出吊销和会话统计。
 """
 
 import uuid
-import time
-from typing import Dict, Optional, List
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
-
-from app.core.database import SessionLocal
+from typing import Optional, List
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, or_, func, select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, use_async_session
+from app.core.session_cache import CachedSession, session_cache
+from app.core.signed_session import signed_session_manager
 from app.models.models import Session as DBSession
 
 
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class DatabaseSessionManager:
-    """基于数据库的Session管理器"""
+    """
+    基于数据库的Session管理器
+
+    各方法可传入请求中已有的数据库会话以复用连接，未传入时自行创建会话。
+    """
 
     def __init__(self, session_timeout: int = 3600 * 24 * 7):  # 默认7天
         self.session_timeout = session_timeout
 
-    def create_session(self, user_id: str, username: str, ip_address: str = "", user_agent: str = "") -> str:
-        """创建新session"""
-        with SessionLocal() as db:
-            # 清理过期session
-            self._cleanup_expired_sessions(db)
+    @property
+    def signed_mode(self) -> bool:
+        """是否使用签名令牌"""
+        return settings.SESSION_MODE == "signed"
 
+    async def create_session(self, user_id: str, username: str, ip_address: str = "", user_agent: str = "", db: Optional[AsyncSession] = None) -> str:
+        """创建新session"""
+        async with use_async_session(db) as db:
             # 生成session ID
             session_id = str(uuid.uuid4())
 
             # 创建数据库session记录
-            expires_at = datetime.utcnow() + timedelta(seconds=self.session_timeout)
+            expires_at = _utcnow() + timedelta(seconds=self.session_timeout)
             db_session = DBSession(
                 session_id=session_id,
                 user_id=user_id,
@@ -42,110 +57,169 @@ class DatabaseSessionManager:
             )
 
             db.add(db_session)
-            db.commit()
+            await db.commit()
 
+            if self.signed_mode:
+                return signed_session_manager.issue(session_id, user_id, username, expires_at)
             return session_id
 
-    def validate_session(self, session_id: str) -> Optional[DBSession]:
-        """验证session是否有效"""
-        with SessionLocal() as db:
-            # 清理过期session
-            self._cleanup_expired_sessions(db)
+    async def validate_session(self, session_id: str, db: Optional[AsyncSession] = None) -> Optional[CachedSession]:
+        """验证session是否有效，优先使用进程内缓存"""
+        if self.signed_mode:
+            return signed_session_manager.verify(session_id)
 
+        cached = session_cache.get_session(session_id)
+        if cached:
+            return cached
+
+        async with use_async_session(db) as db:
             # 查询session
-            session = db.query(DBSession).filter(
-                and_(
-                    DBSession.session_id == session_id,
-                    DBSession.is_active == 1,
-                    DBSession.expires_at > datetime.utcnow()
+            session = (await db.execute(
+                select(DBSession).where(
+                    and_(
+                        DBSession.session_id == session_id,
+                        DBSession.is_active == 1,
+                        DBSession.expires_at > _utcnow()
+                    )
                 )
-            ).first()
+            )).scalars().first()
+
+            if not session:
+                return None
 
-            return session
+            cached = CachedSession(
+                session_id=session.session_id,
+                user_id=session.user_id,
+                username=session.username,
+                expires_at=session.expires_at
+            )
+            session_cache.put_session(cached)
+            return cached
 
-    def invalidate_session(self, session_id: str) -> bool:
+    async def invalidate_session(self, session_id: str, db: Optional[AsyncSession] = None) -> bool:
         """使session失效（登出）"""
-        with SessionLocal() as db:
-            session = db.query(DBSession).filter(DBSession.session_id == session_id).first()
-            if session:
-                session.is_active = 0
-                db.commit()
-                return True
-            return False
+        if self.signed_mode:
+            # 签名令牌：按令牌中的session_id吊销
+            token_session = signed_session_manager.decode(session_id)
+            if not token_session:
+                return False
+            session_id = token_session.session_id
+            signed_session_manager.revoke(session_id)
+        session_cache.invalidate_session(session_id)
+        async with use_async_session(db) as db:
+            result = await db.execute(
+                update(DBSession)
+                .where(DBSession.session_id == session_id)
+                .values(is_active=0)
+            )
+            await db.commit()
+            return result.rowcount > 0
 
-    def invalidate_user_sessions(self, user_id: str) -> int:
+    async def invalidate_user_sessions(self, user_id: str, db: Optional[AsyncSession] = None) -> int:
         """使指定用户的所有session失效"""
-        with SessionLocal() as db:
-            result = db.query(DBSession).filter(
-                and_(
-                    DBSession.user_id == user_id,
-                    DBSession.is_active == 1
+        session_cache.invalidate_user(user_id)
+        async with use_async_session(db) as db:
+            result = await db.execute(
+                update(DBSession)
+                .where(
+                    and_(
+                        DBSession.user_id == user_id,
+                        DBSession.is_active == 1
+                    )
                 )
-            ).update({"is_active": 0})
-            db.commit()
-            return result
+                .values(is_active=0)
+            )
+            await db.commit()
+
+        if self.signed_mode:
+            await signed_session_manager.refresh_revoked()
+        return result.rowcount
 
-    def get_user_sessions(self, user_id: str) -> List[DBSession]:
+    async def get_user_sessions(self, user_id: str, db: Optional[AsyncSession] = None) -> List[DBSession]:
         """获取用户的活跃session列表"""
-        with SessionLocal() as db:
-            self._cleanup_expired_sessions(db)
-            return db.query(DBSession).filter(
-                and_(
-                    DBSession.user_id == user_id,
-                    DBSession.is_active == 1,
-                    DBSession.expires_at > datetime.utcnow()
+        async with use_async_session(db) as db:
+            return (await db.execute(
+                select(DBSession).where(
+                    and_(
+                        DBSession.user_id == user_id,
+                        DBSession.is_active == 1,
+                        DBSession.expires_at > _utcnow()
+                    )
                 )
-            ).all()
-
-    def extend_session(self, session_id: str, additional_seconds: int = 3600) -> bool:
-        """延长session过期时间"""
-        with SessionLocal() as db:
-            session = db.query(DBSession).filter(
-                and_(
-                    DBSession.session_id == session_id,
-                    DBSession.is_active == 1
-                )
-            ).first()
+            )).scalars().all()
 
-            if session:
-                session.expires_at = datetime.utcnow() + timedelta(seconds=additional_seconds)
-                db.commit()
-                return True
+    async def extend_session(self, session_id: str, additional_seconds: int = 3600, db: Optional[AsyncSession] = None) -> bool:
+        """延长session过期时间（签名令牌的过期时间已写入令牌，无法延长）"""
+        if self.signed_mode:
             return False
-
-    def _cleanup_expired_sessions(self, db: Session):
-        """清理过期的session"""
-        expired_count = db.query(DBSession).filter(
-            or_(
-                DBSession.is_active == 0,
-                DBSession.expires_at <= datetime.utcnow()
+        session_cache.invalidate_session(session_id)
+        async with use_async_session(db) as db:
+            result = await db.execute(
+                update(DBSession)
+                .where(
+                    and_(
+                        DBSession.session_id == session_id,
+                        DBSession.is_active == 1
+                    )
+                )
+                .values(expires_at=_utcnow() + timedelta(seconds=additional_seconds))
+            )
+            await db.commit()
+            return result.rowcount > 0
+
+    async def delete_expired_sessions(self, batch_size: int = 1000) -> int:
+        """
+        删除一批过期或已失效的session，由后台清理任务调用
+
+        每次最多删除 batch_size 行，已被其他进程锁定的行会被跳过，
+        避免多个进程同时清理时互相等待。签名模式下已失效但未过期的行
+        是吊销记录，保留到过期后再删除。
+
+        Returns:
+            本批删除的行数
+        """
+        now = _utcnow()
+        if self.signed_mode:
+            condition = DBSession.expires_at <= now
+        else:
+            condition = or_(DBSession.is_active == 0, DBSession.expires_at <= now)
+
+        async with AsyncSessionLocal() as db:
+            expired_ids = select(DBSession.id).where(
+                condition
+            ).limit(batch_size).with_for_update(skip_locked=True)
+
+            result = await db.execute(
+                delete(DBSession).where(DBSession.id.in_(expired_ids))
             )
-        ).delete()
-        if expired_count > 0:
-            db.commit()
+            await db.commit()
+            return result.rowcount
 
-    def get_session_count(self) -> int:
+    async def get_session_count(self, db: Optional[AsyncSession] = None) -> int:
         """获取活跃session数量"""
-        with SessionLocal() as db:
-            self._cleanup_expired_sessions(db)
-            return db.query(func.count(DBSession.id)).filter(
-                and_(
-                    DBSession.is_active == 1,
-                    DBSession.expires_at > datetime.utcnow()
+        async with use_async_session(db) as db:
+            return (await db.execute(
+                select(func.count(DBSession.id)).where(
+                    and_(
+                        DBSession.is_active == 1,
+                        DBSession.expires_at > _utcnow()
+                    )
                 )
-            ).scalar()
+            )).scalar()
 
-    def get_user_session_count(self, user_id: str) -> int:
+    async def get_user_session_count(self, user_id: str, db: Optional[AsyncSession] = None) -> int:
         """获取用户的活跃session数量"""
-        with SessionLocal() as db:
-            return db.query(func.count(DBSession.id)).filter(
-                and_(
-                    DBSession.user_id == user_id,
-                    DBSession.is_active == 1,
-                    DBSession.expires_at > datetime.utcnow()
+        async with use_async_session(db) as db:
+            return (await db.execute(
+                select(func.count(DBSession.id)).where(
+                    and_(
+                        DBSession.user_id == user_id,
+                        DBSession.is_active == 1,
+                        DBSession.expires_at > _utcnow()
+                    )
                 )
-            ).scalar()
+            )).scalar()
 
 
 # 全局数据库session管理器实例
-db_session_manager = DatabaseSessionManager()
\ No newline at end of file
+db_session_manager = DatabaseSessionManager()
@@ -0,0 +1,118 @@
+"""
+数据库指标模块
+统计每个请求的SQL执行次数和连接池等待时间，以及连接池的使用情况
+"""
+
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.metrics import metrics_registry
+
+
+@dataclass
+class RequestDBStats:
+    """单个请求的数据库统计"""
+    queries: int = 0
+    checkouts: int = 0
+    checkout_wait_ms: float = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestDBStats]] = ContextVar("request_db_stats", default=None)
+
+
+class DatabaseMetrics:
+    """按请求汇总的数据库指标"""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.requests = 0
+        self.queries_total = 0
+        self.queries_max = 0
+        self.request_wait_max_ms = 0.0
+        self.checkouts_total = 0
+        self.checkout_wait_total_ms = 0.0
+        self.checkout_wait_max_ms = 0.0
+        self.pools: Dict[str, Any] = {}
+
+    def start_request(self) -> RequestDBStats:
+        """开始统计当前请求"""
+        stats = RequestDBStats()
+        _request_stats.set(stats)
+        return stats
+
+    def finish_request(self, stats: RequestDBStats):
+        """结束统计当前请求并汇总"""
+        with self.lock:
+            self.requests += 1
+            self.queries_total += stats.queries
+            self.queries_max = max(self.queries_max, stats.queries)
+            self.request_wait_max_ms = max(self.request_wait_max_ms, stats.checkout_wait_ms)
+
+    def record_query(self):
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+
+    def record_checkout(self, wait_ms: float):
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.checkouts += 1
+            stats.checkout_wait_ms += wait_ms
+        with self.lock:
+            self.checkouts_total += 1
+            self.checkout_wait_total_ms += wait_ms
+            self.checkout_wait_max_ms = max(self.checkout_wait_max_ms, wait_ms)
+
+    def instrument(self, engine, name: str = "primary"):
+        """为引擎注册SQL执行计数，name 用于区分主库和只读副本的连接池"""
+        self.pools[name] = engine.pool
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _count_query(conn, cursor, statement, parameters, context, executemany):
+            self.record_query()
+
+    def stats(self) -> Dict[str, Any]:
+        """数据库指标"""
+        with self.lock:
+            result: Dict[str, Any] = {
+                "requests": self.requests,
+                "queries_total": self.queries_total,
+                "queries_per_request_avg": round(self.queries_total / self.requests, 2) if self.requests else 0.0,
+                "queries_per_request_max": self.queries_max,
+                "checkouts": self.checkouts_total,
+                "checkout_wait_avg_ms": round(self.checkout_wait_total_ms / self.checkouts_total, 3) if self.checkouts_total else 0.0,
+                "checkout_wait_max_ms": round(self.checkout_wait_max_ms, 3),
+                "checkout_wait_per_request_max_ms": round(self.request_wait_max_ms, 3),
+            }
+        result["pools"] = {
+            name: {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "idle": pool.checkedin(),
+            }
+            for name, pool in self.pools.items()
+        }
+        return result
+
+
+# 全局数据库指标实例
+db_metrics = DatabaseMetrics()
+metrics_registry.register("database", db_metrics.stats)
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """记录获取连接等待时间的连接池"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_metrics.record_checkout((time.perf_counter() - started) * 1000)
@@ -0,0 +1,159 @@
+"""
+图片衍生尺寸模块
+为图片存储中的原图生成缩略图、卡片图和大图（WebP 与 JPEG 两种格式），
+在后台线程池中生成并缓存到磁盘
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Dict, Set
+
+from PIL import Image, ImageOps
+
+from app.core.blob_store import blob_store
+from app.core.config import settings
+from app.core.metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+# 衍生尺寸名称 -> 最长边像素，原图小于该尺寸时不放大
+VARIANTS = {"thumb": 400, "card": 800, "full": 1600}
+
+# 格式名称 -> (Pillow格式, MIME类型)
+FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+
+
+class ImageVariants:
+    """
+    图片衍生尺寸的生成与缓存
+
+    文件路径为 <root>/<摘要前2位>/<摘要>/<尺寸>.<格式>。同一张图片的生成任务
+    只提交一次，生成失败（如原图不是有效图片）的摘要会被记录，之后直接返回原图。
+    """
+
+    def __init__(self, root: str, workers: int = 2, quality: int = 80):
+        self.root = root
+        self.quality = quality
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-variants")
+        self.in_flight: Dict[str, Future] = {}
+        self.failed: Set[str] = set()
+        self.lock = Lock()
+
+        # 运行指标
+        self.generated = 0
+        self.errors = 0
+        self.total_ms = 0.0
+
+    def _dir(self, digest: str) -> str:
+        blob_store.path(digest)  # 校验摘要格式
+        return os.path.join(self.root, digest[:2], digest)
+
+    def path(self, digest: str, variant: str, fmt: str) -> str:
+        """衍生图片的文件路径"""
+        return os.path.join(self._dir(digest), f"{variant}.{fmt}")
+
+    def exists(self, digest: str) -> bool:
+        """所有尺寸和格式是否都已生成"""
+        return all(
+            os.path.exists(self.path(digest, variant, fmt))
+            for variant in VARIANTS for fmt in FORMATS
+        )
+
+    def _save(self, image: Image.Image, path: str, fmt: str):
+        pil_format, _ = FORMATS[fmt]
+        if pil_format == "JPEG" and image.mode != "RGB":
+            image = image.convert("RGB")
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                image.save(f, pil_format, quality=self.quality)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _generate(self, digest: str) -> bool:
+        started = time.perf_counter()
+        try:
+            if self.exists(digest):
+                return True
+            os.makedirs(self._dir(digest), exist_ok=True)
+            with Image.open(blob_store.path(digest)) as original:
+                # 按EXIF方向旋转，衍生图片不保留EXIF
+                source = ImageOps.exif_transpose(original)
+                if source.mode not in ("RGB", "RGBA"):
+                    source = source.convert("RGBA" if "A" in source.getbands() else "RGB")
+                for variant, max_edge in VARIANTS.items():
+                    resized = source.copy()
+                    resized.thumbnail((max_edge, max_edge), Image.LANCZOS)
+                    for fmt in FORMATS:
+                        self._save(resized, self.path(digest, variant, fmt), fmt)
+            with self.lock:
+                self.generated += 1
+                self.total_ms += (time.perf_counter() - started) * 1000
+            return True
+        except Exception:
+            logger.exception(f"生成图片衍生尺寸失败: {digest}")
+            with self.lock:
+                self.errors += 1
+                self.failed.add(digest)
+            return False
+        finally:
+            with self.lock:
+                self.in_flight.pop(digest, None)
+
+    def submit(self, digest: str) -> Future:
+        """
+        提交生成任务，同一张图片正在生成时返回已有任务
+
+        Returns:
+            结果为是否生成成功的Future
+        """
+        with self.lock:
+            if digest in self.failed:
+                future: Future = Future()
+                future.set_result(False)
+                return future
+            future = self.in_flight.get(digest)
+            if future is None:
+                future = self.executor.submit(self._generate, digest)
+                self.in_flight[digest] = future
+            return future
+
+    async def ensure(self, digest: str) -> bool:
+        """等待图片的衍生尺寸可用，返回是否生成成功"""
+        if digest not in self.failed and await asyncio.get_running_loop().run_in_executor(None, self.exists, digest):
+            return True
+        return await asyncio.wrap_future(self.submit(digest))
+
+    def delete(self, digest: str):
+        """删除图片的所有衍生尺寸"""
+        shutil.rmtree(self._dir(digest), ignore_errors=True)
+        with self.lock:
+            self.failed.discard(digest)
+
+    def stats(self) -> Dict[str, Any]:
+        """生成任务指标"""
+        with self.lock:
+            return {
+                "in_flight": len(self.in_flight),
+                "generated": self.generated,
+                "errors": self.errors,
+                "avg_ms": round(self.total_ms / self.generated, 2) if self.generated else 0.0,
+            }
+
+
+# 全局图片衍生尺寸实例
+image_variants = ImageVariants(
+    settings.IMAGE_VARIANT_DIR,
+    settings.IMAGE_VARIANT_WORKERS,
+    settings.IMAGE_VARIANT_QUALITY
+)
+metrics_registry.register("image_variants", image_variants.stats)
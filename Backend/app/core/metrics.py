@@ -0,0 +1,36 @@
+"""
+运行指标注册模块
+各子系统在创建全局实例后注册自己的指标函数，由 /metrics 端点统一汇总输出
+"""
+
+from threading import Lock
+from typing import Callable, Dict
+
+
+class MetricsRegistry:
+    """按名称登记各子系统的指标函数"""
+
+    def __init__(self):
+        self.sources: Dict[str, Callable[[], dict]] = {}
+        self.lock = Lock()
+
+    def register(self, name: str, stats: Callable[[], dict]):
+        """
+        注册指标函数
+
+        Args:
+            name: 指标名称，作为汇总结果中的键
+            stats: 返回该子系统当前指标的函数
+        """
+        with self.lock:
+            self.sources[name] = stats
+
+    def snapshot(self) -> Dict[str, dict]:
+        """按注册顺序汇总所有子系统的当前指标"""
+        with self.lock:
+            sources = list(self.sources.items())
+        return {name: stats() for name, stats in sources}
+
+
+# 全局指标注册表实例
+metrics_registry = MetricsRegistry()
@@ -0,0 +1,75 @@
+"""
+游标分页模块
+按 (排序列, id) 进行键集分页，默认按 (created_at, id) 倒序，游标对客户端不透明
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import tuple_
+
+
+class InvalidCursor(ValueError):
+    """游标无法解析"""
+
+
+def encode_cursor(value: Any, row_id: int, key: str = "created_at") -> str:
+    """将一页最后一行的 (排序列的值, id) 编码为游标，key 为排序列名"""
+    data = {"t": value.isoformat()} if isinstance(value, datetime) else {"v": value}
+    if key != "created_at":
+        data["k"] = key
+    payload = json.dumps({**data, "i": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, key: str = "created_at") -> Tuple[Any, int]:
+    """解析游标，格式错误或与排序列不一致时抛出 InvalidCursor"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if data.get("k", "created_at") != key:
+            raise ValueError("游标与排序方式不一致")
+        value = datetime.fromisoformat(data["t"]) if "t" in data else float(data["v"])
+        return value, int(data["i"])
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise InvalidCursor(f"无效的分页游标: {e}")
+
+
+def keyset_page(query, model, cursor: Optional[str], limit: int, key: str = "created_at", descending: bool = True):
+    """
+    为查询添加键集分页条件
+
+    Args:
+        query: select 语句
+        model: 含排序列和 id 列的模型
+        cursor: 上一页返回的游标，None 表示第一页
+        limit: 每页条数
+        key: 排序列名，该列不能为NULL（可为空的列需由调用方先过滤）
+        descending: 是否倒序
+
+    Returns:
+        多取一行的查询，用于判断是否还有下一页
+    """
+    column = getattr(model, key)
+    if cursor:
+        value, row_id = decode_cursor(cursor, key)
+        position = tuple_(column, model.id)
+        query = query.where(position < tuple_(value, row_id) if descending else position > tuple_(value, row_id))
+    if descending:
+        return query.order_by(column.desc(), model.id.desc()).limit(limit + 1)
+    return query.order_by(column.asc(), model.id.asc()).limit(limit + 1)
+
+
+def next_cursor(rows: list, limit: int, key: str = "created_at") -> Tuple[list, Optional[str]]:
+    """
+    截取一页数据并生成下一页游标
+
+    Returns:
+        (本页数据, 下一页游标)，没有下一页时游标为None
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, key), last.id, key)
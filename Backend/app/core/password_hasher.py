@@ -0,0 +1,147 @@
+"""
+密码哈希模块
+在独立的有界线程池中执行 argon2 哈希与校验，避免阻塞事件循环
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+from app.core.config import settings
+from app.core.metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(Exception):
+    """等待哈希的任务过多"""
+
+
+def _truncate_password(password: str, max_bytes: int = 72) -> str:
+    """
+    将密码截断到指定字节数
+    argon2 理论上支持非常长的密码，但为了安全起见还是限制一下
+    """
+    password_bytes = password.encode('utf-8')
+    if len(password_bytes) <= max_bytes:
+        return password
+
+    # 截断到 max_bytes，并确保不会在多字节字符中间截断
+    truncated_bytes = password_bytes[:max_bytes]
+    # 尝试解码，如果失败则逐个字节回退
+    for i in range(len(truncated_bytes), 0, -1):
+        try:
+            return truncated_bytes[:i].decode('utf-8')
+        except UnicodeDecodeError:
+            continue
+    return password  # 极端情况下返回原始密码
+
+
+class PasswordHasher:
+    """
+    argon2 密码哈希器
+
+    argon2 的计算在C扩展中进行并释放GIL，放到线程池中即可与事件循环并行。
+    线程数限制同时进行的哈希数量，max_pending 限制排队数量，超出时直接拒绝。
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 32, time_cost: int = 2, memory_cost: int = 102400, parallelism: int = 8):
+        self.context = CryptContext(
+            schemes=["argon2"],
+            deprecated="auto",
+            argon2__time_cost=time_cost,
+            argon2__memory_cost=memory_cost,
+            argon2__parallelism=parallelism
+        )
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hasher")
+        self.lock = Lock()
+        self.pending = 0
+
+        # 运行指标：操作 -> [次数, 总耗时ms, 最大耗时ms, 总排队ms]
+        self.timings: Dict[str, list] = {"hash": [0, 0.0, 0.0, 0.0], "verify": [0, 0.0, 0.0, 0.0]}
+        self.rejected = 0
+
+    def _timed(self, operation: str, queued_at: float, func, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            queued_ms = (started - queued_at) * 1000
+            with self.lock:
+                stats = self.timings[operation]
+                stats[0] += 1
+                stats[1] += elapsed_ms
+                stats[2] = max(stats[2], elapsed_ms)
+                stats[3] += queued_ms
+
+    async def _submit(self, operation: str, func, *args):
+        with self.lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy("密码校验请求过多，请稍后重试")
+            self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor, self._timed, operation, time.perf_counter(), func, *args
+            )
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """生成密码哈希"""
+        return await self._submit("hash", self.context.hash, _truncate_password(password))
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        验证密码，哈希参数已变更时同时返回按新参数生成的哈希
+
+        Returns:
+            (是否匹配, 新哈希或None)
+        """
+        try:
+            return await self._submit(
+                "verify", self.context.verify_and_update, _truncate_password(password), hashed_password
+            )
+        except PasswordHasherBusy:
+            raise
+        except Exception as e:
+            logger.debug(f"验证密码时发生错误: {e}")
+            return False, None
+
+    def stats(self) -> Dict[str, Any]:
+        """哈希耗时指标"""
+        with self.lock:
+            result: Dict[str, Any] = {
+                "workers": self.workers,
+                "pending": self.pending,
+                "rejected": self.rejected,
+            }
+            for operation, (count, total_ms, max_ms, queued_ms) in self.timings.items():
+                result[operation] = {
+                    "count": count,
+                    "avg_ms": round(total_ms / count, 2) if count else 0.0,
+                    "max_ms": round(max_ms, 2),
+                    "avg_queue_ms": round(queued_ms / count, 2) if count else 0.0,
+                }
+            return result
+
+
+# 全局密码哈希器实例
+password_hasher = PasswordHasher(
+    settings.PASSWORD_HASH_WORKERS,
+    settings.PASSWORD_HASH_MAX_PENDING,
+    settings.ARGON2_TIME_COST,
+    settings.ARGON2_MEMORY_COST,
+    settings.ARGON2_PARALLELISM
+)
+metrics_registry.register("password_hasher", password_hasher.stats)
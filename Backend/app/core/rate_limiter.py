@@ -0,0 +1,61 @@
+"""
+限流模块
+按键（用户名、IP等）在滑动时间窗口内限制请求次数
+"""
+
+import time
+from collections import deque
+from threading import Lock
+from typing import Deque, Dict
+
+from app.core.config import settings
+from app.core.metrics import metrics_registry
+
+
+class SlidingWindowRateLimiter:
+    """滑动窗口限流器"""
+
+    def __init__(self, limit: int, window: int):
+        self.limit = limit
+        self.window = window
+        self.hits: Dict[str, Deque[float]] = {}
+        self.lock = Lock()
+        self.rejected = 0
+
+    def hit(self, key: str) -> int:
+        """
+        记录一次请求
+
+        Args:
+            key: 限流键
+
+        Returns:
+            需要等待的秒数，0 表示允许本次请求
+        """
+        if self.limit <= 0:
+            return 0
+        now = time.monotonic()
+        with self.lock:
+            hits = self.hits.setdefault(key, deque())
+            while hits and hits[0] <= now - self.window:
+                hits.popleft()
+            if len(hits) >= self.limit:
+                self.rejected += 1
+                return max(1, int(hits[0] + self.window - now) + 1)
+            hits.append(now)
+
+            # 键过多时清理已过期的空窗口
+            if len(self.hits) > 10000:
+                for stale in [k for k, v in self.hits.items() if not v or v[-1] <= now - self.window]:
+                    del self.hits[stale]
+            return 0
+
+    def stats(self) -> Dict[str, int]:
+        """限流统计"""
+        with self.lock:
+            return {"limit": self.limit, "window": self.window, "keys": len(self.hits), "rejected": self.rejected}
+
+
+# 全局登录限流器实例，用户名和IP分别计数
+login_rate_limiter = SlidingWindowRateLimiter(settings.LOGIN_RATE_LIMIT, settings.LOGIN_RATE_LIMIT_WINDOW)
+metrics_registry.register("login_rate_limiter", login_rate_limiter.stats)
@@ -0,0 +1,101 @@
+"""
+只读副本路由模块
+为只读接口选择数据库：默认轮询只读副本，客户端刚发起过写请求时仍读主库，
+保证用户能立即读到自己的写入（read-your-writes）
+"""
+
+import itertools
+import time
+from threading import Lock
+from typing import Any, Dict
+
+from fastapi import Request
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, ReplicaSessionLocals
+from app.core.metrics import metrics_registry
+
+# 不修改数据的HTTP方法，其余方法视为写请求
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def client_key(request: Request) -> str:
+    """识别客户端：优先使用session，未登录时使用IP"""
+    session_id = request.headers.get("X-Session-ID")
+    if session_id:
+        return f"session:{session_id}"
+    return f"ip:{request.client.host if request.client else ''}"
+
+
+class ReplicaRouter:
+    """只读请求的数据库路由"""
+
+    def __init__(self, replicas: list, window: int = 5):
+        self.replicas = replicas
+        self.window = window
+        self.cycle = itertools.cycle(range(len(replicas))) if replicas else None
+        self.recent_writes: Dict[str, float] = {}  # 客户端 -> 主库读取截止时间
+        self.lock = Lock()
+
+        # 运行指标
+        self.primary_reads = 0
+        self.replica_reads = 0
+        self.pinned_reads = 0
+
+    def mark_write(self, key: str):
+        """记录客户端的写请求，在时间窗口内该客户端的只读请求仍走主库"""
+        if not self.replicas or self.window <= 0:
+            return
+        now = time.monotonic()
+        with self.lock:
+            self.recent_writes[key] = now + self.window
+            # 键过多时清理已过期的记录
+            if len(self.recent_writes) > 10000:
+                for stale in [k for k, until in self.recent_writes.items() if until <= now]:
+                    del self.recent_writes[stale]
+
+    def session_factory(self, key: str):
+        """
+        为只读请求选择会话工厂
+
+        Args:
+            key: 客户端标识
+
+        Returns:
+            只读副本或主库的会话工厂
+        """
+        with self.lock:
+            if not self.replicas:
+                self.primary_reads += 1
+                return AsyncSessionLocal
+            until = self.recent_writes.get(key)
+            if until is not None:
+                if until > time.monotonic():
+                    self.pinned_reads += 1
+                    return AsyncSessionLocal
+                del self.recent_writes[key]
+            self.replica_reads += 1
+            return self.replicas[next(self.cycle)]
+
+    def stats(self) -> Dict[str, Any]:
+        """读路由指标"""
+        with self.lock:
+            return {
+                "replicas": len(self.replicas),
+                "window": self.window,
+                "primary_reads": self.primary_reads,
+                "replica_reads": self.replica_reads,
+                "pinned_reads": self.pinned_reads,
+                "tracked_clients": len(self.recent_writes),
+            }
+
+
+# 全局只读副本路由实例
+replica_router = ReplicaRouter(ReplicaSessionLocals, settings.DB_READ_YOUR_WRITES_WINDOW)
+metrics_registry.register("replica_router", replica_router.stats)
+
+
+async def get_async_read_db(request: Request):
+    """只读接口的数据库会话依赖，按客户端最近是否写入选择副本或主库"""
+    async with replica_router.session_factory(client_key(request))() as db:
+        yield db
@@ -0,0 +1,116 @@
+"""
+响应缓存模块
+按数据范围维护版本号，写入时递增；读接口用版本号和请求参数生成ETag，
+客户端携带匹配的 If-None-Match 时无需查询数据库直接返回304
+"""
+
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Optional
+
+from fastapi import Request
+
+from app.core.config import settings
+from app.core.metrics import metrics_registry
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """请求的 If-None-Match 是否与ETag匹配"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in [tag.strip() for tag in if_none_match.split(",")]
+
+
+class ResponseCache:
+    """
+    版本号、ETag与共享响应缓存
+
+    版本号只在本进程内递增，ETag中还包含进程启动标识和按 ttl 滚动的时间段，
+    其他进程的写入最多延迟 ttl 秒使ETag失效；进程重启后旧ETag全部失效。
+    """
+
+    def __init__(self, ttl: int = 10, max_entries: int = 256):
+        self.ttl = max(ttl, 1)
+        self.max_entries = max_entries
+        self.boot_id = uuid.uuid4().hex[:8]
+        self.versions: Dict[str, int] = {}
+        self.entries: OrderedDict = OrderedDict()  # ETag -> 响应体
+        self.lock = Lock()
+
+        # 运行指标
+        self.not_modified = 0
+        self.hits = 0
+        self.misses = 0
+
+    def bump(self, scope: str):
+        """数据范围有写入并提交后调用，使该范围的ETag失效"""
+        with self.lock:
+            self.versions[scope] = self.versions.get(scope, 0) + 1
+
+    def etag(self, scope: str, *params: Any) -> str:
+        """
+        生成强ETag
+
+        Args:
+            scope: 数据范围，如 gallery、records:<user_id>
+            params: 影响响应内容的请求参数
+
+        Returns:
+            带引号的ETag
+        """
+        with self.lock:
+            version = self.versions.get(scope, 0)
+        epoch = int(time.time() // self.ttl)
+        key = "|".join([scope, self.boot_id, str(version), str(epoch)] + [str(param) for param in params])
+        return f'"{hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]}"'
+
+    def check(self, request: Request, etag: str) -> bool:
+        """If-None-Match 与ETag匹配时返回True，调用方直接返回304"""
+        if etag_matches(request, etag):
+            with self.lock:
+                self.not_modified += 1
+            return True
+        return False
+
+    def get(self, etag: str) -> Optional[bytes]:
+        """获取缓存的响应体"""
+        with self.lock:
+            body = self.entries.get(etag)
+            if body is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(etag)
+            self.hits += 1
+            return body
+
+    def put(self, etag: str, body: bytes):
+        """缓存响应体，ETag包含版本号，旧版本的条目按LRU淘汰"""
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[etag] = body
+            self.entries.move_to_end(etag)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存指标"""
+        with self.lock:
+            return {
+                "scopes": len(self.versions),
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+            }
+
+
+# 全局响应缓存实例
+response_cache = ResponseCache(settings.RESPONSE_CACHE_TTL, settings.RESPONSE_CACHE_MAX_ENTRIES)
+metrics_registry.register("response_cache", response_cache.stats)
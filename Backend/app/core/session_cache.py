@@ -0,0 +1,160 @@
+"""
+Session缓存模块
+在进程内缓存已验证的session和用户快照，避免每个请求都访问数据库
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Dict, Iterable, Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics_registry
+
+
+@dataclass
+class CachedSession:
+    """已验证的session快照"""
+    session_id: str
+    user_id: str
+    username: str
+    expires_at: datetime
+
+
+class SessionCache:
+    """
+    带TTL的LRU缓存
+
+    缓存条目最多保留 ttl 秒，且不会超过session本身的过期时间。
+    缓存只在当前进程内有效：本进程的登出、调用点变更会立即同步到缓存，
+    其他进程的变更最多延迟 ttl 秒生效。
+    """
+
+    def __init__(self, ttl: int = 60, max_size: int = 10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.sessions = OrderedDict()  # session_id -> (缓存过期时间, CachedSession)
+        self.user_credits = OrderedDict()  # user_id -> (缓存过期时间, 调用点)
+        self.usernames = OrderedDict()  # user_id -> (缓存过期时间, 用户名)
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def _put(self, entries: OrderedDict, key: str, value, expires_at: float):
+        entries[key] = (expires_at, value)
+        entries.move_to_end(key)
+        while len(entries) > self.max_size:
+            entries.popitem(last=False)
+
+    def _get(self, entries: OrderedDict, key: str):
+        entry = entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del entries[key]
+            self.misses += 1
+            return None
+        entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get_session(self, session_id: str) -> Optional[CachedSession]:
+        """获取缓存的session，不存在或已过期时返回None"""
+        if not self.enabled:
+            return None
+        with self.lock:
+            session = self._get(self.sessions, session_id)
+            if session and session.expires_at <= datetime.now(timezone.utc):
+                del self.sessions[session_id]
+                return None
+            return session
+
+    def put_session(self, session: CachedSession):
+        """缓存已验证的session"""
+        if not self.enabled:
+            return
+        remaining = (session.expires_at - datetime.now(timezone.utc)).total_seconds()
+        if remaining <= 0:
+            return
+        with self.lock:
+            self._put(self.sessions, session.session_id, session, time.monotonic() + min(self.ttl, remaining))
+            self._put(self.usernames, session.user_id, session.username, time.monotonic() + self.ttl)
+
+    def invalidate_session(self, session_id: str):
+        """移除指定session"""
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+    def invalidate_user(self, user_id: str):
+        """移除指定用户的所有session和用户快照"""
+        with self.lock:
+            for session_id in [key for key, (_, session) in self.sessions.items() if session.user_id == str(user_id)]:
+                del self.sessions[session_id]
+            self.user_credits.pop(str(user_id), None)
+
+    def get_user_credits(self, user_id: str) -> Optional[float]:
+        """获取缓存的用户调用点，不存在或已过期时返回None"""
+        if not self.enabled:
+            return None
+        with self.lock:
+            return self._get(self.user_credits, user_id)
+
+    def set_user_credits(self, user_id: str, server_credits: float):
+        """缓存用户调用点，调用点变更并提交后调用"""
+        if not self.enabled:
+            return
+        with self.lock:
+            self._put(self.user_credits, str(user_id), server_credits, time.monotonic() + self.ttl)
+
+    def get_usernames(self, user_ids: Iterable[str]) -> Dict[str, str]:
+        """
+        批量获取缓存的用户名
+
+        Args:
+            user_ids: 用户ID列表
+
+        Returns:
+            命中缓存的 用户ID -> 用户名
+        """
+        if not self.enabled:
+            return {}
+        result = {}
+        with self.lock:
+            for user_id in user_ids:
+                username = self._get(self.usernames, user_id)
+                if username is not None:
+                    result[user_id] = username
+        return result
+
+    def set_usernames(self, usernames: Dict[str, str]):
+        """缓存 用户ID -> 用户名"""
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl
+        with self.lock:
+            for user_id, username in usernames.items():
+                self._put(self.usernames, str(user_id), username, expires_at)
+
+    def stats(self) -> Dict[str, int]:
+        """缓存统计信息"""
+        with self.lock:
+            return {
+                "sessions": len(self.sessions),
+                "users": len(self.user_credits),
+                "usernames": len(self.usernames),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# 全局session缓存实例
+session_cache = SessionCache(settings.SESSION_CACHE_TTL, settings.SESSION_CACHE_MAX_SIZE)
+metrics_registry.register("cache", session_cache.stats)
@@ -0,0 +1,117 @@
+"""
+过期Session清理任务
+在后台按固定间隔分批删除过期或已失效的session，替代请求路径上的清理
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.database_session import db_session_manager
+from app.core.metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+
+class SessionReaper:
+    """过期Session清理器"""
+
+    def __init__(self, interval: int = 300, batch_size: int = 1000, max_batches: int = 100):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.task: Optional[asyncio.Task] = None
+
+        # 运行指标
+        self.runs = 0
+        self.errors = 0
+        self.deleted_total = 0
+        self.last_deleted = 0
+        self.last_batches = 0
+        self.last_duration_ms = 0.0
+        self.last_run_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    async def reap_once(self) -> int:
+        """
+        执行一轮清理，逐批删除直到没有过期行或达到单轮批次上限
+
+        Returns:
+            本轮删除的行数
+        """
+        started = time.perf_counter()
+        deleted = 0
+        batches = 0
+        try:
+            while batches < self.max_batches:
+                count = await db_session_manager.delete_expired_sessions(self.batch_size)
+                batches += 1
+                deleted += count
+                if count < self.batch_size:
+                    break
+        except Exception as e:
+            self.errors += 1
+            self.last_error = str(e)
+            logger.exception("清理过期session失败")
+        finally:
+            self.runs += 1
+            self.deleted_total += deleted
+            self.last_deleted = deleted
+            self.last_batches = batches
+            self.last_duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            self.last_run_at = datetime.utcnow()
+
+        if deleted:
+            logger.info(f"清理过期session {deleted} 条，共 {batches} 批，耗时 {self.last_duration_ms}ms")
+        return deleted
+
+    async def _run(self):
+        while True:
+            await self.reap_once()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """启动后台清理任务，间隔为0时不启动"""
+        if self.interval <= 0 or self.task is not None:
+            return
+        self.task = asyncio.get_running_loop().create_task(self._run())
+        logger.info(f"过期session清理任务已启动，间隔 {self.interval}s，每批 {self.batch_size} 条")
+
+    async def stop(self):
+        """停止后台清理任务"""
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """清理任务的运行指标"""
+        return {
+            "running": self.task is not None and not self.task.done(),
+            "interval": self.interval,
+            "batch_size": self.batch_size,
+            "runs": self.runs,
+            "errors": self.errors,
+            "deleted_total": self.deleted_total,
+            "last_deleted": self.last_deleted,
+            "last_batches": self.last_batches,
+            "last_duration_ms": self.last_duration_ms,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_error": self.last_error,
+        }
+
+
+# 全局session清理器实例
+session_reaper = SessionReaper(
+    settings.SESSION_REAPER_INTERVAL,
+    settings.SESSION_REAPER_BATCH_SIZE,
+    settings.SESSION_REAPER_MAX_BATCHES
+)
+metrics_registry.register("reaper", session_reaper.stats)
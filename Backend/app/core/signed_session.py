@@ -0,0 +1,161 @@
+"""
+签名Session模块
+签发和验证携带用户信息的HMAC签名令牌，验证时无需访问数据库
+
+令牌格式: base64url(载荷JSON).base64url(HMAC-SHA256签名)
+载荷包含 sid（sessions表中的session_id）、uid、usr 和 exp（过期时间戳）。
+登出后的令牌通过吊销集合拒绝，吊销集合定期从数据库刷新。
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Optional, Set
+
+from sqlalchemy import and_, select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.session_cache import CachedSession
+from app.models.models import Session as DBSession
+
+logger = logging.getLogger(__name__)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class SignedSessionManager:
+    """签名Session令牌的签发、验证与吊销"""
+
+    def __init__(self, secret_key: Optional[str], refresh_interval: int = 30):
+        self.secret_key = (secret_key or "").encode("utf-8")
+        self.refresh_interval = refresh_interval
+        self.revoked: Set[str] = set()
+        self.lock = Lock()
+        self.task: Optional[asyncio.Task] = None
+
+    def _sign(self, payload: str) -> str:
+        if not self.secret_key:
+            raise RuntimeError("SESSION_MODE=signed 需要配置 SESSION_SECRET_KEY")
+        return _b64encode(hmac.new(self.secret_key, payload.encode("ascii"), hashlib.sha256).digest())
+
+    def issue(self, session_id: str, user_id: str, username: str, expires_at: datetime) -> str:
+        """
+        签发令牌
+
+        Args:
+            session_id: sessions表中的session_id，用于吊销
+            user_id: 用户ID
+            username: 用户名
+            expires_at: 过期时间（UTC）
+
+        Returns:
+            签名令牌
+        """
+        payload = _b64encode(json.dumps({
+            "sid": session_id,
+            "uid": user_id,
+            "usr": username,
+            "exp": int(expires_at.timestamp()),
+        }, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        return f"{payload}.{self._sign(payload)}"
+
+    def decode(self, token: str) -> Optional[CachedSession]:
+        """
+        校验签名并解析令牌，不检查过期和吊销
+
+        Returns:
+            session快照，签名无效或格式错误时返回None
+        """
+        try:
+            payload, signature = token.split(".", 1)
+            if not hmac.compare_digest(signature, self._sign(payload)):
+                return None
+            data = json.loads(_b64decode(payload))
+            return CachedSession(
+                session_id=data["sid"],
+                user_id=data["uid"],
+                username=data["usr"],
+                expires_at=datetime.fromtimestamp(data["exp"], tz=timezone.utc)
+            )
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def verify(self, token: str) -> Optional[CachedSession]:
+        """验证令牌：签名有效、未过期且未被吊销"""
+        session = self.decode(token)
+        if not session or session.expires_at <= datetime.now(timezone.utc):
+            return None
+        if session.session_id in self.revoked:
+            return None
+        return session
+
+    def revoke(self, session_id: str):
+        """将session加入本进程的吊销集合"""
+        with self.lock:
+            self.revoked.add(session_id)
+
+    async def refresh_revoked(self) -> int:
+        """
+        从数据库刷新吊销集合：已失效但尚未过期的session
+
+        Returns:
+            吊销集合大小
+        """
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(DBSession.session_id).where(
+                    and_(
+                        DBSession.is_active == 0,
+                        DBSession.expires_at > datetime.now(timezone.utc)
+                    )
+                )
+            )).all()
+        revoked = {row.session_id for row in rows}
+        with self.lock:
+            self.revoked = revoked
+        return len(revoked)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh_revoked()
+            except Exception:
+                logger.exception("刷新session吊销集合失败")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        """启动吊销集合的后台刷新任务"""
+        if self.task is not None:
+            return
+        self.task = asyncio.get_running_loop().create_task(self._run())
+        logger.info(f"签名session模式已启用，吊销集合刷新间隔 {self.refresh_interval}s")
+
+    async def stop(self):
+        """停止后台刷新任务"""
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+
+# 全局签名session管理器实例
+signed_session_manager = SignedSessionManager(
+    settings.SESSION_SECRET_KEY,
+    settings.SESSION_REVOCATION_REFRESH_INTERVAL
+)
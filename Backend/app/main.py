@@ -1,9 +1,15 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 
 from app.core.config import settings
+from app.core.database import async_engine, replica_engines
+from app.core.db_metrics import db_metrics
+from app.core.replica_router import SAFE_METHODS, client_key, replica_router
 from app.api.endpoints import router as api_router
+from app.core.session_reaper import session_reaper
+from app.core.signed_session import signed_session_manager
+from app.services.credit_service import credit_ledger_writer, credit_reservations
 import logging
 from fastapi.responses import JSONResponse
 
@@ -21,8 +27,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+
+@app.middleware("http")
+async def _collect_db_metrics(request: Request, call_next):
+    # 统计每个请求的SQL执行次数和获取连接的等待时间
+    stats = db_metrics.start_request()
+    try:
+        return await call_next(request)
+    finally:
+        db_metrics.finish_request(stats)
+
+
+@app.middleware("http")
+async def _track_client_writes(request: Request, call_next):
+    # 写请求完成后，该客户端在一段时间内的只读请求仍走主库
+    response = await call_next(request)
+    if request.method not in SAFE_METHODS:
+        replica_router.mark_write(client_key(request))
+    return response
+
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 
@@ -37,6 +64,27 @@ def _log_registered_routes():
             logger.info(f"  {r}")
 
 
+@app.on_event("startup")
+async def _start_background_tasks():
+    session_reaper.start()
+    credit_reservations.start()
+    credit_ledger_writer.start()
+    if settings.SESSION_MODE == "signed":
+        signed_session_manager.start()
+
+
+@app.on_event("shutdown")
+async def _stop_background_tasks():
+    await session_reaper.stop()
+    # 先完成对账，再写入对账产生的流水
+    await credit_reservations.stop()
+    await credit_ledger_writer.stop()
+    await signed_session_manager.stop()
+    await async_engine.dispose()
+    for replica_engine in replica_engines:
+        await replica_engine.dispose()
+
+
 @app.get("/debug/routes")
 def debug_routes():
     """Return list of registered routes (path and methods)."""
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float
+from sqlalchemy import Column, Computed, Integer, String, Date, DateTime, ForeignKey, Text, Float, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -28,24 +29,89 @@ class Session(Base):
     ip_address = Column(String(45))  # 支持IPv6
     user_agent = Column(Text)
 
+    __table_args__ = (
+        # 只索引有效session：按用户查询有效session、统计有效session数
+        Index("ix_sessions_active_user_id_expires_at", "user_id", "expires_at",
+              postgresql_where=text("is_active = 1")),
+        Index("ix_sessions_active_expires_at", "expires_at", postgresql_where=text("is_active = 1")),
+        # 清理任务查找已失效的session
+        Index("ix_sessions_inactive_id", "id", postgresql_where=text("is_active = 0")),
+    )
+
 
 class GalleryShare(Base):
     __tablename__ = "gallery_shares"
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String(255), nullable=True, index=True)  # 可为空，表示匿名用户
-    image_base64 = Column(Text)  # 图片的base64字符串
-    analysis_result = Column(Text)  # AI分析结果，JSON格式
+    image_digest = Column(String(64), nullable=True, index=True)  # 图片内容的SHA-256摘要，文件保存在图片存储中
+    analysis_result = Column(JSONB)  # AI分析结果
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_gallery_shares_created_at_id", "created_at", "id"),
+        Index("ix_gallery_shares_analysis_result", "analysis_result", postgresql_using="gin",
+              postgresql_ops={"analysis_result": "jsonb_path_ops"}),
+    )
+
+
+# 从分析结果中提取热量（大卡）：数值直接使用，字符串取第一个数值（如 "约1,200 kcal"），
+# 规则与 nutrition_rollup.extract_calories 一致
+CALORIES_EXPRESSION = (
+    "CASE jsonb_typeof(analysis_result -> 'calories') "
+    "WHEN 'number' THEN CASE WHEN (analysis_result ->> 'calories')::double precision >= 0 "
+    "THEN (analysis_result ->> 'calories')::double precision END "
+    "WHEN 'string' THEN substring(replace(analysis_result ->> 'calories', ',', '') "
+    "FROM '[0-9]+(?:[.][0-9]+)?')::double precision END"
+)
+
 
 class DietRecord(Base):
     __tablename__ = "diet_records"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(String(255), index=True)  # 使用定长字符串，足够存储用户ID
+    user_id = Column(String(255))  # 使用定长字符串，足够存储用户ID；按用户的查询使用以 user_id 开头的组合索引
     image_url = Column(String(255))
-    analysis_result = Column(Text)  # AI分析结果，JSON格式
+    analysis_result = Column(JSONB)  # AI分析结果
     analysis_method = Column(String(50), default="pure_llm")  # 分析方法
+    calories = Column(Float, Computed(CALORIES_EXPRESSION, persisted=True))  # 热量（大卡），无法识别时为空
+    food_name = Column(Text, Computed("analysis_result ->> 'food_name'", persisted=True))  # 食物名称
+    idempotency_key = Column(String(64), nullable=True)  # 批量写入时客户端生成的幂等键，同一用户内唯一
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_diet_records_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_diet_records_user_id_calories_id", "user_id", "calories", "id"),
+        Index("ix_diet_records_user_id_food_name", "user_id", "food_name",
+              postgresql_ops={"food_name": "text_pattern_ops"}),
+        Index("ix_diet_records_analysis_result", "analysis_result", postgresql_using="gin",
+              postgresql_ops={"analysis_result": "jsonb_path_ops"}),
+        Index("uq_diet_records_user_id_idempotency_key", "user_id", "idempotency_key", unique=True,
+              postgresql_where=text("idempotency_key IS NOT NULL")),
+    )
+
+
+class DailyNutritionRollup(Base):
+    __tablename__ = "daily_nutrition_rollups"
+
+    user_id = Column(String(255), primary_key=True)
+    day = Column(Date, primary_key=True)  # 按 ROLLUP_TIMEZONE 划分的自然日
+    calories = Column(Float, nullable=False, default=0.0)  # 当日热量合计（大卡）
+    record_count = Column(Integer, nullable=False, default=0)  # 当日记录数
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class CreditLedger(Base):
+    __tablename__ = "credit_ledger"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String(255), nullable=False)
+    delta = Column(Float, nullable=False)  # 调用点变化量，扣除为负数
+    balance_after = Column(Float, nullable=False)  # 变更后的余额
+    reason = Column(String(50), nullable=False)  # 变更原因，如 analyze_food、recharge
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_credit_ledger_user_id_created_at", "user_id", "created_at"),
+    )
@@ -1,9 +1,21 @@
-from datetime import datetime
-from typing import Optional, List, Union
-from pydantic import BaseModel, EmailStr, ConfigDict
+import json
+from datetime import date, datetime
+from typing import Annotated, Any, Optional, List, Union
+from pydantic import BaseModel, BeforeValidator, EmailStr, ConfigDict, Field
 from enum import Enum
 
 
+def _dump_analysis_result(value: Any) -> Any:
+    """数据库中的分析结果为JSONB，接口仍以JSON字符串返回"""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+# 分析结果：接口中为JSON字符串，数据库中为JSONB
+AnalysisResultText = Annotated[str, BeforeValidator(_dump_analysis_result)]
+
+
 class AnalysisMethod(str, Enum):
     """分析方法枚举"""
     LLM_OCR_HYBRID = "llm_ocr_hybrid"  # 大模型OCR混合估算
@@ -33,14 +45,57 @@ class DietRecordCreate(DietRecordBase):
 class DietRecordResponse(DietRecordBase):
     id: int
     user_id: str
-    analysis_result: str
+    analysis_result: AnalysisResultText
     analysis_method: Optional[str] = ""  # 可选字段，设置默认值
+    calories: Optional[float] = None  # 从分析结果中提取的热量（大卡）
+    food_name: Optional[str] = None  # 从分析结果中提取的食物名称
     created_at: datetime
     updated_at: Optional[datetime]
     
     model_config = ConfigDict(from_attributes=True)  # 新版本中 orm_mode 改名为 from_attributes
 
 
+class DietRecordBatchItem(BaseModel):
+    """批量写入的单条饮食记录"""
+    idempotency_key: str = Field(..., min_length=1, max_length=64)  # 客户端生成的唯一键（如UUID），重试时原样提交
+    analysis_result: Union[dict, str]
+    analysis_method: str = Field("pure_llm", max_length=50)
+    image_url: Optional[str] = Field("", max_length=255)
+    created_at: Optional[datetime] = None  # 用餐时间，离线记录时由客户端提供，缺省为服务器接收时间
+
+
+class DietRecordBatchItemResult(BaseModel):
+    index: int  # 在请求中的位置，从0开始
+    status: str  # created、duplicate 或 invalid
+    idempotency_key: Optional[str] = None
+    record_id: Optional[int] = None  # 新建或已存在的记录ID
+    error: Optional[str] = None
+
+
+class DietRecordBatchResponse(BaseModel):
+    created: int
+    duplicates: int
+    invalid: int
+    results: List[DietRecordBatchItemResult]
+
+
+class NutritionSummaryBucket(BaseModel):
+    start: date  # 按天汇总时为当天，按周汇总时为该周周一
+    calories: float
+    record_count: int
+
+
+class NutritionSummaryResponse(BaseModel):
+    user_id: str
+    from_date: date
+    to_date: date
+    period: str  # day 或 week
+    total_calories: float
+    record_count: int
+    average_daily_calories: float
+    buckets: List[NutritionSummaryBucket]
+
+
 class EstimateRequest(BaseModel):
     image_base64: str
     method: str = "pure_llm"
@@ -188,16 +243,18 @@ class BowelAnalyzeResponse(BaseModel):
 
 
 class GalleryShareBase(BaseModel):
-    image_base64: str
-    analysis_result: str  # JSON格式的分析结果
+    analysis_result: AnalysisResultText  # JSON格式的分析结果
 
 
 class GalleryShareCreate(GalleryShareBase):
-    pass
+    image_base64: str  # data URL 或纯base64，保存后只在数据库中记录摘要
 
 
 class GalleryShareResponse(GalleryShareBase):
     id: int
+    image_url: Optional[str] = None  # 大图地址，由 /gallery/image/{digest} 提供
+    card_url: Optional[str] = None  # 卡片图地址
+    thumbnail_url: Optional[str] = None  # 缩略图地址
     user_name: Optional[str] = None  # 用户名，可为空表示匿名用户
     is_current_user: bool = False  # 是否为当前登录用户
     created_at: datetime
@@ -208,6 +265,7 @@ class GalleryShareResponse(GalleryShareBase):
 class GalleryShareListResponse(BaseModel):
     shares: List[GalleryShareResponse]
     total: int
+    next_cursor: Optional[str] = None  # 下一页游标，没有更多数据时为空
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -0,0 +1,402 @@
+"""
+调用点服务
+以单条UPDATE语句原子地增减用户调用点，并将每次变更批量写入调用点流水表；
+AI调用前后通过内存中的预留/提交/释放协议控制调用点，定期与数据库对账
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, use_async_session
+from app.core.metrics import metrics_registry
+from app.core.session_cache import session_cache
+from app.models.models import CreditLedger, User
+
+logger = logging.getLogger(__name__)
+
+
+class CreditLedgerWriter:
+    """
+    调用点流水的批量写入器
+
+    变更先写入内存缓冲区，达到批量大小或到达刷新间隔时一次性插入，
+    流水写入不占用users表的行锁。进程异常退出时缓冲区中未刷新的流水会丢失，
+    余额本身以users表为准。
+    """
+
+    def __init__(self, flush_interval: int = 5, batch_size: int = 200):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.buffer: List[Dict] = []
+        self.lock = Lock()
+        self.task: Optional[asyncio.Task] = None
+
+    async def append(self, user_id: str, delta: float, balance_after: float, reason: str):
+        """追加一条流水，缓冲区满时立即刷新"""
+        with self.lock:
+            self.buffer.append({
+                "user_id": str(user_id),
+                "delta": delta,
+                "balance_after": balance_after,
+                "reason": reason,
+                "created_at": datetime.now(timezone.utc),
+            })
+            should_flush = len(self.buffer) >= self.batch_size
+        if should_flush:
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        将缓冲区中的流水写入数据库
+
+        Returns:
+            写入的流水条数
+        """
+        with self.lock:
+            rows, self.buffer = self.buffer, []
+        if not rows:
+            return 0
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(insert(CreditLedger), rows)
+                await db.commit()
+            return len(rows)
+        except Exception:
+            logger.exception(f"写入调用点流水失败，{len(rows)} 条流水将在下次刷新时重试")
+            with self.lock:
+                self.buffer = rows + self.buffer
+            return 0
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        """启动后台定时刷新任务"""
+        if self.task is not None:
+            return
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """停止后台刷新任务并写入剩余流水"""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
+
+
+class CreditService:
+    """用户调用点的原子增减"""
+
+    def __init__(self, ledger: CreditLedgerWriter):
+        self.ledger = ledger
+        self.reservations: Optional["CreditReservations"] = None
+
+    def _balance_changed(self, user_id: str, balance: float):
+        session_cache.set_user_credits(user_id, balance)
+        if self.reservations is not None:
+            self.reservations.set_balance(user_id, balance)
+
+    async def deduct(self, db: AsyncSession, user_id: str, amount: float, reason: str, allow_overdraft: bool = False) -> Optional[float]:
+        """
+        原子地扣除调用点，余额不足时不扣除
+
+        执行 UPDATE users SET server_credits = server_credits - :n
+        WHERE id = :id AND server_credits >= :n RETURNING server_credits
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            amount: 扣除数量
+            reason: 扣除原因，写入流水
+            allow_overdraft: 是否允许扣成负数（用于结算已提供的服务）
+
+        Returns:
+            扣除后的余额，用户不存在或余额不足时返回None
+        """
+        conditions = [User.id == int(user_id)]
+        if not allow_overdraft:
+            conditions.append(User.server_credits >= amount)
+        balance = (await db.execute(
+            update(User)
+            .where(*conditions)
+            .values(server_credits=User.server_credits - amount)
+            .returning(User.server_credits)
+            .execution_options(synchronize_session=False)
+        )).scalar_one_or_none()
+        await db.commit()
+
+        if balance is None:
+            return None
+        self._balance_changed(user_id, balance)
+        await self.ledger.append(user_id, -amount, balance, reason)
+        return balance
+
+    async def add(self, db: AsyncSession, user_id: str, amount: float, reason: str) -> Optional[float]:
+        """
+        原子地增加调用点
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            amount: 增加数量
+            reason: 增加原因，写入流水
+
+        Returns:
+            增加后的余额，用户不存在时返回None
+        """
+        balance = (await db.execute(
+            update(User)
+            .where(User.id == int(user_id))
+            .values(server_credits=User.server_credits + amount)
+            .returning(User.server_credits)
+            .execution_options(synchronize_session=False)
+        )).scalar_one_or_none()
+        await db.commit()
+
+        if balance is None:
+            return None
+        self._balance_changed(user_id, balance)
+        await self.ledger.append(user_id, amount, balance, reason)
+        return balance
+
+
+@dataclass
+class CreditReservation:
+    """一次调用点预留"""
+    reservation_id: str
+    user_id: str
+    amount: float
+    expires_at: float
+
+
+class CreditReservations:
+    """
+    调用点的预留/提交/释放
+
+    AI调用前预留调用点，成功后提交，失败或超时释放，超过有效期未处理的
+    预留会被自动释放。可用余额 = 数据库余额 - 已预留 - 已提交未对账，
+    全部在内存中计算；已提交的扣除定期批量写回数据库。
+    数据库余额按 balance_ttl 刷新，多进程部署时各进程之间的并发预留
+    最多在一个刷新周期内超出余额，对账时允许扣成负数以结算已提供的服务。
+    """
+
+    def __init__(self, credits: CreditService, reservation_ttl: int = 120, balance_ttl: int = 60, reconcile_interval: int = 5):
+        self.credits = credits
+        self.reservation_ttl = reservation_ttl
+        self.balance_ttl = balance_ttl
+        self.reconcile_interval = reconcile_interval
+        self.balances: Dict[str, Tuple[float, float]] = {}  # user_id -> (数据库余额, 加载时间)
+        self.reservations: Dict[str, CreditReservation] = {}
+        self.reserved: Dict[str, float] = {}  # user_id -> 已预留数量
+        self.pending: Dict[Tuple[str, str], float] = {}  # (user_id, 原因) -> 已提交未对账数量
+        self.lock = Lock()
+        self.task: Optional[asyncio.Task] = None
+
+        # 运行指标
+        self.reserved_count = 0
+        self.rejected_count = 0
+        self.committed_count = 0
+        self.released_count = 0
+        self.expired_count = 0
+        self.reconcile_errors = 0
+
+    def _available(self, user_id: str) -> float:
+        balance = self.balances[user_id][0]
+        pending = sum(amount for (uid, _), amount in self.pending.items() if uid == user_id)
+        return balance - self.reserved.get(user_id, 0.0) - pending
+
+    async def _load_balance(self, user_id: str, db: Optional[AsyncSession] = None) -> Optional[float]:
+        async with use_async_session(db) as db:
+            return (await db.execute(
+                select(User.server_credits).where(User.id == int(user_id))
+            )).scalar_one_or_none()
+
+    def set_balance(self, user_id: str, balance: float):
+        """更新缓存的数据库余额"""
+        with self.lock:
+            self.balances[str(user_id)] = (balance, time.monotonic())
+
+    async def reserve(self, user_id: str, amount: float, db: Optional[AsyncSession] = None) -> Optional[str]:
+        """
+        预留调用点
+
+        Args:
+            user_id: 用户ID
+            amount: 预留数量
+            db: 请求中已有的数据库会话，缓存余额过期时用于加载余额
+
+        Returns:
+            预留ID，用户不存在或可用调用点不足时返回None
+        """
+        user_id = str(user_id)
+        with self.lock:
+            entry = self.balances.get(user_id)
+            fresh = entry is not None and time.monotonic() - entry[1] < self.balance_ttl
+        if not fresh:
+            balance = await self._load_balance(user_id, db)
+            if balance is None:
+                return None
+            self.set_balance(user_id, balance)
+
+        with self.lock:
+            if self._available(user_id) < amount:
+                self.rejected_count += 1
+                return None
+            reservation = CreditReservation(
+                reservation_id=str(uuid.uuid4()),
+                user_id=user_id,
+                amount=amount,
+                expires_at=time.monotonic() + self.reservation_ttl
+            )
+            self.reservations[reservation.reservation_id] = reservation
+            self.reserved[user_id] = self.reserved.get(user_id, 0.0) + amount
+            self.reserved_count += 1
+            return reservation.reservation_id
+
+    def _pop(self, reservation_id: str) -> Optional[CreditReservation]:
+        reservation = self.reservations.pop(reservation_id, None)
+        if reservation:
+            self.reserved[reservation.user_id] -= reservation.amount
+            if self.reserved[reservation.user_id] <= 0:
+                del self.reserved[reservation.user_id]
+        return reservation
+
+    def commit(self, reservation_id: str, reason: str) -> Optional[float]:
+        """
+        提交预留，扣除在下次对账时写入数据库
+
+        Args:
+            reservation_id: 预留ID
+            reason: 扣除原因，写入流水
+
+        Returns:
+            提交后的可用调用点，预留不存在（已过期或已释放）时返回None
+        """
+        with self.lock:
+            reservation = self._pop(reservation_id)
+            if reservation is None:
+                return None
+            key = (reservation.user_id, reason)
+            self.pending[key] = self.pending.get(key, 0.0) + reservation.amount
+            self.committed_count += 1
+            available = self._available(reservation.user_id)
+        session_cache.set_user_credits(reservation.user_id, available)
+        return available
+
+    def release(self, reservation_id: str) -> bool:
+        """释放预留，返回预留是否存在"""
+        with self.lock:
+            reservation = self._pop(reservation_id)
+            if reservation:
+                self.released_count += 1
+            return reservation is not None
+
+    def expire_stale(self) -> int:
+        """释放超过有效期的预留，返回释放数量"""
+        now = time.monotonic()
+        with self.lock:
+            stale = [rid for rid, reservation in self.reservations.items() if reservation.expires_at <= now]
+            for reservation_id in stale:
+                self._pop(reservation_id)
+            self.expired_count += len(stale)
+        if stale:
+            logger.warning(f"释放 {len(stale)} 个超时未处理的调用点预留")
+        return len(stale)
+
+    async def reconcile(self) -> int:
+        """
+        将已提交的扣除写回数据库
+
+        Returns:
+            写回的 (用户, 原因) 组数
+        """
+        with self.lock:
+            pending = list(self.pending.items())
+
+        applied = 0
+        for (user_id, reason), amount in pending:
+            try:
+                async with AsyncSessionLocal() as db:
+                    balance = await self.credits.deduct(db, user_id, amount, reason, allow_overdraft=True)
+            except Exception:
+                self.reconcile_errors += 1
+                logger.exception(f"调用点对账失败，用户 {user_id} 的 {amount} 点将在下次对账时重试")
+                continue
+
+            with self.lock:
+                remaining = self.pending.get((user_id, reason), 0.0) - amount
+                if remaining > 0:
+                    self.pending[(user_id, reason)] = remaining
+                else:
+                    self.pending.pop((user_id, reason), None)
+            if balance is None:
+                logger.error(f"调用点对账时未找到用户 {user_id}，丢弃 {amount} 点扣除")
+            applied += 1
+        return applied
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            self.expire_stale()
+            await self.reconcile()
+
+    def start(self):
+        """启动后台过期清理与对账任务"""
+        if self.task is not None:
+            return
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """停止后台任务并完成最后一次对账"""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.reconcile()
+
+    def stats(self) -> Dict[str, Any]:
+        """预留与对账的运行指标"""
+        with self.lock:
+            return {
+                "active_reservations": len(self.reservations),
+                "pending_users": len({user_id for user_id, _ in self.pending}),
+                "pending_credits": sum(self.pending.values()),
+                "reserved": self.reserved_count,
+                "rejected": self.rejected_count,
+                "committed": self.committed_count,
+                "released": self.released_count,
+                "expired": self.expired_count,
+                "reconcile_errors": self.reconcile_errors,
+            }
+
+
+# 全局调用点流水写入器、调用点服务和预留管理实例
+credit_ledger_writer = CreditLedgerWriter(settings.CREDIT_LEDGER_FLUSH_INTERVAL, settings.CREDIT_LEDGER_BATCH_SIZE)
+credit_service = CreditService(credit_ledger_writer)
+credit_reservations = CreditReservations(
+    credit_service,
+    settings.CREDIT_RESERVATION_TTL,
+    settings.CREDIT_BALANCE_TTL,
+    settings.CREDIT_RECONCILE_INTERVAL
+)
+metrics_registry.register("credit_reservations", credit_reservations.stats)
+credit_service.reservations = credit_reservations
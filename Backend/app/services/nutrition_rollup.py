@@ -0,0 +1,187 @@
+"""
+营养汇总服务
+在写入或删除饮食记录的同一事务中增量维护每个用户每天的热量合计与记录数，
+汇总接口只查询汇总表，不扫描饮食记录
+"""
+
+import json
+import math
+import re
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.models import DailyNutritionRollup, DietRecord
+
+# 划分自然日使用的时区
+ROLLUP_TZ = ZoneInfo(settings.ROLLUP_TIMEZONE)
+
+# 热量字符串中的第一个数值，如 "约350 kcal"、"1,200大卡"
+_NUMBER = re.compile(r"[0-9]+(?:[.][0-9]+)?")
+
+
+def parse_analysis_result(analysis_result: Any) -> Any:
+    """
+    将客户端提交的分析结果转换为写入JSONB列的值
+
+    Args:
+        analysis_result: JSON字符串或已解析的对象
+
+    Returns:
+        解析后的对象；不是合法JSON的字符串原样返回，保存为JSON字符串
+    """
+    if isinstance(analysis_result, (str, bytes)):
+        try:
+            return json.loads(analysis_result)
+        except ValueError:
+            return analysis_result
+    return analysis_result
+
+
+def extract_calories(analysis_result: Any) -> Optional[float]:
+    """
+    从分析结果中提取热量
+
+    与 diet_records.calories 生成列的表达式规则一致，用于不经过数据库的场景。
+
+    Args:
+        analysis_result: JSON字符串或已解析的字典，calories 可以是数值或带单位的字符串
+
+    Returns:
+        热量（大卡），缺失或无法识别时返回None
+    """
+    analysis_result = parse_analysis_result(analysis_result)
+    if not isinstance(analysis_result, dict):
+        return None
+
+    value = analysis_result.get("calories")
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) if math.isfinite(value) and value >= 0 else None
+    if isinstance(value, str):
+        match = _NUMBER.search(value.replace(",", ""))
+        if match:
+            return float(match.group())
+    return None
+
+
+def rollup_day(created_at: datetime) -> date:
+    """记录创建时间所在的自然日（按 ROLLUP_TIMEZONE）"""
+    return created_at.astimezone(ROLLUP_TZ).date()
+
+
+async def apply_records(db: AsyncSession, records: Iterable[DietRecord], sign: int = 1):
+    """
+    将记录计入（sign=1）或移出（sign=-1）每日汇总，只执行语句不提交
+
+    调用方须在写入或删除记录的同一事务中调用，记录需已 flush 并加载 created_at。
+    同一天的多条记录合并为一行，按 (user_id, day) 排序写入以避免并发事务死锁。
+
+    Args:
+        db: 数据库会话
+        records: 饮食记录
+        sign: 1 表示新增记录，-1 表示删除记录
+    """
+    deltas: Dict[Tuple[str, date], List[float]] = defaultdict(lambda: [0.0, 0])
+    for record in records:
+        if record.created_at is None:
+            continue
+        delta = deltas[(record.user_id, rollup_day(record.created_at))]
+        delta[0] += (record.calories or 0.0) * sign
+        delta[1] += sign
+    if not deltas:
+        return
+
+    stmt = insert(DailyNutritionRollup).values([
+        {"user_id": user_id, "day": day, "calories": calories, "record_count": count}
+        for (user_id, day), (calories, count) in sorted(deltas.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailyNutritionRollup.user_id, DailyNutritionRollup.day],
+        set_={
+            "calories": DailyNutritionRollup.calories + stmt.excluded.calories,
+            "record_count": DailyNutritionRollup.record_count + stmt.excluded.record_count,
+            "updated_at": func.now(),
+        }
+    )
+    await db.execute(stmt)
+
+    if sign < 0:
+        # 当天已没有记录的汇总行直接删除
+        await db.execute(
+            delete(DailyNutritionRollup).where(
+                or_(*[
+                    and_(DailyNutritionRollup.user_id == user_id, DailyNutritionRollup.day == day)
+                    for user_id, day in deltas
+                ]),
+                DailyNutritionRollup.record_count <= 0
+            )
+        )
+
+
+async def summarize(
+    db: AsyncSession,
+    user_id: str,
+    from_date: date,
+    to_date: date,
+    period: str = "day"
+) -> Dict[str, Any]:
+    """
+    查询用户在日期范围内的营养汇总
+
+    Args:
+        db: 数据库会话
+        user_id: 用户ID
+        from_date: 开始日期（含）
+        to_date: 结束日期（含）
+        period: day 按天汇总，week 按周（周一开始）汇总
+
+    Returns:
+        汇总结果，buckets 包含范围内的每一天或每一周，没有记录的时间段合计为0
+    """
+    rows = (await db.execute(
+        select(DailyNutritionRollup.day, DailyNutritionRollup.calories, DailyNutritionRollup.record_count)
+        .where(
+            DailyNutritionRollup.user_id == user_id,
+            DailyNutritionRollup.day >= from_date,
+            DailyNutritionRollup.day <= to_date
+        )
+    )).all()
+
+    def bucket_start(day: date) -> date:
+        return day - timedelta(days=day.weekday()) if period == "week" else day
+
+    step = timedelta(days=7 if period == "week" else 1)
+    buckets: Dict[date, Dict[str, Any]] = {}
+    start = bucket_start(from_date)
+    while start <= to_date:
+        buckets[start] = {"start": start, "calories": 0.0, "record_count": 0}
+        start += step
+
+    for day, calories, record_count in rows:
+        bucket = buckets[bucket_start(day)]
+        bucket["calories"] += calories
+        bucket["record_count"] += record_count
+
+    total_calories = sum(bucket["calories"] for bucket in buckets.values())
+    days = (to_date - from_date).days + 1
+    return {
+        "user_id": user_id,
+        "from_date": from_date,
+        "to_date": to_date,
+        "period": period,
+        "total_calories": round(total_calories, 2),
+        "record_count": sum(bucket["record_count"] for bucket in buckets.values()),
+        "average_daily_calories": round(total_calories / days, 2),
+        "buckets": [
+            {**bucket, "calories": round(bucket["calories"], 2)}
+            for bucket in buckets.values()
+        ],
+    }
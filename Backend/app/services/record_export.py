@@ -0,0 +1,222 @@
+"""
+饮食记录导出服务
+以服务端游标分批读取用户的全部饮食记录，边读边编码为 CSV / NDJSON / Parquet 数据块，
+可选 gzip 压缩；每次只持有一批记录，内存占用与历史记录总数无关
+"""
+
+import csv
+import io
+import json
+import logging
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.models import DietRecord
+
+try:
+    # pyarrow 体积较大，未安装时不支持 Parquet 格式
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - 取决于部署环境
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+# 导出的列，按顺序写入
+EXPORT_COLUMNS = [
+    "id", "created_at", "updated_at", "food_name", "calories",
+    "analysis_method", "image_url", "analysis_result",
+]
+
+# 格式名称 -> (MIME类型, 文件扩展名)
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def parquet_available() -> bool:
+    """是否安装了 Parquet 格式所需的 pyarrow"""
+    return pq is not None
+
+
+def _text(value: Any) -> Optional[str]:
+    """将单元格值转换为文本，分析结果转换为JSON字符串"""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+class _ChunkBuffer:
+    """只追加的输出缓冲区，供 pyarrow 写入，已写入的数据由 drain 取走"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class _CsvEncoder:
+    def __init__(self):
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def header(self) -> bytes:
+        # 带BOM，Excel打开时按UTF-8识别中文
+        self.writer.writerow(EXPORT_COLUMNS)
+        return "\ufeff".encode("utf-8") + self._drain()
+
+    def encode(self, rows: Sequence) -> bytes:
+        self.writer.writerows([[_text(value) for value in row] for row in rows])
+        return self._drain()
+
+    def finish(self) -> bytes:
+        return b""
+
+    def _drain(self) -> bytes:
+        data = self.buffer.getvalue().encode("utf-8")
+        self.buffer.seek(0)
+        self.buffer.truncate(0)
+        return data
+
+
+class _NdjsonEncoder:
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, rows: Sequence) -> bytes:
+        lines = []
+        for row in rows:
+            item: Dict[str, Any] = dict(zip(EXPORT_COLUMNS, row))
+            for key in ("created_at", "updated_at"):
+                item[key] = _text(item[key])
+            lines.append(json.dumps(item, ensure_ascii=False))
+        return ("\n".join(lines) + "\n").encode("utf-8") if lines else b""
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _ParquetEncoder:
+    """每批记录写为一个行组"""
+
+    def __init__(self):
+        timestamp = pa.timestamp("us", tz="UTC")
+        self.schema = pa.schema([
+            ("id", pa.int64()),
+            ("created_at", timestamp),
+            ("updated_at", timestamp),
+            ("food_name", pa.string()),
+            ("calories", pa.float64()),
+            ("analysis_method", pa.string()),
+            ("image_url", pa.string()),
+            ("analysis_result", pa.string()),
+        ])
+        self.sink = _ChunkBuffer()
+        self.writer = pq.ParquetWriter(self.sink, self.schema, compression="snappy")
+
+    def header(self) -> bytes:
+        return self.sink.drain()
+
+    def encode(self, rows: Sequence) -> bytes:
+        columns = list(zip(*rows))
+        data = {name: list(values) for name, values in zip(EXPORT_COLUMNS, columns)}
+        data["analysis_result"] = [_text(value) for value in data["analysis_result"]]
+        self.writer.write_table(pa.Table.from_pydict(data, schema=self.schema))
+        return self.sink.drain()
+
+    def finish(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+
+_ENCODERS: Dict[str, Callable[[], Any]] = {
+    "csv": _CsvEncoder,
+    "ndjson": _NdjsonEncoder,
+    "parquet": _ParquetEncoder,
+}
+
+
+async def export_records(
+    session_factory,
+    user_id: str,
+    fmt: str,
+    compress: bool = False
+) -> AsyncIterator[bytes]:
+    """
+    按创建时间顺序流式导出用户的饮食记录
+
+    会话在生成器内创建，流式响应发送期间一直持有，发送结束后关闭。
+
+    Args:
+        session_factory: 会话工厂（只读副本或主库）
+        user_id: 用户ID
+        fmt: 导出格式，csv、ndjson 或 parquet
+        compress: 是否以gzip压缩输出
+
+    Yields:
+        编码（及压缩）后的数据块
+    """
+    encoder = _ENCODERS[fmt]()
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+
+    def output(data: bytes) -> bytes:
+        return compressor.compress(data) if compressor and data else data
+
+    exported = 0
+    async with session_factory() as db:
+        try:
+            # 服务端游标按批取回，使用 (user_id, created_at, id) 索引
+            result = await db.stream(
+                select(*[getattr(DietRecord, column) for column in EXPORT_COLUMNS])
+                .where(DietRecord.user_id == user_id)
+                .order_by(DietRecord.created_at, DietRecord.id)
+                .execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+            )
+            chunk = output(encoder.header())
+            if chunk:
+                yield chunk
+            async for rows in result.partitions():
+                exported += len(rows)
+                chunk = output(encoder.encode(rows))
+                if chunk:
+                    yield chunk
+            chunk = output(encoder.finish())
+            if compressor:
+                chunk += compressor.flush()
+            if chunk:
+                yield chunk
+        except Exception:
+            # 响应头已发送，只能中断传输
+            logger.exception(f"导出饮食记录失败: user_id={user_id}, format={fmt}, exported={exported}")
+            raise
+    logger.info(f"饮食记录导出完成: user_id={user_id}, format={fmt}, records={exported}")
@@ -0,0 +1,175 @@
+"""
+饮食记录批量写入服务
+解析JSON数组或NDJSON请求体，逐条校验后以一条多行INSERT在同一事务中写入，
+按客户端提供的幂等键跳过已写入的记录，并返回每条记录的处理结果
+"""
+
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import DietRecord
+from app.models.schemas import DietRecordBatchItem
+from app.services.nutrition_rollup import apply_records, parse_analysis_result
+
+logger = logging.getLogger(__name__)
+
+# 客户端时钟允许超前服务器的时间
+CLOCK_SKEW = timedelta(minutes=5)
+
+
+class InvalidBatchBody(ValueError):
+    """请求体不是JSON数组或NDJSON"""
+
+
+class _InvalidLine:
+    """NDJSON中无法解析的行，作为无效记录返回"""
+
+    def __init__(self, error: str):
+        self.error = error
+
+
+def parse_batch_body(body: bytes, content_type: str) -> List[Any]:
+    """
+    解析批量写入的请求体
+
+    Args:
+        body: 请求体
+        content_type: 请求的 Content-Type，application/x-ndjson 按行解析，否则按JSON数组解析
+
+    Returns:
+        记录列表；NDJSON中无法解析的行保留在原位置，之后作为无效记录返回
+    """
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        payloads: List[Any] = []
+        for number, line in enumerate(body.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                payloads.append(json.loads(line))
+            except ValueError as e:
+                payloads.append(_InvalidLine(f"第 {number} 行不是合法的JSON: {e}"))
+        return payloads
+
+    try:
+        payloads = json.loads(body)
+    except ValueError as e:
+        raise InvalidBatchBody(f"请求体不是合法的JSON: {e}")
+    if not isinstance(payloads, list):
+        raise InvalidBatchBody("请求体必须是记录数组")
+    return payloads
+
+
+def _result(index: int, status: str, key: Optional[str] = None,
+            record_id: Optional[int] = None, error: Optional[str] = None) -> Dict[str, Any]:
+    return {"index": index, "status": status, "idempotency_key": key, "record_id": record_id, "error": error}
+
+
+async def ingest_records(db: AsyncSession, user_id: str, payloads: List[Any]) -> Dict[str, Any]:
+    """
+    批量写入用户的饮食记录并提交
+
+    无效记录不影响其他记录；同一幂等键已写入过（包括本次请求中重复出现）的记录标记为 duplicate，
+    返回已存在的记录ID。新记录与每日汇总的更新在同一事务中提交。
+
+    Args:
+        db: 数据库会话
+        user_id: 用户ID
+        payloads: parse_batch_body 解析出的记录
+
+    Returns:
+        各状态的数量与按请求顺序排列的每条记录结果
+    """
+    now = datetime.now(timezone.utc)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(payloads)
+    rows: List[Dict[str, Any]] = []
+    first_index: Dict[str, int] = {}  # 幂等键 -> 本次请求中第一次出现的位置
+    repeated: List[int] = []
+
+    for index, payload in enumerate(payloads):
+        if isinstance(payload, _InvalidLine):
+            results[index] = _result(index, "invalid", error=payload.error)
+            continue
+        try:
+            item = DietRecordBatchItem.model_validate(payload)
+        except ValidationError as e:
+            error = e.errors()[0]
+            location = ".".join(str(part) for part in error["loc"])
+            results[index] = _result(index, "invalid", error=f"{location}: {error['msg']}" if location else error["msg"])
+            continue
+
+        created_at = item.created_at or now
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        if created_at > now + CLOCK_SKEW:
+            results[index] = _result(index, "invalid", item.idempotency_key, error="created_at 不能晚于当前时间")
+            continue
+
+        if item.idempotency_key in first_index:
+            repeated.append(index)
+            results[index] = _result(index, "duplicate", item.idempotency_key)
+            continue
+        first_index[item.idempotency_key] = index
+        rows.append({
+            "user_id": user_id,
+            "idempotency_key": item.idempotency_key,
+            "image_url": item.image_url or "",
+            "analysis_result": parse_analysis_result(item.analysis_result),
+            "analysis_method": item.analysis_method,
+            "created_at": created_at,
+        })
+
+    record_ids: Dict[str, int] = {}
+    if rows:
+        # 一条多行INSERT写入，幂等键冲突的行跳过；返回生成列用于更新每日汇总
+        stmt = insert(DietRecord).values(rows).on_conflict_do_nothing(
+            index_elements=[DietRecord.user_id, DietRecord.idempotency_key],
+            index_where=DietRecord.idempotency_key.isnot(None)
+        ).returning(DietRecord.id, DietRecord.user_id, DietRecord.idempotency_key,
+                    DietRecord.created_at, DietRecord.calories)
+        inserted = (await db.execute(stmt)).all()
+        await apply_records(db, inserted)
+
+        for row in inserted:
+            record_ids[row.idempotency_key] = row.id
+            index = first_index[row.idempotency_key]
+            results[index] = _result(index, "created", row.idempotency_key, row.id)
+
+        # 之前已写入过的记录返回已存在的记录ID
+        existing_keys = [key for key in first_index if key not in record_ids]
+        if existing_keys:
+            existing = (await db.execute(
+                select(DietRecord.id, DietRecord.idempotency_key).where(
+                    DietRecord.user_id == user_id,
+                    DietRecord.idempotency_key.in_(existing_keys)
+                )
+            )).all()
+            for record_id, key in existing:
+                record_ids[key] = record_id
+                index = first_index[key]
+                results[index] = _result(index, "duplicate", key, record_id)
+        for key, index in first_index.items():
+            # 冲突的记录在查询前已被删除
+            if results[index] is None:
+                results[index] = _result(index, "duplicate", key)
+
+        await db.commit()
+
+    for index in repeated:
+        results[index]["record_id"] = record_ids.get(results[index]["idempotency_key"])
+
+    created = sum(1 for result in results if result["status"] == "created")
+    duplicates = sum(1 for result in results if result["status"] == "duplicate")
+    logger.info(f"批量写入饮食记录: user_id={user_id}, items={len(payloads)}, created={created}, duplicates={duplicates}")
+    return {
+        "created": created,
+        "duplicates": duplicates,
+        "invalid": len(payloads) - created - duplicates,
+        "results": results,
+    }
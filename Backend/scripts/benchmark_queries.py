@@ -0,0 +1,204 @@
+"""
+热点查询基准测试
+在独立的 schema 中按当前模型建表并生成模拟数据，分别在只有单列索引和加上组合/部分索引
+两种情况下执行 EXPLAIN ANALYZE，对比热点查询的执行时间和执行计划
+
+用法（在 Backend 目录下）：
+    python scripts/benchmark_queries.py --records 200000 --sessions 100000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+from typing import Dict, List, Tuple
+
+from sqlalchemy import create_engine, text
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.config import settings  # noqa: E402
+from app.models.models import Base  # noqa: E402
+
+SCHEMA = "benchmark_queries"
+
+# 组合索引与部分索引，对比时先删除这些索引得到“优化前”的结果
+COMPOSITE_INDEXES = {
+    "ix_diet_records_user_id_created_at_id": "diet_records (user_id, created_at, id)",
+    "ix_diet_records_user_id_calories_id": "diet_records (user_id, calories, id)",
+    "ix_diet_records_user_id_food_name": "diet_records (user_id, food_name text_pattern_ops)",
+    "ix_sessions_active_user_id_expires_at": "sessions (user_id, expires_at) WHERE is_active = 1",
+    "ix_sessions_active_expires_at": "sessions (expires_at) WHERE is_active = 1",
+    "ix_sessions_inactive_id": "sessions (id) WHERE is_active = 0",
+    "ix_gallery_shares_created_at_id": "gallery_shares (created_at, id)",
+}
+
+# 优化前的单列索引
+SINGLE_COLUMN_INDEXES = {
+    "ix_diet_records_user_id": "diet_records (user_id)",
+}
+
+# 名称 -> 查询，参数取自生成的数据
+HOT_QUERIES = {
+    "records_first_page": (
+        "SELECT * FROM diet_records WHERE user_id = :user_id "
+        "ORDER BY created_at DESC, id DESC LIMIT 21"
+    ),
+    "records_by_calories": (
+        "SELECT * FROM diet_records WHERE user_id = :user_id AND calories IS NOT NULL "
+        "ORDER BY calories DESC, id DESC LIMIT 21"
+    ),
+    "records_food_prefix": (
+        "SELECT * FROM diet_records WHERE user_id = :user_id AND food_name LIKE '米%' "
+        "ORDER BY created_at DESC, id DESC LIMIT 21"
+    ),
+    "validate_session": (
+        "SELECT * FROM sessions WHERE session_id = :session_id AND is_active = 1 AND expires_at > now()"
+    ),
+    "user_active_sessions": (
+        "SELECT * FROM sessions WHERE user_id = :user_id AND is_active = 1 AND expires_at > now()"
+    ),
+    "active_session_count": (
+        "SELECT count(id) FROM sessions WHERE is_active = 1 AND expires_at > now()"
+    ),
+    "reaper_batch": (
+        "SELECT id FROM sessions WHERE is_active = 0 OR expires_at <= now() LIMIT 1000"
+    ),
+    "gallery_first_page": (
+        "SELECT * FROM gallery_shares ORDER BY created_at DESC, id DESC LIMIT 21"
+    ),
+}
+
+FOODS = ["米饭", "米粉", "面条", "鸡胸肉", "沙拉", "苹果", "牛肉面", "饺子", "豆浆", "蛋炒饭"]
+
+
+def seed(conn, users: int, records: int, sessions: int, shares: int):
+    """用 generate_series 生成模拟数据，记录集中在少数活跃用户上"""
+    foods = "ARRAY[" + ",".join(f"'{food}'" for food in FOODS) + "]"
+    conn.execute(text(f"""
+        INSERT INTO diet_records (user_id, image_url, analysis_result, analysis_method, created_at)
+        SELECT (floor(power(random(), 2) * :users))::int::text, '',
+               jsonb_build_object('food_name', ({foods})[1 + (i % {len(FOODS)})],
+                                  'calories', CASE WHEN i % 10 = 0 THEN to_jsonb((100 + i % 900)::text || ' kcal')
+                                                   ELSE to_jsonb(100 + i % 900) END),
+               'pure_llm', now() - random() * interval '365 days'
+        FROM generate_series(1, :records) AS i
+    """), {"users": users, "records": records})
+    conn.execute(text("""
+        INSERT INTO sessions (session_id, user_id, username, created_at, expires_at, is_active)
+        SELECT md5(i::text), (i % :users)::text, 'user' || (i % :users),
+               now() - random() * interval '30 days',
+               now() + (random() - 0.7) * interval '30 days',
+               CASE WHEN random() < 0.2 THEN 1 ELSE 0 END
+        FROM generate_series(1, :sessions) AS i
+    """), {"users": users, "sessions": sessions})
+    conn.execute(text("""
+        INSERT INTO gallery_shares (user_id, image_digest, analysis_result, created_at)
+        SELECT (i % :users)::text, md5(i::text) || md5(i::text),
+               jsonb_build_object('food_name', 'food' || i, 'calories', 100 + i % 900),
+               now() - random() * interval '365 days'
+        FROM generate_series(1, :shares) AS i
+    """), {"users": users, "shares": shares})
+    conn.execute(text("ANALYZE"))
+
+
+def query_params(conn) -> Dict[str, str]:
+    """选取记录最多的用户和一个有效session作为查询参数"""
+    user_id = conn.execute(text(
+        "SELECT user_id FROM diet_records GROUP BY user_id ORDER BY count(*) DESC LIMIT 1"
+    )).scalar()
+    session_id = conn.execute(text(
+        "SELECT session_id FROM sessions WHERE is_active = 1 AND expires_at > now() LIMIT 1"
+    )).scalar()
+    return {"user_id": user_id, "session_id": session_id}
+
+
+def _scans(plan: dict) -> List[str]:
+    """执行计划中的扫描节点，如 Index Scan using ix_xxx"""
+    scans = []
+    node_type = plan.get("Node Type", "")
+    if "Scan" in node_type:
+        index = plan.get("Index Name")
+        scans.append(f"{node_type} using {index}" if index else f"{node_type} on {plan.get('Relation Name')}")
+    for child in plan.get("Plans", []):
+        scans.extend(_scans(child))
+    return scans
+
+
+def explain(conn, params: Dict[str, str], repeat: int) -> Dict[str, Tuple[float, str]]:
+    """执行每个热点查询的 EXPLAIN ANALYZE，返回 名称 -> (执行时间中位数ms, 扫描方式)"""
+    results = {}
+    for name, sql in HOT_QUERIES.items():
+        timings = []
+        scans = ""
+        for _ in range(repeat):
+            output = conn.execute(
+                text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"),
+                {key: value for key, value in params.items() if f":{key}" in sql}
+            ).scalar()
+            report = (json.loads(output) if isinstance(output, str) else output)[0]
+            timings.append(report["Execution Time"])
+            scans = ", ".join(_scans(report["Plan"]))
+        results[name] = (statistics.median(timings), scans)
+    return results
+
+
+def set_indexes(conn, composite: bool):
+    """切换为只有单列索引（优化前）或组合/部分索引（优化后）"""
+    create, drop = (COMPOSITE_INDEXES, SINGLE_COLUMN_INDEXES) if composite else (SINGLE_COLUMN_INDEXES, COMPOSITE_INDEXES)
+    for name in drop:
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    for name, definition in create.items():
+        table, columns = definition.split(" ", 1)
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} {columns}"))
+    conn.execute(text("ANALYZE"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比组合/部分索引前后热点查询的执行计划")
+    parser.add_argument("--users", type=int, default=1000, help="用户数")
+    parser.add_argument("--records", type=int, default=200000, help="饮食记录数")
+    parser.add_argument("--sessions", type=int, default=100000, help="session数")
+    parser.add_argument("--shares", type=int, default=20000, help="画廊分享数")
+    parser.add_argument("--repeat", type=int, default=5, help="每个查询执行次数，取中位数")
+    parser.add_argument("--keep", action="store_true", help="结束后保留测试 schema")
+    args = parser.parse_args()
+
+    engine = create_engine(settings.get_database_url)
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f"SET search_path TO {SCHEMA}"))
+            Base.metadata.create_all(conn)
+            print(f"生成数据: {args.records} 条记录, {args.sessions} 个session, {args.shares} 条分享")
+            seed(conn, args.users, args.records, args.sessions, args.shares)
+            params = query_params(conn)
+
+            set_indexes(conn, composite=False)
+            before = explain(conn, params, args.repeat)
+            set_indexes(conn, composite=True)
+            after = explain(conn, params, args.repeat)
+
+        width = max(len(name) for name in HOT_QUERIES)
+        print(f"\n{'query':<{width}}  {'before ms':>10}  {'after ms':>10}  {'speedup':>8}")
+        for name in HOT_QUERIES:
+            before_ms, after_ms = before[name][0], after[name][0]
+            speedup = f"{before_ms / after_ms:.1f}x" if after_ms > 0 else "-"
+            print(f"{name:<{width}}  {before_ms:>10.3f}  {after_ms:>10.3f}  {speedup:>8}")
+        print("\n执行计划：")
+        for name in HOT_QUERIES:
+            print(f"  {name}\n    before: {before[name][1]}\n    after:  {after[name][1]}")
+    finally:
+        if not args.keep:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
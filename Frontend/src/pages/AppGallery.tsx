@@ -12,7 +12,7 @@ import ResponsiveLayout from '../components/ResponsiveLayout'
 import PageHeader from '../components/PageHeader'
 import { useState, useEffect } from 'react'
 import { useNavigate } from 'react-router-dom'
-import { getGalleryShares, deleteGalleryShare } from '../utils/api'
+import { getGalleryShares, deleteGalleryShare, getGalleryImageUrl } from '../utils/api'
 import type { GalleryShare } from '../utils/api'
 
 const { Text } = Typography;
@@ -29,7 +29,7 @@ function AppGallery() {
   const fetchGalleryShares = async () => {
     try {
       setLoading(true);
-      const response = await getGalleryShares(0, 50); // 获取前50条分享
+      const response = await getGalleryShares(null, 50); // 获取前50条分享
       setGalleryShares(response.shares);
     } catch (error) {
       console.error('获取画廊数据失败:', error);
@@ -64,7 +64,8 @@ function AppGallery() {
       
       return {
         id: share.id,
-        imageUrl: share.image_base64,
+        imageUrl: getGalleryImageUrl(share.thumbnail_url),
+        detailImageUrl: getGalleryImageUrl(share.card_url),
         foodName: foodName,
         calories: calories,
         caloriesDisplay: analysisData.calories || '',
@@ -91,7 +92,8 @@ function AppGallery() {
       console.error('解析分析结果失败:', error);
       return {
         id: share.id,
-        imageUrl: share.image_base64,
+        imageUrl: getGalleryImageUrl(share.thumbnail_url),
+        detailImageUrl: getGalleryImageUrl(share.card_url),
         foodName: '未知食物',
         calories: 0,
         caloriesDisplay: '0 kcal',
@@ -674,7 +676,7 @@ function AppGallery() {
               }}>
                 <Image
                   alt={item.foodName}
-                  src={item.imageUrl}
+                  src={item.detailImageUrl}
                   style={{
                     width: '100%',
                     maxHeight: '400px',
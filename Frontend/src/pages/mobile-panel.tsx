@@ -5,6 +5,7 @@ import PageHeader from '../components/PageHeader';
 import { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { isLogin, getUserId, getSessionId } from '../utils/auth';
+import { getUserRecordsSince } from '../utils/api';
 import dayjs, { Dayjs } from 'dayjs';
 
 const { Title, Text } = Typography;
@@ -90,23 +91,12 @@ export default function MobilePanel() {
 
   const fetchTodayRecords = async (userId: string, targetDate?: Date) => {
     try {
-      const apiUrl = `${import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000'}`;
-      const sessionId = getSessionId();
-      const headers: HeadersInit = {};
-      if (sessionId) {
-        headers['X-Session-ID'] = sessionId;
-      }
-      
-      const response = await fetch(`${apiUrl}/api/v1/records/${userId}`, {
-        method: 'GET',
-        headers: headers,
-      });
+      // 记录接口分页返回，翻页直到覆盖指定日期
+      const dateToFilter = targetDate || new Date();
+      const records = await getUserRecordsSince(userId, dateToFilter);
 
-      if (response.ok) {
-        const records = await response.json();
-        
+      if (records) {
         // 过滤指定日期的记录
-        const dateToFilter = targetDate || new Date();
         const dateStr = dateToFilter.toISOString().split('T')[0];
         
         const filteredRecords = records.filter((record: any) => {
@@ -181,17 +181,29 @@ export interface GalleryShare {
   id: number;
   user_name: string | null;
   is_current_user: boolean;
-  image_base64: string;
+  image_url: string | null;
+  card_url: string | null;
+  thumbnail_url: string | null;
   analysis_result: string;
   created_at: string;
 }
 
+/**
+ * 获取画廊图片的完整地址
+ * @param path - 后端返回的图片路径（image_url / card_url / thumbnail_url）
+ * @returns 图片地址，没有图片时返回空字符串
+ */
+export function getGalleryImageUrl(path: string | null): string {
+  return path ? `${API_BASE_URL}${path}` : '';
+}
+
 /**
  * 画廊分享列表响应接口
  */
 export interface GalleryShareListResponse {
   shares: GalleryShare[];
   total: number;
+  next_cursor: string | null;
 }
 
 /**
@@ -204,12 +216,12 @@ export interface ShareToGalleryRequest {
 
 /**
  * 获取画廊分享列表
- * @param skip - 跳过的记录数（分页）
+ * @param cursor - 上一页返回的 next_cursor，不传表示第一页
  * @param limit - 返回的记录数限制
  * @returns 画廊分享列表
  */
 export async function getGalleryShares(
-  skip: number = 0,
+  cursor?: string | null,
   limit: number = 20
 ): Promise<GalleryShareListResponse> {
   try {
@@ -219,8 +231,12 @@ export async function getGalleryShares(
       headers['X-Session-ID'] = sessionId;
     }
     
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (cursor) {
+      params.set('cursor', cursor);
+    }
     const response = await fetch(
-      `${API_BASE_URL}/api/v1/gallery/list?skip=${skip}&limit=${limit}`,
+      `${API_BASE_URL}/api/v1/gallery/list?${params.toString()}`,
       {
         headers: headers,
       }
@@ -228,14 +244,14 @@ export async function getGalleryShares(
 
     if (!response.ok) {
       console.error('获取画廊分享列表失败');
-      return { shares: [], total: 0 };
+      return { shares: [], total: 0, next_cursor: null };
     }
 
     const data: GalleryShareListResponse = await response.json();
     return data;
   } catch (error) {
     console.error('获取画廊分享列表异常:', error);
-    return { shares: [], total: 0 };
+    return { shares: [], total: 0, next_cursor: null };
   }
 }
 
@@ -317,3 +333,44 @@ export async function deleteGalleryShare(
     };
   }
 }
+
+/**
+ * 获取用户在指定日期（UTC）及之后的饮食记录
+ * 记录接口按创建时间倒序分页，沿响应头 X-Next-Cursor 翻页，直到某页出现早于该日期的记录或没有下一页
+ * @param userId - 用户ID
+ * @param date - 起始日期，默认今天
+ * @returns 该日期及之后的记录，请求失败时返回 null
+ */
+export async function getUserRecordsSince(
+  userId: string,
+  date: Date = new Date()
+): Promise<any[] | null> {
+  const dateStr = date.toISOString().split('T')[0];
+  const records: any[] = [];
+  let cursor: string | null = null;
+
+  do {
+    const params = new URLSearchParams();
+    if (cursor) {
+      params.set('cursor', cursor);
+    }
+    const response = await fetch(`${API_BASE_URL}/api/v1/records/${userId}?${params.toString()}`, {
+      method: 'GET',
+      headers: createHeaders(''),
+    });
+    if (!response.ok) {
+      console.error('获取记录失败:', response.status);
+      return null;
+    }
+
+    const page: any[] = await response.json();
+    const recent = page.filter((record: any) =>
+      new Date(record.created_at).toISOString().split('T')[0] >= dateStr
+    );
+    records.push(...recent);
+    // 本页已有更早的记录，后续页只会更早
+    cursor = recent.length < page.length ? null : response.headers.get('X-Next-Cursor');
+  } while (cursor);
+
+  return records;
+}
@@ -1,5 +1,6 @@
 // 测试 mobile-panel 页面的登录状态和数据获取功能
-import { isLogin, getUserId, getSessionId } from '../utils/auth';
+import { isLogin, getUserId } from '../utils/auth';
+import { getUserRecordsSince } from '../utils/api';
 
 export const testMobilePanel = async () => {
   console.log('测试 mobile-panel 功能...');
@@ -15,20 +16,10 @@ export const testMobilePanel = async () => {
       console.log('用户ID:', userId);
 
       if (userId) {
-        // 测试获取今日记录
-        const apiUrl = `${import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000'}`;
-        const sessionId = getSessionId();
-        const headers: HeadersInit = {};
-        if (sessionId) {
-          headers['X-Session-ID'] = sessionId;
-        }
-        const response = await fetch(`${apiUrl}/api/v1/records/${userId}`, {
-          method: 'GET',
-          headers: headers,
-        });
+        // 测试获取今日记录（记录接口分页返回，翻页直到覆盖今天）
+        const records = await getUserRecordsSince(userId);
 
-        if (response.ok) {
-          const records = await response.json();
+        if (records) {
           console.log('获取到记录数量:', records.length);
 
           // 过滤今日记录
@@ -41,7 +32,7 @@ export const testMobilePanel = async () => {
 
           console.log('今日记录数量:', todayRecords.length);
         } else {
-          console.log('获取记录失败:', response.status);
+          console.log('获取记录失败');
         }
       }
     } else {
@@ -725,7 +725,7 @@ def summarize_multi_image_calories(single_useful_results: List[tuple], api_key:
         json_data = json.loads(json_str)
         
         # 5. 输出 - 成功情况
-        result_dict["总热量"] = json_data.get("总热量", -1)
+        result_dict["总热量"] = json_data.get("热量", json_data.get("总热量", -1))
         result_dict["估算依据"] = json_data.get("估算依据", "未提供估算依据")
         result_dict["状态"] = "成功"
         result_dict["错误信息"] = ""